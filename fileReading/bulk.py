@@ -0,0 +1,379 @@
+"""
+BULK PROFILE LOADER
+
+Loading a directory of profile files (shaped like file.json) one at a
+time with json.load() in one process spends most of its time in the
+parser on a single core. This module spreads the work out:
+
+  - the directory is walked with os.scandir() and the file names are cut
+    into chunks (a few hundred files each)
+  - each chunk goes to a worker process, which reads its files one after
+    the other with one read() per file, parses them and turns them into
+    columns (name, age, city, skills ...), so only plain lists travel
+    back to the main process instead of one dict per profile
+  - a file that cannot be read or parsed is recorded as an error with
+    its reason; the rest of the chunk and the run go on. If a worker
+    process dies, the files of its chunks are recorded as errors and
+    the run goes on with a new pool
+
+Results come back either as a stream (stream(): one row per profile,
+chunk by chunk) or merged into one columnar Table (load_table()).
+LoadStats counts files, bytes, errors and throughput.
+
+Steps:
+  1. Walking the directory and cutting it into chunks
+  2. Turning a profile into a row of columns
+  3. The worker: read and parse one chunk
+  4. The pool: chunks in flight, stream() and load_table()
+  5. Command line: generate test files, compare with a plain loop
+"""
+
+import os    # import os to walk directories
+import sys   # import sys to exit with a status code
+import json  # import json to parse the profiles
+import time  # import time to measure throughput
+from collections import deque  # import deque for the chunks in flight
+from concurrent.futures import ProcessPoolExecutor  # import ProcessPoolExecutor for the worker processes
+from concurrent.futures.process import BrokenProcessPool  # import BrokenProcessPool to replace a pool whose worker died
+
+
+# ---------- CONFIG ----------
+CHUNK_FILES = 256
+# the columns of a Table, in order; see profile_row()
+COLUMNS = ("path", "name", "age", "is_student", "email", "phone", "street", "city",
+           "state", "zip", "skills", "degrees", "last_degree_year", "jobs", "years_experience")
+
+
+# ---------- FILES ----------
+def iter_files(root, suffix=".json", onerror=None):
+    """
+    Yield the path of every file under root whose name ends with
+    suffix, walking subdirectories too. A directory that cannot be
+    read is skipped; like os.walk(), onerror(path, error) is called
+    for it if given.
+    """
+    stack = [root]
+    while stack:
+        folder = stack.pop()
+        try:
+            with os.scandir(folder) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.name.endswith(suffix):
+                        yield entry.path
+        except OSError as e:
+            if onerror is not None:
+                onerror(folder, e)
+
+
+def chunked(items, size):
+    """
+    Yield lists of up to size items.
+    """
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+# ---------- ROWS ----------
+def profile_row(path, profile):
+    """
+    Turn one parsed profile into a tuple in COLUMNS order. Missing
+    fields become None (or an empty list); fields of the wrong type
+    raise TypeError or AttributeError, which makes the file an error.
+    """
+    contact = profile.get("contact") or {}
+    address = profile.get("address") or {}
+    education = profile.get("education") or []
+    work = profile.get("work_experience") or []
+    years = [e.get("year") for e in education if e.get("year") is not None]
+    return (
+        path,
+        profile.get("name"),
+        profile.get("age"),
+        profile.get("is_student"),
+        contact.get("email"),
+        contact.get("phone"),
+        address.get("street"),
+        address.get("city"),
+        address.get("state"),
+        address.get("zip"),
+        list(profile.get("skills") or []),
+        [e.get("degree") for e in education],
+        max(years) if years else None,
+        len(work),
+        sum(w.get("years") or 0 for w in work),
+    )
+
+
+# ---------- WORKER ----------
+def load_chunk(paths):
+    """
+    Read and parse the files in paths. Returns (columns, errors, bytes
+    read): columns is one list per entry of COLUMNS, errors a list of
+    (path, reason) for the files that were skipped.
+    """
+    columns = [[] for _ in COLUMNS]
+    errors = []
+    size = 0
+    for path in paths:
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            size += len(data)
+            row = profile_row(path, json.loads(data))
+        except Exception as e:
+            # bad JSON or UTF-8, a profile of the wrong shape, nesting
+            # too deep for the parser (RecursionError): skip this file only
+            errors.append((path, f"{type(e).__name__}: {e}"))
+            continue
+        for column, value in zip(columns, row):
+            column.append(value)
+    return columns, errors, size
+
+
+# ---------- RESULTS ----------
+class LoadStats:
+    """
+    LoadStats counts what a bulk load did and how fast.
+    """
+    def __init__(self, workers):
+        self.workers = workers
+        self.files = 0    # files loaded
+        self.bytes = 0    # bytes read
+        self.chunks = 0
+        self.errors = []  # (path, reason) of skipped files
+        self.start = time.perf_counter()
+        self.seconds = 0.0
+
+    def add(self, loaded, errors, size):
+        self.files += loaded
+        self.bytes += size
+        self.chunks += 1
+        self.errors.extend(errors)
+        self.seconds = time.perf_counter() - self.start
+
+    def as_dict(self):
+        """
+        Return the counters and the throughput as a dict.
+        """
+        seconds = self.seconds or 1e-9
+        return {
+            "files": self.files,
+            "errors": len(self.errors),
+            "bytes": self.bytes,
+            "chunks": self.chunks,
+            "workers": self.workers,
+            "seconds": self.seconds,
+            "files_per_s": self.files / seconds,
+            "mb_per_s": self.bytes / seconds / 1e6,
+        }
+
+    def __str__(self):
+        d = self.as_dict()
+        return (f"{d['files']} files ({d['bytes'] / 1e6:.1f} MB) in {d['seconds']:.2f} s "
+                f"with {d['workers']} workers: {d['files_per_s']:.0f} files/s, "
+                f"{d['mb_per_s']:.1f} MB/s, {d['errors']} errors")
+
+
+class Table:
+    """
+    Table keeps profiles as columns: table["city"] is the list of every
+    profile's city, table.row(i) one profile as a dict.
+    """
+    def __init__(self):
+        self.columns = {name: [] for name in COLUMNS}
+
+    def extend(self, columns):
+        for name, values in zip(COLUMNS, columns):
+            self.columns[name].extend(values)
+
+    def __len__(self):
+        return len(self.columns["path"])
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    def row(self, index):
+        return {name: values[index] for name, values in self.columns.items()}
+
+
+# ---------- POOL ----------
+def default_workers():
+    """
+    One worker process per CPU, or none (load in this process) on a
+    single CPU, where the pool would only add the cost of sending the
+    results between processes.
+    """
+    cpus = os.cpu_count() or 1
+    return cpus if cpus > 1 else 0
+
+
+def load_chunks(root, workers=None, chunk_files=CHUNK_FILES, stats=None):
+    """
+    Yield load_chunk() results for every chunk of files under root, in
+    order. workers=None uses default_workers(); workers=0 loads in
+    this process. At most two chunks per worker are in flight, so a
+    huge directory does not pile up results in memory. A directory
+    that cannot be read is an error of the next chunk, like a file.
+    """
+    if workers is None:
+        workers = default_workers()
+    folder_errors = []
+
+    def skip_folder(path, e):
+        folder_errors.append((path, f"{type(e).__name__}: {e}"))
+
+    chunks = chunked(iter_files(root, onerror=skip_folder), chunk_files)
+    if workers == 0:
+        results = map(load_chunk, chunks)
+    else:
+        results = _pooled(chunks, workers)
+    for columns, errors, size in results:
+        if folder_errors:
+            errors = folder_errors + errors
+            folder_errors = []
+        if stats is not None:
+            stats.add(len(columns[0]), errors, size)
+        yield columns, errors, size
+    if folder_errors:
+        # nothing was loaded after them: report them in an empty chunk
+        columns = [[] for _ in COLUMNS]
+        if stats is not None:
+            stats.add(0, folder_errors, 0)
+        yield columns, folder_errors, 0
+
+
+def _pooled(chunks, workers):
+    # load_chunk() for every chunk in a process pool, results in order
+    pool = ProcessPoolExecutor(workers)
+    in_flight = deque()
+    try:
+        for paths in chunks:
+            try:
+                future = pool.submit(load_chunk, paths)
+            except BrokenProcessPool:
+                # a worker died earlier: go on with a new pool
+                pool.shutdown(wait=False)
+                pool = ProcessPoolExecutor(workers)
+                future = pool.submit(load_chunk, paths)
+            in_flight.append((paths, future))
+            if len(in_flight) >= 2 * workers:
+                yield _result(*in_flight.popleft())
+        while in_flight:
+            yield _result(*in_flight.popleft())
+    finally:
+        pool.shutdown()
+
+
+def _result(paths, future):
+    # the chunk's result, or every path of the chunk as an error if its
+    # worker crashed (a dying worker also fails the other chunks in flight)
+    try:
+        return future.result()
+    except Exception as e:
+        reason = f"worker failed: {type(e).__name__}: {e}"
+        return [[] for _ in COLUMNS], [(path, reason) for path in paths], 0
+
+
+def stream(root, workers=None, chunk_files=CHUNK_FILES, stats=None):
+    """
+    Yield one dict per profile under root (keys: COLUMNS), as the chunks
+    come back from the workers.
+    """
+    for columns, _, _ in load_chunks(root, workers, chunk_files, stats):
+        for row in zip(*columns):
+            yield dict(zip(COLUMNS, row))
+
+
+def load_table(root, workers=None, chunk_files=CHUNK_FILES):
+    """
+    Load every profile under root into one Table. Returns (table, stats).
+    """
+    if workers is None:
+        workers = default_workers()
+    stats = LoadStats(workers)
+    table = Table()
+    for columns, _, _ in load_chunks(root, workers, chunk_files, stats):
+        table.extend(columns)
+    return table, stats
+
+
+# ---------- COMMAND LINE ----------
+def generate(out_dir, count, template="file.json", bad_every=1000):
+    """
+    Write count profiles based on template into out_dir (100 per
+    subdirectory), with every bad_every-th file broken on purpose.
+    """
+    with open(template) as f:
+        profile = json.load(f)
+    cities = ["Springfield", "Shelbyville", "Ogdenville", "North Haverbrook"]
+    for i in range(count):
+        folder = os.path.join(out_dir, f"{i // 100:05d}")
+        if i % 100 == 0:
+            os.makedirs(folder, exist_ok=True)
+        profile["name"] = f"Teacher {i}"
+        profile["age"] = 20 + i % 45
+        profile["address"]["city"] = cities[i % len(cities)]
+        text = json.dumps(profile, indent=2)
+        if bad_every and i % bad_every == bad_every - 1:
+            text = text[:len(text) // 2]
+        with open(os.path.join(folder, f"profile_{i:07d}.json"), "w") as f:
+            f.write(text)
+
+
+def main(argv=None):
+    """
+    python bulk.py DIR [--workers N] [--chunk N] [--generate N] [--compare]
+
+    Load every profile under DIR and print the throughput.
+    """
+    import argparse
+    parser = argparse.ArgumentParser(description=main.__doc__.strip().splitlines()[0])
+    parser.add_argument("dir")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="worker processes (default: one per CPU, 0 = no pool)")
+    parser.add_argument("--chunk", type=int, default=CHUNK_FILES, help="files per chunk")
+    parser.add_argument("--generate", type=int, metavar="N",
+                        help="first write N test profiles into DIR")
+    parser.add_argument("--compare", action="store_true",
+                        help="also time a plain json.load() loop")
+    args = parser.parse_args(argv)
+
+    if args.generate:
+        generate(args.dir, args.generate)
+    table, stats = load_table(args.dir, args.workers, args.chunk)
+    print(stats)
+    for path, reason in stats.errors[:5]:
+        print(f"  skipped {path}: {reason}")
+    if len(table):
+        cities = {}
+        for city in table["city"]:
+            cities[city] = cities.get(city, 0) + 1
+        print(f"{len(table)} profiles, cities: {cities}")
+
+    if args.compare:
+        start = time.perf_counter()
+        loaded = 0
+        for path in iter_files(args.dir):
+            try:
+                with open(path) as f:
+                    json.load(f)
+                loaded += 1
+            except ValueError:
+                pass
+        seconds = time.perf_counter() - start
+        print(f"plain json.load loop: {loaded} files in {seconds:.2f} s, "
+              f"{loaded / seconds:.0f} files/s")
+    return 0
+
+
+# run the command line only if this script is executed directly
+if __name__ == "__main__":
+    sys.exit(main())
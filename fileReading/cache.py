@@ -0,0 +1,241 @@
+"""
+PROFILE FILE CACHE
+
+A service that calls json.load() on the same profile file for every
+request opens, reads and parses it again each time, although it almost
+never changes. ProfileCache keeps the parsed files, keyed by path:
+
+  - every get() checks the file's mtime and size with one os.stat();
+    if either changed since it was read, the file is read again
+  - the least recently used files are dropped once there are more than
+    max_entries of them, or their sizes add up to more than max_bytes
+  - one lock guards the table, but files are read and parsed outside
+    it; threads that miss on the same path at the same time wait for
+    one of them to read it instead of all reading it
+  - what get() returns is a frozen snapshot (dicts become read-only
+    mappings, lists become tuples), so every caller can share it and
+    nobody can change it under the others' feet
+
+Counters (hits, misses, reloads, evictions) show how well a size works.
+
+Steps:
+  1. Frozen snapshots
+  2. ProfileCache: get(), the LRU table and its limits
+  3. Counters
+  4. Benchmark: json.load() every time against the cache
+"""
+
+import os         # import os to stat files
+import sys        # import sys to exit with a status code
+import json       # import json to parse the files
+import threading  # import threading for the lock and the in-flight loads
+from collections import OrderedDict  # import OrderedDict for the LRU order
+from types import MappingProxyType  # import MappingProxyType for read-only dicts
+
+
+# ---------- SNAPSHOTS ----------
+def freeze(value):
+    """
+    Return value with every dict made a read-only mapping and every
+    list a tuple, all the way down.
+    """
+    if isinstance(value, dict):
+        return MappingProxyType({key: freeze(v) for key, v in value.items()})
+    if isinstance(value, list):
+        return tuple(freeze(v) for v in value)
+    return value
+
+
+def _parse(data):
+    return freeze(json.loads(data))
+
+
+# ---------- CACHE ----------
+class _Entry:
+    __slots__ = ("value", "mtime", "size")
+
+    def __init__(self, value, mtime, size):
+        self.value = value
+        self.mtime = mtime
+        self.size = size
+
+
+class ProfileCache:
+    """
+    ProfileCache loads JSON files through an LRU table checked against
+    each file's mtime and size. parse turns the file's bytes into the
+    cached value (default: json.loads() and freeze()); pass for example
+    lambda data: model.Profile.decode(json.loads(data)) to cache models.
+    """
+    def __init__(self, max_entries=1024, max_bytes=64 * 1024 * 1024, parse=_parse):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.parse = parse
+        self.entries = OrderedDict()  # path -> _Entry, least recently used first
+        self.bytes = 0                # file sizes of the entries, added up
+        self.lock = threading.Lock()
+        self.loading = {}             # path -> Event of a load in progress
+
+        # counters
+        self.hits = 0       # served from the table
+        self.misses = 0     # not in the table
+        self.reloads = 0    # in the table, but the file had changed
+        self.evictions = 0  # dropped to stay within the limits
+        self.waits = 0      # waited for another thread's load
+
+    @staticmethod
+    def key(path):
+        return os.path.abspath(os.fspath(path))
+
+    def get(self, path):
+        """
+        Return the parsed contents of the file at path, reading it only
+        if it is not cached or changed since. Raises what os.stat(),
+        open() or the parser raise; failures are not cached.
+        """
+        key = self.key(path)
+        while True:
+            st = os.stat(key)
+            with self.lock:
+                entry = self.entries.get(key)
+                if entry is not None:
+                    if entry.mtime == st.st_mtime_ns and entry.size == st.st_size:
+                        self.entries.move_to_end(key)
+                        self.hits += 1
+                        return entry.value
+                    self._remove(key)
+                    self.reloads += 1
+                event = self.loading.get(key)
+                if event is None:
+                    # this thread loads the file; others wait for it
+                    event = self.loading[key] = threading.Event()
+                    if entry is None:
+                        self.misses += 1
+                    break
+                self.waits += 1
+            event.wait()
+            # look again: the other thread's result (or its failure)
+            # is in the table now
+        try:
+            return self._load(key, st)
+        finally:
+            with self.lock:
+                del self.loading[key]
+            event.set()
+
+    def _load(self, key, st):
+        with open(key, "rb") as f:
+            data = f.read()
+        value = self.parse(data)
+        # if the file changed while it was read, hand out what was read
+        # but do not keep it
+        after = os.stat(key)
+        if (after.st_mtime_ns, after.st_size) != (st.st_mtime_ns, len(data)):
+            return value
+        with self.lock:
+            self.entries[key] = _Entry(value, st.st_mtime_ns, len(data))
+            self.bytes += len(data)
+            self._shrink()
+        return value
+
+    def _remove(self, key):
+        # drop one entry; the lock is held
+        entry = self.entries.pop(key)
+        self.bytes -= entry.size
+
+    def _shrink(self):
+        # evict least recently used entries until within the limits;
+        # the newest entry always stays; the lock is held
+        while len(self.entries) > 1 and (len(self.entries) > self.max_entries
+                                         or self.bytes > self.max_bytes):
+            key = next(iter(self.entries))
+            self._remove(key)
+            self.evictions += 1
+
+    def invalidate(self, path=None):
+        """
+        Forget one file, or every file if path is None.
+        """
+        with self.lock:
+            if path is None:
+                self.entries.clear()
+                self.bytes = 0
+            elif self.key(path) in self.entries:
+                self._remove(self.key(path))
+
+    def __len__(self):
+        return len(self.entries)
+
+    # ---------- COUNTERS ----------
+    def stats(self):
+        """
+        Return the counters, the hit rate and the current size as a dict.
+        """
+        with self.lock:
+            lookups = self.hits + self.misses + self.reloads
+            return {
+                "entries": len(self.entries),
+                "bytes": self.bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "reloads": self.reloads,
+                "evictions": self.evictions,
+                "waits": self.waits,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+# ---------- BENCHMARK ----------
+def main(argv=None):
+    """
+    Load file.json many times from several threads: with json.load()
+    each time, then through a ProfileCache. Then load more files than
+    fit, to show the evictions.
+    """
+    import time
+    import shutil
+    import tempfile
+    from concurrent.futures import ThreadPoolExecutor
+
+    argv = sys.argv[1:] if argv is None else argv
+    loads = int(argv[0]) if argv else 20000
+    threads = 4
+
+    def run(load):
+        start = time.perf_counter()
+        with ThreadPoolExecutor(threads) as pool:
+            list(pool.map(lambda _: load("file.json"), range(loads)))
+        return loads / (time.perf_counter() - start)
+
+    def plain(path):
+        with open(path) as f:
+            return json.load(f)
+
+    cache = ProfileCache()
+    print(f"{loads} loads from {threads} threads")
+    print(f"json.load every time: {run(plain):>9.0f} loads/s")
+    print(f"ProfileCache:         {run(cache.get):>9.0f} loads/s  {cache.stats()}")
+
+    # a changed file is read again
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, "profile.json")
+        shutil.copy("file.json", path)
+        cache.get(path)
+        with open(path, "w") as f:
+            json.dump({**plain("file.json"), "age": 26}, f)
+        assert cache.get(path)["age"] == 26
+
+        # more files than entries
+        small = ProfileCache(max_entries=50)
+        for i in range(100):
+            shutil.copy("file.json", os.path.join(folder, f"p{i}.json"))
+        for _ in range(3):
+            for i in range(100):
+                small.get(os.path.join(folder, f"p{i}.json"))
+        print(f"100 files, 50 entries, 3 rounds: {small.stats()}")
+    return 0
+
+
+# run the benchmark only if this script is executed directly
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,463 @@
+"""
+STREAMING JSON READER
+
+json.load() reads the whole document and builds every object in it
+before we can look at a single field, so a profile export with long
+"education" and "work_experience" arrays has to fit in memory twice
+(the text and the objects). This module reads the file in chunks
+instead and hands out values as soon as they are complete:
+
+  - fields(): every top-level field, and the elements of top-level
+    arrays one by one, so a huge array is never built as a whole
+  - select(): only the values at the given paths, such as
+    "education[*].degree"; everything else is skipped without building
+    any objects
+
+Memory stays bounded by the chunk size, the nesting depth and the size
+of the values handed out, not by the size of the file. The source can
+be a file opened in binary or text mode, an mmap, or bytes.
+
+Steps:
+  1. Paths: parse "education[*].degree", match and format paths
+  2. The lexer: read chunks, cut them into tokens
+  3. Building and skipping values
+  4. fields() and select()
+  5. Command line: print the selected values, compare peak memory
+"""
+
+import io      # import io to read bytes like a file
+import codecs  # import codecs to decode UTF-8 chunk by chunk
+import re      # import re to find tokens in the buffer
+import sys     # import sys to exit with a status code
+import json    # import json to decode strings and print values
+
+CHUNK_SIZE = 64 * 1024
+
+
+class StreamError(ValueError):
+    """
+    Raised when the document is not valid JSON; offset is the position
+    (in characters) of the problem in the file.
+    """
+    def __init__(self, message, offset):
+        super().__init__(f"{message} at position {offset}")
+        self.offset = offset
+
+
+# ---------- PATHS ----------
+# wildcards: ANY_INDEX matches every element of an array ("[*]"),
+# ANY_KEY every field of an object (".*")
+ANY_INDEX = "[*]"
+ANY_KEY = ".*"
+
+_PATH_PART = re.compile(r"\[(\d+|\*)\]|\.?([^.\[\]]+)")
+
+
+def parse_path(text):
+    """
+    Turn "education[*].degree" into ("education", ANY_INDEX, "degree").
+    The empty string is the whole document.
+    """
+    parts = []
+    pos = 0
+    while pos < len(text):
+        m = _PATH_PART.match(text, pos)
+        if m is None:
+            raise ValueError(f"bad path {text!r} at {pos}")
+        index, key = m.groups()
+        if index is not None:
+            parts.append(ANY_INDEX if index == "*" else int(index))
+        else:
+            parts.append(ANY_KEY if key == "*" else key)
+        pos = m.end()
+    return tuple(parts)
+
+
+def format_path(path):
+    """
+    Turn ("education", 0, "degree") back into "education[0].degree".
+    """
+    text = ""
+    for part in path:
+        if isinstance(part, int):
+            text += f"[{part}]"
+        else:
+            text += f".{part}" if text else part
+    return text
+
+
+def _match(patterns, path):
+    # "full" if path is one of the patterns, "prefix" if a pattern goes
+    # deeper below path, None if nothing under path is wanted
+    result = None
+    for pattern in patterns:
+        if len(path) > len(pattern):
+            continue
+        for want, part in zip(pattern, path):
+            if want == ANY_INDEX:
+                if not isinstance(part, int):
+                    break
+            elif want == ANY_KEY:
+                if isinstance(part, int):
+                    break
+            elif want != part:
+                break
+        else:
+            if len(path) == len(pattern):
+                return "full"
+            result = "prefix"
+    return result
+
+
+# ---------- LEXER ----------
+# token kinds: the punctuation itself, "str" (strings), "value"
+# (numbers, true, false, null) and "eof"
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+_QUOTED = r'"[^"\\]*(?:\\.[^"\\]*)*"'
+_STRING = re.compile(_QUOTED, re.S)
+_NUMBER = re.compile(r"-?(?:0|[1-9][0-9]*)(?:\.[0-9]+)?(?:[eE][+-]?[0-9]+)?")
+_LITERALS = (("true", True), ("false", False), ("null", None))
+_PUNCTUATION = "{}[]:,"
+# inside an object or array: everything up to the next bracket that
+# changes the depth. Strings (which may hold brackets) and innermost
+# objects and arrays (which hold no brackets) are skipped as a whole.
+# Plain runs are always separated by a string or a bracket, so a match
+# cut off at the end of the buffer cannot backtrack for long.
+_PLAIN = r'[^"\[\]{}]*'
+_INNER = rf'{_PLAIN}(?:{_QUOTED}{_PLAIN})*'
+_FLAT = re.compile(rf'{_PLAIN}(?:(?:{_QUOTED}|\{{{_INNER}\}}|\[{_INNER}\]){_PLAIN})*', re.S)
+_DECODER = json.JSONDecoder()
+
+
+class _Lexer:
+    """
+    _Lexer keeps one chunk of the file (plus the unfinished value before
+    it) as text and cuts it into tokens. Complete objects and arrays are
+    found with a quick scan for strings and brackets and then decoded by
+    the json module in one go.
+    """
+    def __init__(self, source, chunk_size=CHUNK_SIZE):
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            source = io.BytesIO(source)
+        # files, mmaps and BytesIO all have read(n)
+        self.read = source.read
+        self.chunk_size = chunk_size
+        # bytes are decoded chunk by chunk; a character cut in two by a
+        # chunk boundary waits in the decoder for the rest of it
+        self.decoder = codecs.getincrementaldecoder("utf-8")()
+        self.buf = ""
+        self.pos = 0
+        self.offset = 0  # file position (in characters) of buf[0]
+        self.eof = False
+
+    def fill(self):
+        """
+        Drop the text before pos and append the next chunk. Returns
+        False at the end of the file.
+        """
+        while not self.eof:
+            # read at least as much as is left over, so a value longer
+            # than one chunk is found in a few reads instead of one per chunk
+            chunk = self.read(max(self.chunk_size, len(self.buf) - self.pos))
+            if not chunk:
+                self.eof = True
+                if isinstance(chunk, bytes):
+                    self.decoder.decode(b"", final=True)
+                return False
+            if not isinstance(chunk, str):
+                chunk = self.decoder.decode(chunk)
+                if not chunk:
+                    continue
+            self.offset += self.pos
+            self.buf = self.buf[self.pos:] + chunk
+            self.pos = 0
+            return True
+        return False
+
+    def error(self, message, pos=None):
+        return StreamError(message, self.offset + (self.pos if pos is None else pos))
+
+    def peek(self):
+        """
+        Return the next character that is not whitespace ("" at the end).
+        """
+        while True:
+            self.pos = _WHITESPACE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self.fill():
+                return ""
+
+    def next(self, decode=True):
+        """
+        Return the next token as (kind, value). With decode=False strings
+        and numbers are not turned into Python objects (for skipping).
+        """
+        while True:
+            c = self.peek()
+            if not c:
+                return ("eof", None)
+            if c in _PUNCTUATION:
+                self.pos += 1
+                return (c, None)
+            if c == '"':
+                m = _STRING.match(self.buf, self.pos)
+                if m is None:
+                    if self.fill():
+                        continue
+                    raise self.error("unterminated string")
+                if not decode:
+                    self.pos = m.end()
+                    return ("str", None)
+                try:
+                    value, self.pos = json.decoder.scanstring(self.buf, self.pos + 1)
+                except ValueError as e:
+                    raise self.error(f"bad string ({e})") from None
+                return ("str", value)
+            m = _NUMBER.match(self.buf, self.pos)
+            if m:
+                # a number near the end of the buffer may go on in the next
+                # chunk ("1" then ".5", "2e" then "+3")
+                if len(self.buf) - m.end() < 3 and self.fill():
+                    continue
+                self.pos = m.end()
+                if not decode:
+                    return ("value", None)
+                text = m.group()
+                if "." in text or "e" in text or "E" in text:
+                    return ("value", float(text))
+                return ("value", int(text))
+            if len(self.buf) - self.pos < 5 and self.fill():
+                continue
+            for word, value in _LITERALS:
+                if self.buf.startswith(word, self.pos):
+                    self.pos += len(word)
+                    return ("value", value)
+            raise self.error(f"unexpected {c!r}")
+
+    def expect(self, kind):
+        if self.next(decode=False)[0] != kind:
+            raise self.error(f"expected {kind!r}")
+
+    def scan(self, keep=True):
+        """
+        If the next value is an object or an array, read until all of it
+        is in the buffer and return where it ends; return None for other
+        values. With keep=False the text is dropped while scanning, for
+        values that are skipped.
+        """
+        if self.peek() not in ("{", "["):
+            return None
+        depth = 0
+        i = self.pos
+        while True:
+            if depth:
+                i = _FLAT.match(self.buf, i).end()
+            if i < len(self.buf) and self.buf[i] == '"':
+                m = _STRING.match(self.buf, i)
+                end = m and m.end()
+            else:
+                end = i + 1 if i < len(self.buf) else None
+            if end is None:
+                # the value goes on in the next chunk
+                if not keep:
+                    self.pos = i
+                kept = self.pos
+                if not self.fill():
+                    raise self.error("unexpected end of file", i - kept)
+                i -= kept
+                continue
+            c = self.buf[i]
+            if c in "{[":
+                depth += 1
+            elif c in "}]":
+                depth -= 1
+            i = end
+            if depth == 0:
+                return i
+
+    # ---------- VALUES ----------
+    def members(self):
+        """
+        After "{": yield each key; the caller must read or skip its value.
+        """
+        if self.peek() == "}":
+            self.pos += 1
+            return
+        while True:
+            kind, key = self.next()
+            if kind != "str":
+                raise self.error("expected a key")
+            self.expect(":")
+            yield key
+            kind = self.next()[0]
+            if kind == "}":
+                return
+            if kind != ",":
+                raise self.error("expected ',' or '}'")
+
+    def elements(self):
+        """
+        After "[": yield each index; the caller must read or skip the element.
+        """
+        if self.peek() == "]":
+            self.pos += 1
+            return
+        index = 0
+        while True:
+            yield index
+            index += 1
+            kind = self.next()[0]
+            if kind == "]":
+                return
+            if kind != ",":
+                raise self.error("expected ',' or ']'")
+
+    def value(self):
+        """
+        Read and build the next complete value.
+        """
+        end = self.scan()
+        if end is not None:
+            try:
+                value, stop = _DECODER.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError as e:
+                raise self.error(e.msg, e.pos) from None
+            if stop != end:
+                raise self.error("unbalanced brackets", stop)
+            self.pos = end
+            return value
+        kind, value = self.next()
+        if kind not in ("str", "value"):
+            raise self.error("expected a value")
+        return value
+
+    def skip(self):
+        """
+        Read past the next value without building it.
+        """
+        end = self.scan(keep=False)
+        if end is not None:
+            self.pos = end
+        elif self.next(decode=False)[0] not in ("str", "value"):
+            raise self.error("expected a value")
+
+    def end(self):
+        if self.next(decode=False)[0] != "eof":
+            raise self.error("extra data after the document")
+
+
+# ---------- READERS ----------
+def fields(source, chunk_size=CHUNK_SIZE):
+    """
+    Yield (path, value) for every top-level field of the document. A
+    field holding an array is yielded one element at a time, with paths
+    like ("education", 0). If the document itself is an array (an export
+    of many profiles), each profile is yielded as ((index,), profile).
+    """
+    lexer = _Lexer(source, chunk_size)
+    kind = lexer.next()[0]
+    if kind == "[":
+        for index in lexer.elements():
+            yield (index,), lexer.value()
+    elif kind == "{":
+        for key in lexer.members():
+            if lexer.peek() == "[":
+                lexer.pos += 1
+                for index in lexer.elements():
+                    yield (key, index), lexer.value()
+            else:
+                yield (key,), lexer.value()
+    else:
+        raise lexer.error("expected an object or an array")
+    lexer.end()
+
+
+def select(source, *paths, chunk_size=CHUNK_SIZE):
+    """
+    Yield (path, value) for every value whose path matches one of paths
+    ("education[*].degree", "contact.email", "skills[0]"), in file
+    order. Only matching values are built.
+    """
+    patterns = [parse_path(p) if isinstance(p, str) else tuple(p) for p in paths]
+    lexer = _Lexer(source, chunk_size)
+    yield from _walk(lexer, (), patterns)
+    lexer.end()
+
+
+def _walk(lexer, path, patterns):
+    # the lexer is at the start of the value found at path
+    match = _match(patterns, path)
+    if match == "full":
+        yield path, lexer.value()
+        return
+    if match is None:
+        lexer.skip()
+        return
+    kind = lexer.next()[0]
+    if kind == "{":
+        for key in lexer.members():
+            yield from _walk(lexer, path + (key,), patterns)
+    elif kind == "[":
+        for index in lexer.elements():
+            yield from _walk(lexer, path + (index,), patterns)
+    elif kind not in ("str", "value"):
+        raise lexer.error("expected a value")
+
+
+# ---------- COMMAND LINE ----------
+def peak_memory(function):
+    """
+    Run function() and return (result, peak bytes allocated meanwhile).
+    """
+    import tracemalloc
+    tracemalloc.start()
+    try:
+        result = function()
+        return result, tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def main(argv=None):
+    """
+    python jsonstream.py FILE [PATH ...] [--mmap] [--memory]
+
+    Print every selected value (all top-level fields without paths).
+    --memory compares the peak memory with json.load().
+    """
+    import argparse
+    import mmap
+
+    parser = argparse.ArgumentParser(description=main.__doc__.strip().splitlines()[0])
+    parser.add_argument("file")
+    parser.add_argument("paths", nargs="*", help='paths like "education[*].degree"')
+    parser.add_argument("--mmap", action="store_true", help="read through an mmap")
+    parser.add_argument("--memory", action="store_true",
+                        help="compare the peak memory with json.load()")
+    args = parser.parse_args(argv)
+
+    def read(f):
+        source = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if args.mmap else f
+        values = select(source, *args.paths) if args.paths else fields(source)
+        if not args.memory:
+            for path, value in values:
+                print(f"{format_path(path)} = {json.dumps(value)}")
+            return None
+        return sum(1 for _ in values)
+
+    with open(args.file, "rb") as f:
+        if not args.memory:
+            read(f)
+            return 0
+        count, streamed = peak_memory(lambda: read(f))
+        f.seek(0)
+        _, loaded = peak_memory(lambda: json.load(f))
+    print(f"{count} values, peak memory: stream {streamed / 1024:.0f} KB, "
+          f"json.load {loaded / 1024:.0f} KB")
+    return 0
+
+
+# run the command line only if this script is executed directly
+if __name__ == "__main__":
+    sys.exit(main())
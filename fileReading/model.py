@@ -0,0 +1,392 @@
+"""
+PROFILE MODEL
+
+A profile from json.loads() is a tree of dicts: every field name is
+stored again in every profile, every lookup is a hash, and nothing
+checks that "age" is a number until some code trips over it. This
+module describes the shape of file.json once, as classes:
+
+    Profile      name, age, is_student, skills, contact, address,
+                 education, work_experience
+    Contact      email, phone
+    Address      street, city, state, zip
+    Education    degree, institution, year
+    Work         title, company, years
+
+Each class lists its fields in __slots__ and their types in TYPES, so
+an instance is a small fixed block of attributes with no __dict__.
+When a class is defined, Python source for three functions is written
+from that schema and compiled:
+
+  - __init__: assigns every slot
+  - decode(d): reads the known keys of a parsed dict straight into a
+    new instance, checking each type on the way; no loop over the keys
+  - encode(obj): checks every value like decode() and writes the JSON
+    text directly, field by field, with the json module's C string
+    encoder
+
+A value of the wrong type (or a missing field) raises SchemaError with
+the path of the value, like "education[1].year", when decoding and
+when encoding.
+
+Steps:
+  1. SchemaError
+  2. Code generation: __init__, decode() and encode() from TYPES
+  3. The profile classes
+  4. loads(), dumps(), load(), dump()
+  5. Benchmark: memory per profile, decode and encode against plain dicts
+"""
+
+import sys   # import sys to exit with a status code
+import json  # import json to parse text and for its C string encoder
+from json.encoder import encode_basestring_ascii  # import encode_basestring_ascii to write JSON strings
+
+
+class SchemaError(ValueError):
+    """
+    Raised when a document does not match the model; path says where.
+    """
+    def __init__(self, path, message):
+        super().__init__(f"{path or 'profile'}: {message}")
+        self.path = path
+
+
+def _wrong(path, expected, value):
+    # the SchemaError for a value of the wrong type
+    return SchemaError(path, f"expected {expected}, got {type(value).__name__}")
+
+
+# ---------- CODE GENERATION ----------
+# field types in TYPES: str, int, float, bool, a Model class, or a
+# one-element list of one of those for a JSON array ([str], [Education])
+_SCALARS = {str: "str", int: "int", float: "float", bool: "bool"}
+
+
+class _Decoder:
+    """
+    _Decoder writes the body of a decode() function. Nested models and
+    arrays of models are written inline, so decoding a whole profile is
+    one function with no calls per object, and every error path is a
+    constant string (array indexes are filled in only when raising).
+    """
+    def __init__(self, env):
+        self.env = env
+        self.lines = []
+        self.names = 0
+
+    def name(self, prefix):
+        # a fresh local variable
+        self.names += 1
+        return f"{prefix}{self.names}"
+
+    def emit(self, src, kind, path, indent):
+        """
+        Append lines that check the value in variable src against kind;
+        returns the variable that holds the decoded value. path is the
+        text of an f-string naming the value in errors.
+        """
+        pad = " " * indent
+        if isinstance(kind, list):
+            return self.emit_array(src, kind[0], path, indent)
+        if isinstance(kind, type) and issubclass(kind, Model):
+            return self.emit_model(src, kind, path, indent)
+        if kind is float:
+            # JSON does not tell 2 from 2.0, so whole numbers are fine too
+            self.lines.append(f"{pad}if type({src}) is not float:")
+            self.lines.append(f"{pad}    if type({src}) is not int: "
+                              f"raise _wrong(f'{path}', 'float', {src})")
+            self.lines.append(f"{pad}    {src} = float({src})")
+            return src
+        self.lines.append(f"{pad}if type({src}) is not {_SCALARS[kind]}: "
+                          f"raise _wrong(f'{path}', '{_SCALARS[kind]}', {src})")
+        return src
+
+    def emit_array(self, src, item, path, indent):
+        pad = " " * indent
+        self.lines.append(f"{pad}if type({src}) is not list: raise _wrong(f'{path}', 'array', {src})")
+        index, value = self.name("i"), self.name("v")
+        if isinstance(item, type) and issubclass(item, Model):
+            out = self.name("a")
+            self.lines.append(f"{pad}{out} = []")
+            self.lines.append(f"{pad}for {index}, {value} in enumerate({src}):")
+            decoded = self.emit(value, item, f"{path}[{{{index}}}]", indent + 4)
+            self.lines.append(f"{pad}    {out}.append({decoded})")
+            return out
+        self.lines.append(f"{pad}for {index}, {value} in enumerate({src}):")
+        self.emit(value, item, f"{path}[{{{index}}}]", indent + 4)
+        return src
+
+    def emit_model(self, src, cls, path, indent):
+        pad = " " * indent
+        self.env[f"_{cls.__name__}"] = cls
+        prefix = f"{path}." if path else ""
+        self.lines.append(f"{pad}if type({src}) is not dict: "
+                          f"raise _wrong(f'{path}', 'an object', {src})")
+        fields = [self.name("f") for _ in cls.__slots__]
+        self.lines.append(f"{pad}try:")
+        for field, name in zip(fields, cls.__slots__):
+            self.lines.append(f"{pad}    {field} = {src}[{name!r}]")
+        self.lines.append(f"{pad}except KeyError as e:")
+        self.lines.append(f"{pad}    raise SchemaError(f'{prefix}' + e.args[0], 'missing') from None")
+        decoded = [self.emit(field, kind, prefix + name, indent)
+                   for field, name, kind in zip(fields, cls.__slots__, cls.TYPES)]
+        out = self.name("o")
+        self.lines.append(f"{pad}{out} = _new(_{cls.__name__})")
+        for name, value in zip(cls.__slots__, decoded):
+            self.lines.append(f"{pad}{out}.{name} = {value}")
+        return out
+
+
+class _Encoder:
+    """
+    _Encoder writes the body of an encode() function. Every value is
+    checked the way decode() checks it, then written the way json.dumps
+    writes it; a nested model is written by its own encode(), which is
+    given the path so far for its errors.
+    """
+    def __init__(self, env):
+        self.env = env
+        self.lines = []
+        self.names = 0
+
+    name = _Decoder.name
+
+    def emit(self, src, kind, path, indent):
+        """
+        Append lines that check the value in variable src against kind;
+        returns an expression for its JSON text. path is the text of an
+        f-string naming the value in errors.
+        """
+        pad = " " * indent
+        if isinstance(kind, list):
+            return self.emit_array(src, kind[0], path, indent)
+        if isinstance(kind, type) and issubclass(kind, Model):
+            self.env[f"_{kind.__name__}"] = kind
+            self.env[f"_encode_{kind.__name__}"] = kind.encode
+            self.lines.append(f"{pad}if type({src}) is not _{kind.__name__}: "
+                              f"raise _wrong(f'{path}', '{kind.__name__}', {src})")
+            return f"_encode_{kind.__name__}({src}, f'{path}.')"
+        if kind is float:
+            # whole numbers are fine, as in decode(); NaN and infinity
+            # have no JSON form
+            self.lines.append(f"{pad}if type({src}) is not float and type({src}) is not int: "
+                              f"raise _wrong(f'{path}', 'float', {src})")
+            self.lines.append(f"{pad}if {src} != {src} or {src} in _INFINITIES: "
+                              f"raise SchemaError(f'{path}', 'NaN and infinity are not JSON')")
+        else:
+            self.lines.append(f"{pad}if type({src}) is not {_SCALARS[kind]}: "
+                              f"raise _wrong(f'{path}', '{_SCALARS[kind]}', {src})")
+        if kind is str:
+            return f"_string({src})"
+        if kind is bool:
+            return f"('true' if {src} else 'false')"
+        # int and float: repr() is what json.dumps writes
+        return f"repr({src})"
+
+    def emit_array(self, src, item, path, indent):
+        pad = " " * indent
+        self.lines.append(f"{pad}if type({src}) is not list: raise _wrong(f'{path}', 'array', {src})")
+        index, value, out = self.name("i"), self.name("v"), self.name("a")
+        self.lines.append(f"{pad}{out} = []")
+        self.lines.append(f"{pad}for {index}, {value} in enumerate({src}):")
+        text = self.emit(value, item, f"{path}[{{{index}}}]", indent + 4)
+        self.lines.append(f"{pad}    {out}.append({text})")
+        return f"'[' + ','.join({out}) + ']'"
+
+
+def _compile(cls):
+    # write and compile __init__, decode() and encode() for cls
+    names, types = cls.__slots__, cls.TYPES
+    env = {"_wrong": _wrong, "SchemaError": SchemaError, "_string": encode_basestring_ascii,
+           "_INFINITIES": (float("inf"), float("-inf"))}
+
+    lines = [f"def __init__(self, {', '.join(names)}):"]
+    lines += [f"    self.{name} = {name}" for name in names]
+
+    decoder = _Decoder(env)
+    decoder.lines.append("def decode(d):")
+    result = decoder.emit_model("d", cls, "", 4)
+    decoder.lines.append(f"    return {result}")
+    lines += decoder.lines
+
+    encoder = _Encoder(env)
+    encoder.lines.append("def encode(obj, _path=''):")
+    parts = []
+    for i, (name, kind) in enumerate(zip(names, types)):
+        key = ("{" if i == 0 else ",") + json.dumps(name) + ":"
+        value = encoder.name("f")
+        encoder.lines.append(f"    {value} = obj.{name}")
+        parts.append(f"{key!r} + {encoder.emit(value, kind, '{_path}' + name, 4)}")
+    lines += encoder.lines
+    lines.append(f"    return {' + '.join(parts)} + '}}'")
+
+    env["_new"] = object.__new__
+    exec(compile("\n".join(lines), f"<model {cls.__name__}>", "exec"), env)
+    cls.__init__ = env["__init__"]
+    cls.decode = staticmethod(env["decode"])
+    cls.encode = staticmethod(env["encode"])
+    # keep the source around for debugging
+    cls.SOURCE = "\n".join(lines)
+
+
+class Model:
+    """
+    Base class of the profile classes. A subclass sets __slots__ (the
+    field names, in JSON order) and TYPES (their types); the rest is
+    generated when the class is defined.
+    """
+    __slots__ = ()
+    TYPES = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        _compile(cls)
+
+    def to_dict(self):
+        """
+        Return the model as plain dicts and lists.
+        """
+        return json.loads(self.encode(self))
+
+    def __eq__(self, other):
+        if type(other) is not type(self):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    def __repr__(self):
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+
+# ---------- PROFILE ----------
+class Contact(Model):
+    __slots__ = ("email", "phone")
+    TYPES = (str, str)
+
+
+class Address(Model):
+    __slots__ = ("street", "city", "state", "zip")
+    TYPES = (str, str, str, str)
+
+
+class Education(Model):
+    __slots__ = ("degree", "institution", "year")
+    TYPES = (str, str, int)
+
+
+class Work(Model):
+    __slots__ = ("title", "company", "years")
+    TYPES = (str, str, int)
+
+
+class Profile(Model):
+    __slots__ = ("name", "age", "is_student", "skills", "contact", "address",
+                 "education", "work_experience")
+    TYPES = (str, int, bool, [str], Contact, Address, [Education], [Work])
+
+
+# ---------- LOAD AND SAVE ----------
+def loads(text):
+    """
+    Parse JSON text into a Profile, raising SchemaError if it does not fit.
+    """
+    return Profile.decode(json.loads(text))
+
+
+def dumps(profile):
+    """
+    Return the profile as compact JSON text, raising SchemaError if a
+    value has the wrong type.
+    """
+    if type(profile) is not Profile:
+        raise _wrong("", "Profile", profile)
+    return Profile.encode(profile)
+
+
+def load(f):
+    return loads(f.read())
+
+
+def dump(profile, f):
+    f.write(dumps(profile))
+
+
+# ---------- BENCHMARK ----------
+def main(argv=None):
+    """
+    Compare plain dicts from json.loads() with Profile objects: memory
+    per profile, decode (parse and read a few fields), reading fields of
+    loaded profiles, and encode speed.
+    """
+    import time
+    import tracemalloc
+
+    argv = sys.argv[1:] if argv is None else argv
+    count = int(argv[0]) if argv else 20000
+    with open("file.json") as f:
+        template = json.load(f)
+    texts = []
+    for i in range(count):
+        template["name"] = f"Teacher {i}"
+        template["age"] = 20 + i % 45
+        texts.append(json.dumps(template))
+
+    def timed(function):
+        # seconds per profile for function(), and its result
+        start = time.perf_counter()
+        result = function()
+        return (time.perf_counter() - start) / count, result
+
+    def measure(function):
+        # bytes per profile kept alive by the result of function()
+        tracemalloc.start()
+        result = function()
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        return size / count, result
+
+    dict_bytes, dicts = measure(lambda: [json.loads(t) for t in texts])
+    model_bytes, models = measure(lambda: [loads(t) for t in texts])
+    assert [m.to_dict() for m in models[:100]] == dicts[:100]
+
+    def read_dicts():
+        total = 0
+        for t in texts:
+            d = json.loads(t)
+            total += d["age"] + len(d["address"]["city"]) + d["education"][-1]["year"]
+        return total
+
+    def read_models():
+        total = 0
+        for t in texts:
+            p = loads(t)
+            total += p.age + len(p.address.city) + p.education[-1].year
+        return total
+
+    dict_decode, a = timed(read_dicts)
+    model_decode, b = timed(read_models)
+    assert a == b
+    # reading fields of profiles that are already loaded
+    dict_read, a = timed(lambda: sum(d["age"] + len(d["address"]["city"]) + len(d["contact"]["email"])
+                                     + d["education"][-1]["year"] + d["work_experience"][0]["years"]
+                                     for d in dicts))
+    model_read, b = timed(lambda: sum(p.age + len(p.address.city) + len(p.contact.email)
+                                      + p.education[-1].year + p.work_experience[0].years
+                                      for p in models))
+    assert a == b
+    compact = (",", ":")
+    dict_encode, _ = timed(lambda: [json.dumps(d, separators=compact) for d in dicts])
+    model_encode, _ = timed(lambda: [dumps(m) for m in models])
+    assert dumps(models[0]) == json.dumps(dicts[0], separators=compact)
+
+    print(f"{count} profiles{'':<12}{'dicts':>10}{'Profile':>10}")
+    print(f"{'memory / profile':<26}{dict_bytes:>9.0f}B{model_bytes:>9.0f}B")
+    print(f"{'decode + read / s':<26}{1 / dict_decode:>10.0f}{1 / model_decode:>10.0f}")
+    print(f"{'read 5 fields / s':<26}{1 / dict_read:>10.0f}{1 / model_read:>10.0f}")
+    print(f"{'encode / s':<26}{1 / dict_encode:>10.0f}{1 / model_encode:>10.0f}")
+    return 0
+
+
+# run the benchmark only if this script is executed directly
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,4 +1,14 @@
 import json
+from jsonstream import select
+import model
 
-item = json.dump({'name': 'John', 'age': 30}) #convert dictionary to JSON string
+item = json.dumps({'name': 'John', 'age': 30}) #convert dictionary to JSON string
 print(item) #print JSON string
+
+with open('file.json', 'rb') as f: #open the profile file
+    for path, degree in select(f, 'education[*].degree'): #stream only the degrees, without loading the whole file
+        print(degree) #print each degree as soon as it is read
+
+with open('file.json') as f: #open the profile file again
+    profile = model.load(f) #parse it into a checked Profile object
+print(profile.address.city, model.dumps(profile)) #read a field and turn the profile back into JSON
@@ -0,0 +1,369 @@
+"""
+INDEXED PROFILE STORE
+
+Once profiles are loaded they sit in a list of dicts, and finding the
+ones from one city means looking at every one of them. ProfileStore
+keeps them in one file instead, opened with mmap:
+
+  - records: every profile as compact JSON, one after the other
+  - an offset table: where record i starts and ends, so record i is
+    found with one lookup and decoded on its own
+  - secondary indexes, one per field ("name", "address.city",
+    "skills"): the field's values sorted, each with its record number,
+    searched by bisection right in the mapped file
+
+Opening the store reads the header and a short index directory, nothing
+else, so it takes the same time for ten profiles or ten million. A
+lookup reads a few index entries and decodes only the records that
+match; the operating system pages in just the parts of the file that
+are touched.
+
+File layout (numbers little-endian):
+
+    header     magic, record count, where the offsets and the directory are
+    records    compact JSON, back to back
+    offsets    count + 1 u64: start of each record, then the end of the last
+    indexes    per field: u32 entries, u32 key offsets (entries + 1),
+               u32 record numbers, the keys (UTF-8), sorted by key
+    directory  JSON: field -> position of its index
+
+Steps:
+  1. Field values: what gets indexed for a profile
+  2. build(): write records, offsets, indexes and the directory
+  3. ProfileStore: open, record(), find() and get()
+  4. Command line: build, get, and a benchmark against a linear scan
+"""
+
+import os      # import os for file sizes
+import sys     # import sys to exit with a status code
+import json    # import json to encode and decode records
+import mmap    # import mmap to map the store into memory
+import struct  # import struct to read and write the binary tables
+import time    # import time for the benchmark
+
+MAGIC = b"PSTORE1\0"
+# magic, record count, position of the offsets, position of the directory
+HEADER = struct.Struct("<8sIQQ")
+U32 = struct.Struct("<I")
+DEFAULT_FIELDS = ("name", "address.city", "skills")
+
+
+# ---------- FIELD VALUES ----------
+def field_values(profile, field):
+    """
+    Return the values of a dotted field ("address.city") in profile as
+    a list of strings: one for a plain value, one per element for a
+    list ("skills"), none if the field is missing.
+    """
+    value = profile
+    for part in field.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return []
+        value = value[part]
+    values = value if isinstance(value, list) else [value]
+    return [v if isinstance(v, str) else json.dumps(v) for v in values if v is not None]
+
+
+# ---------- BUILD ----------
+def _pad(f):
+    # align the next table to 8 bytes
+    f.write(b"\0" * (-f.tell() % 8))
+
+
+def build(path, profiles, fields=DEFAULT_FIELDS):
+    """
+    Write profiles (any iterable of dicts) to a new store at path,
+    indexed on fields. Returns the number of records. The store is
+    written to a temporary file next to path and moved into place when
+    it is complete, so a failed build never leaves a store behind.
+    """
+    temp = f"{path}.tmp"
+    try:
+        count = _write(temp, profiles, fields)
+    except BaseException:
+        if os.path.exists(temp):
+            os.remove(temp)
+        raise
+    os.replace(temp, path)
+    return count
+
+
+def _write(path, profiles, fields):
+    # write a store to path; the magic goes in last, once it is complete
+    offsets = []
+    entries = {field: [] for field in fields}
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(b"\0" * len(MAGIC), 0, 0, 0))
+        for number, profile in enumerate(profiles):
+            offsets.append(f.tell())
+            f.write(json.dumps(profile, separators=(",", ":"), ensure_ascii=False).encode("utf-8"))
+            for field in fields:
+                # a key listed twice in one profile ("skills") is indexed
+                # once, so find() never returns a record twice
+                for key in dict.fromkeys(field_values(profile, field)):
+                    entries[field].append((key.encode("utf-8"), number))
+        offsets.append(f.tell())
+        count = len(offsets) - 1
+
+        _pad(f)
+        offsets_at = f.tell()
+        f.write(struct.pack(f"<{len(offsets)}Q", *offsets))
+
+        directory = {}
+        for field, pairs in entries.items():
+            # sorted by the UTF-8 bytes, the order the lookups compare in
+            pairs.sort()
+            _pad(f)
+            directory[field] = f.tell()
+            key_offsets = [0]
+            for key, _ in pairs:
+                key_offsets.append(key_offsets[-1] + len(key))
+            f.write(U32.pack(len(pairs)))
+            f.write(struct.pack(f"<{len(key_offsets)}I", *key_offsets))
+            f.write(struct.pack(f"<{len(pairs)}I", *(number for _, number in pairs)))
+            f.write(b"".join(key for key, _ in pairs))
+
+        directory_at = f.tell()
+        f.write(json.dumps(directory).encode("utf-8"))
+        f.seek(0)
+        f.write(HEADER.pack(MAGIC, count, offsets_at, directory_at))
+    return count
+
+
+# ---------- STORE ----------
+class _Index:
+    """
+    _Index reads one field's index in the mapped file.
+    """
+    def __init__(self, data, at):
+        self.data = data
+        self.entries = U32.unpack_from(data, at)[0]
+        self.key_offsets = at + 4
+        self.numbers = self.key_offsets + 4 * (self.entries + 1)
+        self.keys = self.numbers + 4 * self.entries
+
+    def key(self, i):
+        start, end = struct.unpack_from("<II", self.data, self.key_offsets + 4 * i)
+        return self.data[self.keys + start:self.keys + end]
+
+    def bisect(self, key, right=False):
+        # first entry whose key is >= key (> key if right)
+        lo, hi = 0, self.entries
+        while lo < hi:
+            mid = (lo + hi) // 2
+            k = self.key(mid)
+            if k < key or (right and k == key):
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def numbers_between(self, lo, hi):
+        return struct.unpack_from(f"<{hi - lo}I", self.data, self.numbers + 4 * lo)
+
+
+class ProfileStore:
+    """
+    ProfileStore opens a file written by build(). Use it as a context
+    manager, or call close():
+
+        with ProfileStore("profiles.store") as store:
+            for profile in store.get("address.city", "Springfield"):
+                ...
+    """
+    def __init__(self, path):
+        self.file = open(path, "rb")
+        try:
+            self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # an empty file cannot be mapped
+            self.file.close()
+            raise ValueError(f"{path} is not a profile store") from None
+        if self.data[:len(MAGIC)] != MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a profile store")
+        try:
+            _, self.count, self.offsets_at, directory_at = HEADER.unpack_from(self.data, 0)
+            directory = json.loads(self.data[directory_at:])
+            self.indexes = {field: _Index(self.data, at) for field, at in directory.items()}
+        except (struct.error, ValueError, TypeError, AttributeError) as e:
+            self.close()
+            raise ValueError(f"{path} is a damaged profile store ({type(e).__name__}: {e})") from None
+
+    def close(self):
+        self.data.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def fields(self):
+        """
+        The indexed fields.
+        """
+        return list(self.indexes)
+
+    def record(self, number):
+        """
+        Decode and return record number (0 .. len - 1).
+        """
+        if not 0 <= number < self.count:
+            raise IndexError(number)
+        start, end = struct.unpack_from("<QQ", self.data, self.offsets_at + 8 * number)
+        return json.loads(self.data[start:end])
+
+    def _index(self, field):
+        index = self.indexes.get(field)
+        if index is None:
+            raise KeyError(f"{field!r} is not indexed (indexed: {', '.join(self.indexes)})")
+        return index
+
+    def find(self, field, key):
+        """
+        Return the numbers of the records whose field equals key (or, for
+        a list field like "skills", contains it), in record order.
+        """
+        index = self._index(field)
+        key = key.encode("utf-8")
+        lo = index.bisect(key)
+        hi = index.bisect(key, right=True)
+        return index.numbers_between(lo, hi)
+
+    def find_prefix(self, field, prefix):
+        """
+        Like find(), for every key that starts with prefix.
+        """
+        index = self._index(field)
+        prefix = prefix.encode("utf-8")
+        lo = index.bisect(prefix)
+        hi = lo
+        while hi < index.entries and index.key(hi).startswith(prefix):
+            hi += 1
+        # a record can match under several keys ("Py" -> "Python" and
+        # "PyTorch"), so drop the repeats and go back to record order
+        return sorted(set(index.numbers_between(lo, hi)))
+
+    def get(self, field, key):
+        """
+        Return the records whose field equals key, decoding only those.
+        """
+        return [self.record(number) for number in self.find(field, key)]
+
+    def keys(self, field):
+        """
+        Yield every distinct key of field in sorted order with its number
+        of records.
+        """
+        index = self._index(field)
+        i = 0
+        while i < index.entries:
+            key = index.key(i)
+            end = index.bisect(key, right=True)
+            yield key.decode("utf-8"), end - i
+            i = end
+
+    def __iter__(self):
+        for number in range(self.count):
+            yield self.record(number)
+
+
+# ---------- COMMAND LINE ----------
+def _read_profiles(paths):
+    # every profile in paths (files or directories); unreadable files are skipped
+    from bulk import iter_files
+
+    def skip_folder(folder, e):
+        print(f"skipped {folder}: {type(e).__name__}: {e}", file=sys.stderr)
+
+    for path in paths:
+        files = iter_files(path, onerror=skip_folder) if os.path.isdir(path) else [path]
+        for name in files:
+            try:
+                with open(name, "rb") as f:
+                    profile = json.loads(f.read())
+            except (OSError, ValueError, RecursionError) as e:
+                # ValueError covers bad JSON and bad UTF-8, RecursionError
+                # nesting too deep for the parser
+                print(f"skipped {name}: {type(e).__name__}: {e}", file=sys.stderr)
+                continue
+            if isinstance(profile, dict):
+                yield profile
+
+
+def main(argv=None):
+    """
+    python store.py build STORE FILE_OR_DIR ... [--field F ...]
+    python store.py get STORE FIELD KEY
+    python store.py bench STORE FIELD KEY
+
+    Build a store, look up records, or time lookups against a scan.
+    """
+    import argparse
+    parser = argparse.ArgumentParser(description=main.__doc__.strip().splitlines()[-1])
+    commands = parser.add_subparsers(dest="command", required=True)
+    build_cmd = commands.add_parser("build", help="write a store from JSON files")
+    build_cmd.add_argument("store")
+    build_cmd.add_argument("sources", nargs="+", help="profile files or directories")
+    build_cmd.add_argument("--field", action="append", dest="fields",
+                           help=f"field to index (default: {', '.join(DEFAULT_FIELDS)})")
+    for name, text in (("get", "print the matching records"),
+                       ("bench", "time open and lookups against a linear scan")):
+        cmd = commands.add_parser(name, help=text)
+        cmd.add_argument("store")
+        cmd.add_argument("field")
+        cmd.add_argument("key")
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        start = time.perf_counter()
+        count = build(args.store, _read_profiles(args.sources), args.fields or DEFAULT_FIELDS)
+        print(f"{count} records, {os.path.getsize(args.store) / 1e6:.1f} MB "
+              f"in {time.perf_counter() - start:.2f} s")
+        return 0
+
+    if args.command == "get":
+        with ProfileStore(args.store) as store:
+            for profile in store.get(args.field, args.key):
+                print(json.dumps(profile))
+        return 0
+
+    start = time.perf_counter()
+    store = ProfileStore(args.store)
+    opened = time.perf_counter() - start
+    start = time.perf_counter()
+    rounds = 1000
+    for _ in range(rounds):
+        found = store.find(args.field, args.key)
+    find_us = (time.perf_counter() - start) / rounds * 1e6
+    sample = found[:rounds]
+    start = time.perf_counter()
+    decoded = [store.record(number) for number in sample]
+    record_us = (time.perf_counter() - start) / max(len(sample), 1) * 1e6
+    # the alternative: every profile parsed into dicts, then a linear scan
+    start = time.perf_counter()
+    profiles = list(store)
+    parse_s = time.perf_counter() - start
+    start = time.perf_counter()
+    scanned = [p for p in profiles if args.key in field_values(p, args.field)]
+    scan_ms = (time.perf_counter() - start) * 1000
+    store.close()
+    print(f"{len(profiles)} records, {len(found)} match {args.field} = {args.key!r}")
+    print(f"open {opened * 1000:.2f} ms, find {find_us:.1f} us, "
+          f"decode one record {record_us:.1f} us")
+    print(f"parse all {parse_s:.2f} s, linear scan {scan_ms:.1f} ms ({len(scanned)} found)")
+    if decoded != [profiles[number] for number in sample]:
+        print("record mismatch")
+        return 1
+    return 0
+
+
+# run the command line only if this script is executed directly
+if __name__ == "__main__":
+    sys.exit(main())
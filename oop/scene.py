@@ -0,0 +1,179 @@
+# ============================================
+# RETAINED-MODE SCENE FOR Shape / FancyShape
+#
+# oop.py draws every shape right away, one turtle step at a time, and
+# the screen is redrawn after every step. That is nice to watch, but a
+# few thousand shapes take minutes.
+#
+# A Scene only *collects* shapes first (what, where, which color) and
+# draws them all later in one pass:
+#   - turtle tracing is off while drawing, and the screen is updated
+#     once at the end
+#   - shapes are grouped by color, so the pen color changes once per
+#     color instead of once per shape
+#   - every outline is drawn with goto() to precomputed corners, so the
+#     turtle never has to turn
+#
+# Any object with a .size works as a shape (Shape, FancyShape); its
+# .color is used if it has one. This file does not import oop.py,
+# because oop.py starts drawing as soon as it is imported.
+# ============================================
+import math
+import sys
+import time
+from functools import lru_cache
+
+
+# ============================================
+# STEP 1: OUTLINES
+# The corners a shape's drawing method visits, starting at the pen
+# position and facing right (east), as in oop.py
+# ============================================
+# kind -> (number of sides, turn after each side in degrees;
+#          negative turns right like draw_square, positive left like draw_triangle)
+KINDS = {
+    "square": (4, -90),
+    "triangle": (3, 120),
+}
+
+
+@lru_cache(maxsize=None)
+def unit_outline(kind):
+    """
+    Corners of a kind with side 1 starting at (0, 0), closed (the
+    last corner is the first again).
+    """
+    sides, turn = KINDS[kind]
+    x = y = heading = 0.0
+    points = [(0.0, 0.0)]
+    for _ in range(sides):
+        x += math.cos(math.radians(heading))
+        y += math.sin(math.radians(heading))
+        # rounding keeps exact corners exact (and turns -0.0 into 0.0)
+        points.append((round(x, 12) + 0.0, round(y, 12) + 0.0))
+        heading += turn
+    return tuple(points)
+
+
+def outline(kind, x, y, size):
+    """
+    Corners of a shape of this kind and size drawn from (x, y).
+    """
+    return [(x + px * size, y + py * size) for px, py in unit_outline(kind)]
+
+
+# ============================================
+# STEP 2: THE SCENE
+# Shapes are kept grouped by color: color -> list of (kind, x, y, size)
+# ============================================
+class Scene:
+    def __init__(self, default_color="black"):
+        self.default_color = default_color
+        self.groups = {}
+        self.count = 0
+
+    def add(self, shape, kind, x, y, color=None):
+        # remember one shape; nothing is drawn yet
+        if kind not in KINDS:
+            raise ValueError(f"unknown kind {kind!r}, use one of {sorted(KINDS)}")
+        if color is None:
+            color = getattr(shape, "color", None) or self.default_color
+        self.groups.setdefault(color, []).append((kind, x, y, shape.size))
+        self.count += 1
+
+    def add_square(self, shape, x, y, color=None):
+        self.add(shape, "square", x, y, color)
+
+    def add_triangle(self, shape, x, y, color=None):
+        self.add(shape, "triangle", x, y, color)
+
+    def clear(self):
+        self.groups.clear()
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def outlines(self):
+        # yield (color, list of outlines) for each color group
+        for color, items in self.groups.items():
+            yield color, [outline(kind, x, y, size) for kind, x, y, size in items]
+
+    # ============================================
+    # STEP 3: RENDER WITH TURTLE
+    # Tracing off, one color change per group, one update at the end
+    # ============================================
+    def render(self, pen, screen):
+        """
+        Draw every shape with pen and return the seconds it took. The
+        previous tracer setting is restored afterwards.
+        """
+        start = time.perf_counter()
+        tracing = screen.tracer()
+        screen.tracer(0)
+        visible = pen.isvisible()
+        pen.hideturtle()
+        pen.speed(0)
+        pen.penup()
+        try:
+            for color, shapes in self.outlines():
+                pen.pencolor(color)
+                for points in shapes:
+                    pen.goto(points[0])
+                    pen.pendown()
+                    for point in points[1:]:
+                        pen.goto(point)
+                    pen.penup()
+            screen.update()
+        finally:
+            screen.tracer(tracing)
+            if visible:
+                pen.showturtle()
+        return time.perf_counter() - start
+
+
+# ============================================
+# STEP 4: TRY IT
+# python scene.py [N] draws N random shapes and prints the time
+# ============================================
+class _Size:
+    # a stand-in shape: just a size and a color, like FancyShape
+    def __init__(self, size, color=None):
+        self.size = size
+        self.color = color
+
+
+def random_scene(count, seed=0):
+    """
+    A scene of count squares and triangles in a few colors.
+    """
+    import random
+    rng = random.Random(seed)
+    colors = ["black", "blue", "red", "green", "orange", "purple"]
+    scene = Scene()
+    for _ in range(count):
+        shape = _Size(rng.randint(5, 40), rng.choice(colors))
+        kind = rng.choice(("square", "triangle"))
+        scene.add(shape, kind, rng.uniform(-300, 260), rng.uniform(-260, 300))
+    return scene
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    count = int(argv[0]) if argv else 10000
+    scene = random_scene(count)
+    try:
+        import turtle
+        screen = turtle.Screen()
+    except Exception as e:  # no tkinter, or no display
+        print(f"turtle is not available here ({e})")
+        return 1
+    pen = turtle.Turtle()
+    seconds = scene.render(pen, screen)
+    print(f"{len(scene)} shapes in {len(scene.groups)} colors drawn in {seconds:.2f} s")
+    turtle.done()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
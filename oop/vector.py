@@ -0,0 +1,405 @@
+# ============================================
+# HEADLESS VECTOR BACKEND FOR Shape / FancyShape
+#
+# The shapes in oop.py can only draw through a turtle, and a turtle
+# needs tkinter and a window. A Canvas draws without either:
+#   - shapes become polygons (arrays of corners); the corners of a
+#     regular shape with n sides are computed once for side 1 at (0, 0)
+#     and cached, and every shape of that kind is that array scaled and
+#     moved, for thousands of shapes in one NumPy expression
+#   - the whole scene is exported at once, to SVG text (one <path> per
+#     color) or to an RGB array in memory (and from there to PNG)
+#
+# Two ways in:
+#   - canvas.draw_shape(shape, "square", x, y) or canvas.add_many(...)
+#     for shapes drawn from code, and canvas.add_scene(scene) for a
+#     scene.Scene
+#   - canvas.pen(): a stand-in turtle for Shape(t, size); draw_square,
+#     draw_triangle and FancyShape's color work on it unchanged
+#
+# Nothing here imports turtle or tkinter.
+# ============================================
+import sys
+import math
+import time
+import zlib
+import struct
+from functools import lru_cache
+
+import numpy as np
+
+from scene import KINDS
+
+
+# ============================================
+# STEP 1: THE UNIT N-GON
+# Corners of a shape with side 1 drawn from (0, 0) facing right; turn
+# is the turtle's turn after each side (negative = right)
+# ============================================
+@lru_cache(maxsize=None)
+def unit_ngon(sides, turn=None):
+    """
+    A read-only (sides + 1, 2) array of corners; the last is the first
+    again. turn defaults to a left turn that closes the shape.
+    """
+    if turn is None:
+        turn = 360.0 / sides
+    headings = np.radians(np.arange(sides) * turn)
+    steps = np.stack([np.cos(headings), np.sin(headings)], axis=1)
+    corners = np.vstack([np.zeros((1, 2)), np.cumsum(steps, axis=0)])
+    # rounding keeps exact corners exact (and -0.0 becomes 0.0)
+    corners = np.round(corners, 12) + 0.0
+    corners.flags.writeable = False
+    return corners
+
+
+def polygons(sides, xs, ys, sizes, turn=None):
+    """
+    Corners of many shapes with the same number of sides at once: an
+    (n, sides + 1, 2) array for the starting points xs, ys and sizes.
+    Raises ValueError for a position or size that is NaN or infinite.
+    """
+    unit = unit_ngon(sides, turn)
+    origins = np.stack([np.asarray(xs, float), np.asarray(ys, float)], axis=-1)
+    sizes = np.asarray(sizes, float)
+    if not (np.isfinite(origins).all() and np.isfinite(sizes).all()):
+        raise ValueError("shape positions and sizes must be finite numbers")
+    return origins[:, None, :] + sizes[:, None, None] * unit[None, :, :]
+
+
+def clip_segments(starts, ends, width, height):
+    """
+    Cut the segments starts[i] -> ends[i] to the rectangle 0 .. width,
+    0 .. height (Liang-Barsky, all segments at once). Returns the new
+    starts and ends of the segments that touch it; the rest are dropped.
+    """
+    delta = ends - starts
+    low = np.zeros(len(starts))
+    high = np.ones(len(starts))
+    keep = np.isfinite(starts).all(axis=1) & np.isfinite(ends).all(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for p, q in ((-delta[:, 0], starts[:, 0]), (delta[:, 0], width - starts[:, 0]),
+                     (-delta[:, 1], starts[:, 1]), (delta[:, 1], height - starts[:, 1])):
+            # parallel to this edge: kept only if on the inside of it
+            keep &= (p != 0) | (q >= 0)
+            t = q / p
+            low = np.where(p < 0, np.maximum(low, t), low)
+            high = np.where(p > 0, np.minimum(high, t), high)
+    keep &= low <= high
+    starts, delta, low, high = starts[keep], delta[keep], low[keep], high[keep]
+    return starts + delta * low[:, None], starts + delta * high[:, None]
+
+
+# ============================================
+# STEP 2: COLORS
+# The turtle color names used in this folder, "#rrggbb", or (r, g, b):
+# 0 .. 255 ints, or 0 .. 1 floats as with turtle's colormode(1.0)
+# ============================================
+COLORS = {
+    "black": (0, 0, 0), "white": (255, 255, 255), "red": (255, 0, 0),
+    "green": (0, 128, 0), "blue": (0, 0, 255), "yellow": (255, 255, 0),
+    "orange": (255, 165, 0), "purple": (160, 32, 240), "gray": (190, 190, 190),
+    "grey": (190, 190, 190), "pink": (255, 192, 203), "brown": (165, 42, 42),
+}
+
+
+def rgb(color):
+    if (isinstance(color, (tuple, list)) and len(color) == 3
+            and all(isinstance(c, (int, float)) and not isinstance(c, bool) for c in color)):
+        # 0 .. 1 with a float in it, like (1, 0.5, 0), is colormode 1.0;
+        # whole numbers up to 255 are colormode 255
+        if all(0 <= c <= 1 for c in color) and any(isinstance(c, float) for c in color):
+            return tuple(round(c * 255) for c in color)
+        if all(0 <= c <= 255 for c in color):
+            return tuple(int(c) for c in color)
+    elif isinstance(color, str):
+        if color.startswith("#") and len(color) == 7:
+            try:
+                return tuple(int(color[i:i + 2], 16) for i in (1, 3, 5))
+            except ValueError:
+                pass
+        elif color in COLORS:
+            return COLORS[color]
+    raise ValueError(f"unknown color {color!r}, use a name from COLORS, "
+                     f"'#rrggbb' or (r, g, b)")
+
+
+def svg_color(color):
+    return "#%02x%02x%02x" % rgb(color)
+
+
+# ============================================
+# STEP 3: THE CANVAS
+# Polygons grouped by color: color -> list of (n, k, 2) arrays
+# ============================================
+class Canvas:
+    def __init__(self, width=800, height=600, background="white", default_color="black"):
+        # turtle coordinates: (0, 0) in the middle, y going up
+        rgb(background), rgb(default_color)
+        self.width = width
+        self.height = height
+        self.background = background
+        self.default_color = default_color
+        self.groups = {}
+        self.count = 0
+
+    def add_polygons(self, corners, color):
+        # add an (n, k, 2) array of outlines in one color; a color rgb()
+        # does not know fails here, not later in the export
+        rgb(color)
+        if isinstance(color, list):
+            color = tuple(color)
+        self.groups.setdefault(color, []).append(corners)
+        self.count += len(corners)
+
+    def draw_shape(self, shape, shape_type, x=0.0, y=0.0, color=None):
+        # the headless draw_shape: remember one Shape / FancyShape at (x, y)
+        sides, turn = KINDS[shape_type]
+        if color is None:
+            color = getattr(shape, "color", None) or self.default_color
+        self.add_polygons(polygons(sides, [x], [y], [shape.size], turn), color)
+
+    def add_many(self, shape_type, xs, ys, sizes, color=None):
+        # many shapes of one kind and color, in one NumPy expression
+        sides, turn = KINDS[shape_type]
+        self.add_polygons(polygons(sides, xs, ys, sizes, turn), color or self.default_color)
+
+    def add_scene(self, scene):
+        # every shape of a scene.Scene, one array per color and kind
+        for color, items in scene.groups.items():
+            by_kind = {}
+            for kind, x, y, size in items:
+                by_kind.setdefault(kind, []).append((x, y, size))
+            for kind, rows in by_kind.items():
+                xs, ys, sizes = np.array(rows, float).T
+                self.add_many(kind, xs, ys, sizes, color)
+
+    def pen(self):
+        # a stand-in turtle that draws on this canvas
+        return VectorPen(self)
+
+    def __len__(self):
+        return self.count
+
+    def blocks(self):
+        # yield (color, (n, k, 2) array in screen pixels, y going down)
+        offset = np.array([self.width / 2, self.height / 2])
+        flip = np.array([1.0, -1.0])
+        for color, arrays in self.groups.items():
+            for corners in arrays:
+                yield color, corners * flip + offset
+
+    # ============================================
+    # STEP 4: SVG
+    # One <path> per color, all of its outlines in one "d" attribute
+    # ============================================
+    def to_svg(self):
+        parts = [f'<svg xmlns="http://www.w3.org/2000/svg" width="{self.width}" '
+                 f'height="{self.height}" viewBox="0 0 {self.width} {self.height}">',
+                 f'<rect width="100%" height="100%" fill="{svg_color(self.background)}"/>']
+        paths = {}
+        for color, corners in self.blocks():
+            n, k, _ = corners.shape
+            # one %-format for the whole block: "M x y L x y ... " per outline
+            template = ("M%.2f %.2f" + " L%.2f %.2f" * (k - 1) + " ") * n
+            paths.setdefault(color, []).append(template % tuple(corners.ravel().tolist()))
+        for color, d in paths.items():
+            parts.append(f'<path fill="none" stroke="{svg_color(color)}" d="{"".join(d).strip()}"/>')
+        parts.append("</svg>")
+        return "\n".join(parts)
+
+    def save_svg(self, path):
+        with open(path, "w") as f:
+            f.write(self.to_svg())
+
+    # ============================================
+    # STEP 5: RASTER
+    # Every side becomes a run of pixels, all sides of a color at once
+    # ============================================
+    def to_array(self):
+        """
+        Draw everything into a new (height, width, 3) uint8 RGB array.
+        """
+        image = np.empty((self.height, self.width, 3), np.uint8)
+        image[:] = rgb(self.background)
+        for color, corners in self.blocks():
+            # only the visible part of each side is sampled, so a huge or
+            # far-away shape costs no more than one that fills the screen
+            starts, ends = clip_segments(corners[:, :-1].reshape(-1, 2),
+                                         corners[:, 1:].reshape(-1, 2),
+                                         self.width, self.height)
+            delta = ends - starts
+            # one sample per pixel along the longer axis of each side
+            steps = np.ceil(np.abs(delta).max(axis=1)).astype(np.int64) + 1
+            side = np.repeat(np.arange(len(steps)), steps)
+            # position of each sample within its side: 0 .. steps - 1
+            first = np.cumsum(steps) - steps
+            t = (np.arange(side.size) - first[side]) / np.maximum(steps - 1, 1)[side]
+            points = np.rint(starts[side] + delta[side] * t[:, None]).astype(np.int64)
+            x, y = points[:, 0], points[:, 1]
+            inside = (x >= 0) & (x < self.width) & (y >= 0) & (y < self.height)
+            image[y[inside], x[inside]] = rgb(color)
+        return image
+
+    def to_png(self):
+        """
+        The raster as PNG file contents (no compression library needed
+        beyond zlib).
+        """
+        image = self.to_array()
+        # every row starts with filter type 0 (none)
+        rows = np.concatenate([np.zeros((self.height, 1), np.uint8),
+                               image.reshape(self.height, -1)], axis=1)
+
+        def chunk(kind, data):
+            return (struct.pack(">I", len(data)) + kind + data
+                    + struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF))
+
+        header = struct.pack(">IIBBBBB", self.width, self.height, 8, 2, 0, 0, 0)
+        return (b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header)
+                + chunk(b"IDAT", zlib.compress(rows.tobytes(), 6)) + chunk(b"IEND", b""))
+
+    def save_png(self, path):
+        with open(path, "wb") as f:
+            f.write(self.to_png())
+
+
+# ============================================
+# STEP 6: A STAND-IN TURTLE
+# Enough of turtle.Turtle for the drawing methods in oop.py
+# ============================================
+class VectorPen:
+    def __init__(self, canvas):
+        self.canvas = canvas
+        self.x = self.y = 0.0
+        self.angle = 0.0
+        self.pen_down = True
+        self.pen_color = canvas.default_color
+        self.line = [(0.0, 0.0)]
+
+    def flush(self):
+        # hand the line drawn so far to the canvas
+        if len(self.line) > 1:
+            self.canvas.add_polygons(np.array([self.line]), self.pen_color)
+        self.line = [(self.x, self.y)]
+
+    def goto(self, x, y=None):
+        if y is None:
+            x, y = x
+        self.x, self.y = float(x), float(y)
+        if self.pen_down:
+            self.line.append((self.x, self.y))
+        else:
+            self.line = [(self.x, self.y)]
+
+    def forward(self, distance):
+        self.goto(self.x + distance * math.cos(math.radians(self.angle)),
+                  self.y + distance * math.sin(math.radians(self.angle)))
+
+    def backward(self, distance):
+        self.forward(-distance)
+
+    def left(self, angle):
+        self.angle = (self.angle + angle) % 360
+
+    def right(self, angle):
+        self.left(-angle)
+
+    def setheading(self, angle):
+        self.angle = angle % 360
+
+    def heading(self):
+        return self.angle
+
+    def position(self):
+        return (self.x, self.y)
+
+    def penup(self):
+        self.flush()
+        self.pen_down = False
+
+    def pendown(self):
+        # a second pendown() must not cut the line being drawn
+        if not self.pen_down:
+            self.line = [(self.x, self.y)]
+        self.pen_down = True
+
+    def color(self, *args):
+        # color(c) and pencolor(c) both set the line color here, and so
+        # do color(r, g, b) and color(pen, fill)
+        if not args:
+            return self.pen_color, self.pen_color
+        color = args if len(args) == 3 else args[0]
+        rgb(color)
+        self.flush()
+        self.pen_color = color
+
+    pencolor = color
+    fd, bk, lt, rt = forward, backward, left, right
+    setpos = setposition = goto
+    pos = position
+    up = pu = penup
+    down = pd = pendown
+
+    def speed(self, *args):
+        return 0
+
+    def hideturtle(self):
+        pass
+
+    def showturtle(self):
+        pass
+
+    def isvisible(self):
+        return False
+
+    def done(self):
+        # call when finished, so the last line reaches the canvas
+        self.flush()
+
+
+# ============================================
+# STEP 7: BENCHMARK
+# python vector.py [N] times N shapes: corners, SVG and raster
+# ============================================
+def main(argv=None):
+    from scene import random_scene, outline
+
+    argv = sys.argv[1:] if argv is None else argv
+    count = int(argv[0]) if argv else 100000
+    scene = random_scene(count)
+
+    def rate(function, repeat=3):
+        # shapes per second of the best of repeat runs
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = function()
+            best = min(best, time.perf_counter() - start)
+        return count / best, result
+
+    def python_corners():
+        return [outline(kind, x, y, size) for items in scene.groups.values()
+                for kind, x, y, size in items]
+
+    def numpy_corners():
+        canvas = Canvas()
+        canvas.add_scene(scene)
+        return canvas
+
+    py_rate, _ = rate(python_corners)
+    np_rate, canvas = rate(numpy_corners)
+    svg_rate, svg = rate(canvas.to_svg)
+    raster_rate, _ = rate(canvas.to_array)
+    png_rate, png = rate(canvas.to_png, repeat=1)
+    print(f"{count} shapes")
+    print(f"{'corners, plain Python':<24}{py_rate:>12.0f} shapes/s")
+    print(f"{'corners, NumPy':<24}{np_rate:>12.0f} shapes/s")
+    print(f"{'SVG export':<24}{svg_rate:>12.0f} shapes/s  ({len(svg) / 1e6:.1f} MB)")
+    print(f"{'raster 800x600':<24}{raster_rate:>12.0f} shapes/s")
+    print(f"{'PNG export':<24}{png_rate:>12.0f} shapes/s  ({len(png) / 1e3:.0f} KB)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
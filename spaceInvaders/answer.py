@@ -5,21 +5,38 @@ Steps:
   1. Import modules and define screen size
   2. Image loader + Assets class
   3. Player / Bullet / Alien sprite classes
-  4. Game over screen
-  5. Main game loop:
-       - window, assets, sprites
-       - input, spawning, updates, collisions
-       - drawing and game over
+  4. Game class: spawning, updates, collisions, drawing
+  5. Pause and game over screens
+  6. Main game loop:
+       - window, assets, game
+       - input, fixed-rate game ticks, draw between ticks
+       - game over
 """
 
 import pygame  # import pygame for graphics, input, and game loop
 import sys     # import sys to allow a clean program exit
+import os      # import os to build file paths next to this script
 import random  # import random for random alien speeds and positions
 
+import hud     # import hud to reuse rendered score / lives text (hud.py)
+from profiler import FrameProfiler, NullProfiler  # frame timing (profiler.py)
+from timestep import FixedTimestep, snapshot, interpolated  # fixed ticks (timestep.py)
+from idle import IdleLoop  # sleep instead of spinning when nothing changes (idle.py)
+
 
 # ---------- CONFIG ----------
 # define WIDTH and HEIGHT as the size of the game window
 WIDTH, HEIGHT = 800, 600
+# aliens appear at SPAWN_Y (just above the screen), at least SPAWN_MARGIN
+# pixels from either side, fall ALIEN_SPEED_MIN to ALIEN_SPEED_MAX pixels
+# per frame and are worth ALIEN_POINTS when shot (vec_env.py reads these)
+SPAWN_Y = -60
+SPAWN_MARGIN = 50
+ALIEN_SPEED_MIN, ALIEN_SPEED_MAX = 2, 5
+ALIEN_POINTS = 10
+# folder that holds the images, found next to this file so the game
+# can be started from any working directory
+ASSET_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets")
 
 
 # ---------- ASSET LOADING ----------
@@ -40,22 +57,62 @@ def load_image(path, scale=None):
 class Assets:
     """
     Assets class stores all loaded images so we only load them once.
+    The player, laser and alien images come from a pre-scaled texture
+    atlas cached on disk (asset_cache.py) and are only loaded the first
+    time one of them is used.
     """
+    # name -> (file name, size in pixels) of every image in the atlas
+    IMAGES = {
+        "player": ("player.png", (64, 64)),  # the player at 64x64 pixels
+        "laser": ("laser.png", (16, 32)),    # the laser (bullet) at 16x32 pixels
+        "alien": ("alien.png", (48, 48)),    # the alien at 48x48 pixels
+    }
+
     def __init__(self):
-        # load the player image at size 64x64 pixels
-        self.player = load_image("assets/player.png", (64, 64))
-        # load the laser (bullet) image at size 16x32 pixels
-        self.laser = load_image("assets/laser.png", (16, 32))
-        # load the alien image at size 48x48 pixels
-        self.alien = load_image("assets/alien.png", (48, 48))
+        # the atlas images, loaded on first use (see image())
+        self.images = None
+        # image -> collision mask, built on first use (see mask())
+        self.masks = {}
 
         # try to load the background image and scale to full screen
         try:
-            self.background = load_image("assets/background.png", (WIDTH, HEIGHT))
+            self.background = load_image(os.path.join(ASSET_DIR, "background.png"), (WIDTH, HEIGHT))
         # if loading fails (file not found, etc.), set background to None
         except:
             self.background = None
 
+    def image(self, name):
+        """
+        Return one atlas image, loading the atlas the first time.
+        """
+        if self.images is None:
+            import asset_cache
+            self.images = asset_cache.load_atlas(ASSET_DIR, self.IMAGES)
+        return self.images[name]
+
+    def mask(self, image):
+        """
+        Return the collision mask (which pixels are not transparent) of
+        an image. It is built once per image and shared by every sprite
+        that uses that image.
+        """
+        mask = self.masks.get(image)
+        if mask is None:
+            mask = self.masks[image] = pygame.mask.from_surface(image)
+        return mask
+
+    @property
+    def player(self):
+        return self.image("player")
+
+    @property
+    def laser(self):
+        return self.image("laser")
+
+    @property
+    def alien(self):
+        return self.image("alien")
+
 
 # ---------- SPRITES ----------
 class Player(pygame.sprite.Sprite):
@@ -129,7 +186,7 @@ class Alien(pygame.sprite.Sprite):
     """
     Alien sprite: falls from the top of the screen toward the bottom.
     """
-    def __init__(self, assets, x, y):
+    def __init__(self, assets, x, y, rng=random, speed_y=None):
         # call the parent sprite constructor
         super().__init__()
         # use the alien image from the assets
@@ -140,8 +197,9 @@ class Alien(pygame.sprite.Sprite):
         self.rect.x = x
         # set its starting y position
         self.rect.y = y
-        # choose a random downward speed between 2 and 5
-        self.speed_y = random.randint(2, 5)
+        # choose a random downward speed between 2 and 5, unless a speed
+        # was given (rng is the random module unless the game was given a seed)
+        self.speed_y = rng.randint(ALIEN_SPEED_MIN, ALIEN_SPEED_MAX) if speed_y is None else speed_y
 
     def update(self, *args):
         """
@@ -155,21 +213,244 @@ class Alien(pygame.sprite.Sprite):
             self.kill()
 
 
+# ---------- GAME ----------
+class Game:
+    """
+    Game class keeps the sprites, score and lives of one game together,
+    so the same rules can run in a window or headless (without a window).
+    """
+    def __init__(self, assets, broadphase=False, seed=None, pixel_perfect=False, waves=None):
+        # keep the assets so new bullets and aliens can use the images
+        self.assets = assets
+        # random numbers for alien positions and speeds: a private
+        # generator when a seed is given (so a game can be replayed
+        # exactly), otherwise the shared random module
+        self.rng = random.Random(seed) if seed is not None else random
+        # create the player sprite using the loaded assets
+        self.player = Player(assets)
+
+        # choose how collisions are found: pygame checks every pair,
+        # the spatial hash (spatial_hash.py) only checks nearby sprites
+        if broadphase:
+            import spatial_hash
+            collision_group = spatial_hash.SpatialGroup
+            self.groupcollide = spatial_hash.groupcollide
+            self.spritecollide = spatial_hash.spritecollide
+        else:
+            collision_group = pygame.sprite.Group
+            self.groupcollide = pygame.sprite.groupcollide
+            self.spritecollide = pygame.sprite.spritecollide
+
+        # only count hits where non-transparent pixels touch: the rect
+        # checks above still run first, the masks only decide about the
+        # pairs whose rects overlap (mask_collide.py)
+        if pixel_perfect:
+            import mask_collide
+            self.groupcollide, self.spritecollide = mask_collide.pixel_perfect(
+                assets, self.groupcollide, self.spritecollide)
+
+        # create sprite groups for organizing sprites
+        self.all_sprites = pygame.sprite.Group()
+        self.bullets = collision_group()
+        self.aliens = collision_group()
+        # add the player to the all_sprites group
+        self.all_sprites.add(self.player)
+
+        # initialize score and lives
+        self.score = 0
+        self.lives = 3
+
+        # set up variables used to spawn aliens periodically
+        self.spawn_timer = 0          # current frame count since last alien spawn
+        self.spawn_interval = 40      # number of frames between spawns
+
+        # or spawn the aliens from a wave file (waves.py): waves is the
+        # file name, the parsed file or an already compiled waves.Timeline
+        self.waves = None
+        if waves is not None:
+            import waves as wave_module
+            if isinstance(waves, str):
+                waves = wave_module.load_waves(waves, self.rng)
+            elif isinstance(waves, dict):
+                waves = wave_module.compile_waves(waves, self.rng)
+            self.waves = wave_module.WaveScheduler(waves)
+
+        # flag that turns False when the player runs out of lives
+        self.running = True
+
+    def fire(self):
+        """
+        Shoot two bullets from the top of the player.
+        """
+        # create a new bullet at the top-center of the player
+        bullet = Bullet(self.assets, self.player.rect.centerx, self.player.rect.top)
+        bullet2 = Bullet(self.assets, self.player.rect.x, self.player.rect.top)
+        # add the bullets to all_sprites so they are updated and drawn
+        self.all_sprites.add(bullet)
+        self.all_sprites.add(bullet2)
+        # also add them to bullets group for collision handling
+        self.bullets.add(bullet)
+        self.bullets.add(bullet2)
+
+    def spawn_aliens(self):
+        """
+        Spawn the aliens due this frame: the wave scheduler's batch if the
+        game has one, otherwise a new alien every spawn_interval frames.
+        """
+        # with waves, the compiled timeline says what spawns this frame
+        if self.waves is not None:
+            batch = self.waves.advance()
+            if batch:
+                self.add_aliens(batch)
+            return
+
+        # increment spawn_timer each frame
+        self.spawn_timer += 1
+        # if enough frames have passed, spawn a new alien
+        if self.spawn_timer >= self.spawn_interval:
+            # reset spawn_timer back to 0
+            self.spawn_timer = 0
+            # choose a random x position within the screen (with margins)
+            x = self.rng.randint(SPAWN_MARGIN, WIDTH - SPAWN_MARGIN)
+            # and a random downward speed between 2 and 5
+            speed = self.rng.randint(ALIEN_SPEED_MIN, ALIEN_SPEED_MAX)
+            # create an alien just above the top of the screen
+            self.add_aliens(((x, SPAWN_Y, speed),))
+
+    def add_aliens(self, batch):
+        """
+        Create one alien for every (x, y, speed) in batch.
+        """
+        for x, y, speed in batch:
+            alien = Alien(self.assets, x, y, speed_y=speed)
+            # add the alien to the all_sprites group
+            self.all_sprites.add(alien)
+            # also add to the aliens group for collision checks
+            self.aliens.add(alien)
+
+    def update(self, keys):
+        """
+        Update all sprites; the player responds to keys, others ignore them.
+        """
+        self.all_sprites.update(keys)
+
+    def check_collisions(self):
+        """
+        Remove aliens hit by bullets, add score, and take lives on contact.
+        """
+        # bullet vs alien collisions:
+        # groupcollide returns a dict of aliens hit and bullets involved
+        hits = self.groupcollide(self.aliens, self.bullets, True, True)
+        # if hits is not empty, at least one alien was destroyed
+        if hits:
+            # increase score by 10 points per alien hit
+            self.score += len(hits) * ALIEN_POINTS
+
+        # alien vs player collisions:
+        # spritecollide returns a list of aliens that collided with the player
+        player_hits = self.spritecollide(self.player, self.aliens, True)
+        # if the list is not empty, the player has been hit
+        if player_hits:
+            # reduce the number of lives by 1
+            self.lives -= 1
+            # if the player has no more lives, end the game
+            if self.lives <= 0:
+                self.running = False
+
+    def step(self, keys):
+        """
+        Run one frame of game rules: spawning, updates and collisions.
+        """
+        self.spawn_aliens()
+        self.update(keys)
+        self.check_collisions()
+
+    def draw(self, screen, font):
+        """
+        Draw the background, all sprites and the score / lives text.
+        """
+        # if a background image is available, draw it
+        if self.assets.background:
+            screen.blit(self.assets.background, (0, 0))
+        # otherwise, just fill the screen with black
+        else:
+            screen.fill((0, 0, 0))
+
+        # draw all sprites (player, bullets, aliens) onto the screen
+        self.all_sprites.draw(screen)
+
+        # draw the score and lives on top
+        self.draw_hud(screen, font)
+
+    def draw_hud(self, screen, font):
+        """
+        Draw the score and lives text and return the rects drawn.
+        """
+        # get the cached text surfaces for this font; they are only
+        # rebuilt when the score or lives actually change
+        cache = hud.cache_for(font)
+        # a text surface showing the current score
+        score_text = cache.counter("Score: ", self.score, (255, 255, 255))
+        # a text surface showing remaining lives
+        lives_text = cache.counter("Lives: ", self.lives, (255, 255, 255))
+        # draw the score at the top-left corner
+        score_rect = screen.blit(score_text, (10, 10))
+        # draw the lives text near the top-right corner
+        lives_rect = screen.blit(lives_text, (WIDTH - 120, 10))
+        # tell the caller which parts of the screen changed
+        return [score_rect, lives_rect]
+
+
+# ---------- PAUSE ----------
+def pause_screen(screen, font, idle, reason):
+    """
+    Dim the screen, show that the game is paused and sleep until it
+    should continue. reason is "key" (P was pressed: wait for P again)
+    or "focus" (the window lost focus: also continue when it gets it back).
+    Returns False if the window was closed instead.
+    """
+    # darken the last frame and write PAUSED over it
+    shade = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA)
+    shade.fill((0, 0, 0, 150))
+    screen.blit(shade, (0, 0))
+    text = hud.cache_for(font).text("PAUSED - press P to continue", (255, 255, 255))
+    screen.blit(text, text.get_rect(center=(WIDTH // 2, HEIGHT // 2)))
+    pygame.display.flip()
+
+    # nothing changes on screen, so sleep until an event arrives
+    while True:
+        event = idle.wait_for_event()
+        if event is None:
+            continue
+        if event.type == pygame.QUIT:
+            return False
+        if event.type == pygame.KEYDOWN and event.key == pygame.K_p:
+            return True
+        if event.type == pygame.WINDOWFOCUSGAINED and reason == "focus":
+            return True
+        # the window was covered and uncovered: show the picture again
+        if event.type == pygame.WINDOWEXPOSED:
+            pygame.display.flip()
+
+
 # ---------- GAME OVER ----------
-def game_over_screen(screen, font, score):
+def game_over_screen(screen, font, score, idle=None):
     """
     Display a simple game over screen showing the final score
-    and wait for any key press or window close.
+    and wait for any key press or window close. With an IdleLoop the
+    wait is counted in its CPU report.
     """
     # fill the entire screen with black
     screen.fill((0, 0, 0))
 
+    # get the text cache that the game used for this font
+    cache = hud.cache_for(font)
     # render the "GAME OVER" text in red
-    over_text = font.render("GAME OVER", True, (255, 0, 0))
+    over_text = cache.text("GAME OVER", (255, 0, 0))
     # render the final score text in white
-    score_text = font.render(f"Final Score: {score}", True, (255, 255, 255))
+    score_text = cache.counter("Final Score: ", score, (255, 255, 255))
     # render an info line that tells the player how to quit
-    info_text = font.render("Press any key to quit", True, (255, 255, 255))
+    info_text = cache.text("Press any key to quit", (255, 255, 255))
 
     # place "GAME OVER" roughly slightly above the vertical center
     rect = over_text.get_rect(center=(WIDTH // 2, HEIGHT // 2 - 20))
@@ -189,21 +470,44 @@ def game_over_screen(screen, font, score):
     # wait for the user to either press a key or close the window
     waiting = True
     while waiting:
-        # get all events
-        for event in pygame.event.get():
-            # if the window close button is pressed, stop waiting
-            if event.type == pygame.QUIT:
-                waiting = False
-            # if any key is pressed, stop waiting
-            elif event.type == pygame.KEYDOWN:
-                waiting = False
+        # sleep until the next event arrives instead of asking
+        # for events over and over (which keeps a CPU core busy)
+        event = idle.wait_for_event() if idle else pygame.event.wait()
+        # a timeout with nothing to do
+        if event is None:
+            continue
+        # if the window close button is pressed, stop waiting
+        if event.type == pygame.QUIT:
+            waiting = False
+        # if any key is pressed, stop waiting
+        elif event.type == pygame.KEYDOWN:
+            waiting = False
 
 
 # ---------- MAIN ----------
-def main():
+def main(dirty=False, profile=None, overlay=False, record=None, tick_rate=60, fps=60,
+         pixel_perfect=False, waves=None, capture=None, capture_format="png"):
     """
     Main game function: handles window creation, loop, events, updates, drawing.
+    The game rules run at tick_rate steps per second; frames are drawn at
+    most fps per second (fps=0 draws as fast as possible, for benchmarks
+    only, since it keeps a CPU core busy), and slower when nothing moves. P (or leaving the window) pauses the game.
+    With pixel_perfect=True hits only count where non-transparent pixels touch.
+    With waves set to a wave file the aliens come in the waves it describes.
+    With capture set to a folder every frame is saved there (capture.py)
+    as PNG files or, with capture_format="raw", one raw video file; the
+    frames are then paced at fps even when nothing moves, so capture
+    needs fps > 0.
+    With dirty=True only the changed parts of the screen are redrawn.
+    With profile set to a file name (.csv or .json) every phase of every
+    frame is timed and the trace is saved there; overlay=True also shows
+    the timings on screen. With record set to a file name the game is
+    seeded and every tick's keys are saved there (see replay.py).
     """
+    # a capture is played back at fps, so the frames must come at that rate
+    if capture and not fps:
+        raise ValueError("capture needs a fixed frame rate, not fps=0")
+
     # initialize pygame
     pygame.init()
 
@@ -211,7 +515,7 @@ def main():
     screen = pygame.display.set_mode((WIDTH, HEIGHT))
     # set the title of the window to "Space Invaders"
     pygame.display.set_caption("Space Invaders")
-    # create a clock object to control the frame rate
+    # create a clock object to limit the frame rate
     clock = pygame.time.Clock()
 
     # create an Assets instance to load all images
@@ -219,117 +523,197 @@ def main():
     # create a font with default system font and size 32
     font = pygame.font.SysFont(None, 32)
 
-    # create the player sprite using the loaded assets
-    player = Player(assets)
-    # create sprite groups for organizing sprites
-    all_sprites = pygame.sprite.Group()
-    bullets = pygame.sprite.Group()
-    aliens = pygame.sprite.Group()
+    # create a new game (player, sprite groups, score and lives);
+    # a recorded game gets a random seed that is saved with the inputs
+    recorder = None
+    # SPACE presses one tick may take (a recording has room for MAX_PRESSES)
+    max_presses = sys.maxsize
+    if record:
+        from replay import Recorder, MAX_PRESSES, game_options
+        max_presses = MAX_PRESSES
+        seed = random.randrange(2 ** 63)
+        game = Game(assets, seed=seed, pixel_perfect=pixel_perfect, waves=waves)
+        recorder = Recorder(record, seed, game_options(pixel_perfect, waves))
+    else:
+        game = Game(assets, pixel_perfect=pixel_perfect, waves=waves)
+    # optionally use the dirty rectangle renderer (dirty_render.py)
+    renderer = None
+    if dirty:
+        from dirty_render import DirtyRenderer
+        renderer = DirtyRenderer(screen, assets)
+
+    # time each phase of the loop, or do nothing if not profiling
+    if profile or overlay:
+        # keep every frame's timings only if they are saved at the end
+        profiler = FrameProfiler(trace=bool(profile))
+        # a small font with equal-width letters for the timing table
+        overlay_font = pygame.font.SysFont("monospace", 16)
+    else:
+        profiler = NullProfiler()
+
+    # the game rules take fixed steps (ticks) at tick_rate per second,
+    # whatever the frame rate; see timestep.py
+    timestep = FixedTimestep(tick_rate)
+    # where the sprites were before the last tick, for drawing between ticks
+    previous = {}
+    # SPACE presses not yet handed to a tick
+    pending_presses = 0
+
+    # sleeps between frames: at fps while things move, slower once the
+    # screen is still (but fast enough that the ticks can keep up)
+    idle = IdleLoop(clock, fps, idle_fps=max(15, -(-tick_rate // timestep.max_ticks)))
+    # why the game is paused: None (running), "key" or "focus"
+    paused = None
+
+    # save the frames from a background thread (capture.py)
+    capturer = None
+    if capture:
+        from capture import FrameCapture
+        capturer = FrameCapture(capture, screen, capture_format, fps=fps)
+
+    # keep looping until the window closes or the player runs out of lives
+    while game.running:
+        # ----- pause -----
+        if paused:
+            if not pause_screen(screen, font, idle, paused):
+                # the window was closed while paused
+                game.running = False
+                break
+            paused = None
+            # do not try to catch up with the paused time
+            timestep.skip_time()
+            # the whole screen was dimmed, so it must all be redrawn
+            if renderer:
+                renderer.first = True
+
+        profiler.start_frame()
 
-    # add the player to the all_sprites group
-    all_sprites.add(player)
-
-    # initialize score and lives
-    score = 0
-    lives = 3
-
-    # set up variables used to spawn aliens periodically
-    spawn_timer = 0               # current frame count since last alien spawn
-    spawn_interval = 40           # number of frames between spawns
-
-    # flag indicating whether the game loop should keep running
-    running = True
-    while running:
         # ----- events -----
         # process all pending pygame events
         for event in pygame.event.get():
             # if the user clicks the window close button
             if event.type == pygame.QUIT:
                 # end the game loop
-                running = False
+                game.running = False
             # if a key was pressed down
             elif event.type == pygame.KEYDOWN:
-                # if that key was the SPACE bar
+                # if that key was the SPACE bar, shoot on the next tick
                 if event.key == pygame.K_SPACE:
-                    # create a new bullet at the top-center of the player
-                    bullet = Bullet(assets, player.rect.centerx, player.rect.top)
-                    bullet2 = Bullet(assets, player.rect.x, player.rect.top)
-                    # add the bullet to all_sprites so it is updated and drawn
-                    all_sprites.add(bullet)
-                    all_sprites.add(bullet2)
-                    # also add it to bullets group for collision handling
-                    bullets.add(bullet)
-                    bullets.add(bullet2)
+                    pending_presses += 1
+                # P pauses the game (from the next frame on)
+                elif event.key == pygame.K_p:
+                    paused = "key"
+            # a window in the background pauses the game too
+            elif event.type == pygame.WINDOWFOCUSLOST:
+                paused = paused or "focus"
 
         # get the current state of all keys (pressed / not pressed)
         keys = pygame.key.get_pressed()
-
-        # ----- spawn aliens -----
-        # increment spawn_timer each frame
-        spawn_timer += 1
-        # if enough frames have passed, spawn a new alien
-        if spawn_timer >= spawn_interval:
-            # reset spawn_timer back to 0
-            spawn_timer = 0
-            # choose a random x position within the screen (with margins)
-            x = random.randint(50, WIDTH - 50)
-            # create an alien just above the top of the screen
-            alien = Alien(assets, x, -60)
-            # add the alien to the all_sprites group
-            all_sprites.add(alien)
-            # also add to the aliens group for collision checks
-            aliens.add(alien)
-
-        # ----- update -----
-        # update all sprites; player will respond to keys, others ignore them
-        all_sprites.update(keys)
-
-        # bullet vs alien collisions:
-        # groupcollide returns a dict of aliens hit and bullets involved
-        hits = pygame.sprite.groupcollide(aliens, bullets, True, True)
-        # if hits is not empty, at least one alien was destroyed
-        if hits:
-            # increase score by 10 points per alien hit
-            score += len(hits) * 10
-
-        # alien vs player collisions:
-        # spritecollide returns a list of aliens that collided with the player
-        player_hits = pygame.sprite.spritecollide(player, aliens, True)
-        # if the list is not empty, the player has been hit
-        if player_hits:
-            # reduce the number of lives by 1
-            lives -= 1
-            # if the player has no more lives, end the game
-            if lives <= 0:
-                running = False
+        profiler.mark("events")
+
+        # ----- ticks -----
+        # run as many ticks as the time since the last frame asks for
+        # (none, one, or several to catch up after a slow frame)
+        ticks = timestep.advance()
+        for tick in range(ticks):
+            if not game.running:
+                break
+            # remember the positions before the last tick of this frame
+            if tick == ticks - 1:
+                previous = snapshot(game.all_sprites)
+            # SPACE presses are handed to the first tick after them (more
+            # than max_presses wait for the next tick)
+            presses = min(pending_presses, max_presses)
+            for _ in range(presses):
+                game.fire()
+            # save this tick's input if the game is being recorded
+            if recorder:
+                recorder.frame(keys[pygame.K_LEFT], keys[pygame.K_RIGHT], presses)
+            pending_presses -= presses
+
+            # ----- spawn aliens -----
+            game.spawn_aliens()
+            profiler.mark("spawn")
+
+            # ----- update -----
+            game.update(keys)
+            profiler.mark("update")
+
+            # ----- collisions -----
+            game.check_collisions()
+            profiler.mark("collisions")
 
         # ----- draw -----
-        # if a background image is available, draw it
-        if assets.background:
-            screen.blit(assets.background, (0, 0))
-        # otherwise, just fill the screen with black
-        else:
-            screen.fill((0, 0, 0))
-
-        # draw all sprites (player, bullets, aliens) onto the screen
-        all_sprites.draw(screen)
-
-        # create a text surface showing the current score
-        score_text = font.render(f"Score: {score}", True, (255, 255, 255))
-        # create a text surface showing remaining lives
-        lives_text = font.render(f"Lives: {lives}", True, (255, 255, 255))
-        # draw the score at the top-left corner
-        screen.blit(score_text, (10, 10))
-        # draw the lives text near the top-right corner
-        screen.blit(lives_text, (WIDTH - 120, 10))
+        # draw the sprites part of the way from the last tick to the next
+        with interpolated(game.all_sprites, previous, timestep.alpha):
+            if renderer:
+                # redraw and update only the parts of the screen that changed
+                renderer.draw(game, font)
+            else:
+                game.draw(screen, font)
+        profiler.mark("draw")
+
+        # draw the timing table on top of everything
+        if overlay:
+            box = profiler.draw_overlay(screen, overlay_font)
+            # the dirty renderer does not know about the box, so push it here
+            if renderer:
+                pygame.display.update(box)
+            profiler.mark("overlay")
+
+        # hand a copy of the frame to the capture thread (never waits)
+        if capturer:
+            capturer.capture(screen)
+            profiler.mark("capture")
 
         # update the full display surface to the screen
-        pygame.display.flip()
-        # limit the frame rate to 60 frames per second
-        clock.tick(60)
+        if not renderer:
+            pygame.display.flip()
+        profiler.mark("flip")
+        profiler.end_frame()
+
+        # wait for the next frame: at most fps frames per second (no wait
+        # at all with fps=0), fewer while nothing moves (but not while
+        # capturing, where every frame stands for 1 / fps seconds)
+        moving = (len(game.aliens) > 0 or len(game.bullets) > 0 or pending_presses > 0
+                  or keys[pygame.K_LEFT] or keys[pygame.K_RIGHT] or capturer is not None)
+        idle.pace(moving)
+
+    # let the capture thread write the frames still waiting
+    if capturer:
+        stats = capturer.close()
+        print(f"captured {stats['written']} of {stats['frames']} frames "
+              f"({stats['dropped']} dropped) to {capture}")
+        print(capturer.video_hint())
+
+    # finish the recording with the final score
+    if recorder:
+        recorder.close(game.score)
+
+    # report how much of the screen the dirty renderer redrew
+    if renderer:
+        print(f"average screen redrawn per frame: {renderer.average_fraction():.1%}")
+
+    # report how often the loop had to catch up
+    stats = timestep.stats()
+    print(f"{stats['frames']} frames, {stats['ticks']} ticks at {tick_rate}/s, "
+          f"{stats['catch_up_frames']} catch-up frames, {stats['dropped_ticks']} ticks dropped")
+
+    # save the per-frame trace and print the percentiles
+    if profile:
+        profiler.dump(profile)
+        for phase, times in profiler.summary().items():
+            print(f"{phase:<11} p50 {times['p50_ms']:.2f} ms  "
+                  f"p95 {times['p95_ms']:.2f} ms  p99 {times['p99_ms']:.2f} ms")
 
     # when the main loop exits, show the game over screen
-    game_over_screen(screen, font, score)
+    game_over_screen(screen, font, game.score, idle)
+
+    # report how much CPU time sleeping saved
+    stats = idle.stats()
+    print(f"{stats['active_frames']} active and {stats['idle_frames']} idle frames, "
+          f"{stats['wall_s']['waiting']:.1f} s waiting for events; "
+          f"about {stats['cpu_saved_s']:.1f} s of CPU saved")
     # quit pygame
     pygame.quit()
     # exit the program
@@ -337,5 +721,24 @@ def main():
 
 
 # run main() only if this script is executed directly
+# (start it with "python answer.py --dirty" to use dirty rectangles,
+#  "--profile" to save a frame trace to profile.csv, "--overlay" to show it,
+#  "--record FILE" to record the game for replay.py,
+#  "--tick-rate N" to change the game steps per second (default 60),
+#  "--fps N" to draw at most N frames per second (default 60, 0 = uncapped),
+#  "--pixel-perfect" to count hits only where pixels touch,
+#  "--waves FILE" to play the waves of a wave file, such as waves.json,
+#  "--capture DIR" to save every frame as PNG ("--capture-raw DIR" as raw video))
 if __name__ == "__main__":
-    main()
+    main(dirty="--dirty" in sys.argv,
+         profile="profile.csv" if "--profile" in sys.argv else None,
+         overlay="--overlay" in sys.argv,
+         record=sys.argv[sys.argv.index("--record") + 1] if "--record" in sys.argv else None,
+         tick_rate=int(sys.argv[sys.argv.index("--tick-rate") + 1]) if "--tick-rate" in sys.argv else 60,
+         fps=int(sys.argv[sys.argv.index("--fps") + 1]) if "--fps" in sys.argv else 60,
+         pixel_perfect="--pixel-perfect" in sys.argv,
+         waves=sys.argv[sys.argv.index("--waves") + 1] if "--waves" in sys.argv else None,
+         capture=(sys.argv[sys.argv.index("--capture") + 1] if "--capture" in sys.argv else
+                  sys.argv[sys.argv.index("--capture-raw") + 1] if "--capture-raw" in sys.argv
+                  else None),
+         capture_format="raw" if "--capture-raw" in sys.argv else "png")
@@ -0,0 +1,170 @@
+"""
+SPACE INVADERS ASSET CACHE (PRE-SCALED TEXTURE ATLAS)
+
+The images in assets/ are 512x512 PNGs, but the game shows them at
+64x64, 16x32 and 48x48. Decoding the big files and scaling them down on
+every start is wasted work. This module does it once: it scales every
+image to its game size, packs them all into one small "atlas" image and
+saves it in assets/cache/. Later starts load only the small atlas and
+cut the images out of it as subsurfaces (views into the same pixels).
+
+The cache file name is made from a hash of the source files and the
+target sizes, so changing an image or a size builds a new atlas.
+
+Steps:
+  1. cache_key(): hash of the source images and sizes
+  2. pack(): place the scaled images next to each other in rows
+  3. build_atlas(): scale, pack and save the atlas + its layout
+  4. load_atlas(): load (building if needed) and cut out subsurfaces
+  5. Build step and timing (run this file)
+"""
+
+import os       # import os for file paths
+import sys      # import sys to exit with a status code
+import json     # import json to save where each image is in the atlas
+import time     # import time to measure loading
+import hashlib  # import hashlib to hash the source images
+
+import pygame  # import pygame to load, scale and save images
+
+
+# ---------- CONFIG ----------
+# bump this when the atlas layout changes, so old caches are not used
+FORMAT_VERSION = 1
+# widest row of images in the atlas, in pixels
+ATLAS_WIDTH = 256
+
+
+# ---------- CACHE KEY ----------
+def cache_key(source_dir, specs):
+    """
+    Return a hex string that changes whenever a source image or
+    a target size changes. specs maps name -> (file name, (w, h)).
+    """
+    digest = hashlib.sha256(f"atlas v{FORMAT_VERSION}".encode())
+    for name in sorted(specs):
+        filename, size = specs[name]
+        with open(os.path.join(source_dir, filename), "rb") as f:
+            file_hash = hashlib.sha256(f.read()).hexdigest()
+        digest.update(f"{name}:{file_hash}:{size[0]}x{size[1]};".encode())
+    return digest.hexdigest()[:20]
+
+
+# ---------- PACKING ----------
+def pack(sizes, width=ATLAS_WIDTH):
+    """
+    Place rectangles in rows ("shelves"), tallest first.
+    sizes maps name -> (w, h). Returns (name -> (x, y, w, h), atlas size).
+    """
+    # the atlas must be at least as wide as the widest image
+    width = max([width] + [w for w, h in sizes.values()])
+    layout = {}
+    x = y = row_height = 0
+    for name in sorted(sizes, key=lambda n: (-sizes[n][1], n)):
+        w, h = sizes[name]
+        # start a new row when this image does not fit in the current one
+        if x + w > width:
+            x = 0
+            y += row_height
+            row_height = 0
+        layout[name] = (x, y, w, h)
+        x += w
+        row_height = max(row_height, h)
+    return layout, (width, y + row_height)
+
+
+# ---------- BUILD ----------
+def build_atlas(source_dir, specs, png_path, layout_path):
+    """
+    Scale every image, pack them into one atlas and save it as a PNG
+    together with a JSON file describing where each image is.
+    """
+    # scale each source image to its game size (the same
+    # pygame.transform.scale that answer.py used on every start)
+    scaled = {}
+    for name, (filename, size) in specs.items():
+        image = pygame.image.load(os.path.join(source_dir, filename))
+        scaled[name] = pygame.transform.scale(image, size)
+
+    layout, atlas_size = pack({name: img.get_size() for name, img in scaled.items()})
+    # a transparent surface to copy all scaled images onto
+    atlas = pygame.Surface(atlas_size, pygame.SRCALPHA)
+    atlas.fill((0, 0, 0, 0))
+    for name, (x, y, w, h) in layout.items():
+        atlas.blit(scaled[name], (x, y))
+
+    # write to temporary files first and then rename them, so another
+    # process never reads a half-written cache
+    os.makedirs(os.path.dirname(png_path), exist_ok=True)
+    tmp = f".tmp{os.getpid()}"
+    pygame.image.save(atlas, png_path + tmp + ".png")
+    with open(layout_path + tmp, "w") as f:
+        json.dump(layout, f)
+    os.replace(png_path + tmp + ".png", png_path)
+    os.replace(layout_path + tmp, layout_path)
+
+
+# ---------- LOAD ----------
+def load_atlas(source_dir, specs, cache_dir=None):
+    """
+    Return name -> image surface for every image in specs, loaded from
+    the cached atlas (built first if it is missing or out of date).
+    """
+    if cache_dir is None:
+        cache_dir = os.path.join(source_dir, "cache")
+    key = cache_key(source_dir, specs)
+    png_path = os.path.join(cache_dir, f"atlas-{key}.png")
+    layout_path = os.path.join(cache_dir, f"atlas-{key}.json")
+
+    # build the atlas only when there is no cached one for this key
+    if not (os.path.exists(png_path) and os.path.exists(layout_path)):
+        build_atlas(source_dir, specs, png_path, layout_path)
+
+    atlas = pygame.image.load(png_path)
+    # convert for fast blitting when a display mode has been set
+    if pygame.display.get_surface() is not None:
+        atlas = atlas.convert_alpha()
+    with open(layout_path) as f:
+        layout = json.load(f)
+
+    # each image is a subsurface: it shares the atlas pixels, no copy
+    return {name: atlas.subsurface(layout[name]) for name in specs}
+
+
+# ---------- BUILD STEP ----------
+def main():
+    """
+    Build (or reuse) the atlas for the game's images and compare the
+    start-up time with loading and scaling the source PNGs.
+    """
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    pygame.init()
+    pygame.display.set_mode((1, 1))
+    from answer import ASSET_DIR, Assets, load_image
+
+    start = time.perf_counter()
+    for filename, size in Assets.IMAGES.values():
+        load_image(os.path.join(ASSET_DIR, filename), size)
+    direct = time.perf_counter() - start
+
+    start = time.perf_counter()
+    images = load_atlas(ASSET_DIR, Assets.IMAGES)
+    first = time.perf_counter() - start
+
+    start = time.perf_counter()
+    load_atlas(ASSET_DIR, Assets.IMAGES)
+    cached = time.perf_counter() - start
+
+    key = cache_key(ASSET_DIR, Assets.IMAGES)
+    print(f"atlas:           assets/cache/atlas-{key}.png")
+    print(f"images:          {', '.join(f'{n} {img.get_size()}' for n, img in images.items())}")
+    print(f"scale on start:  {direct * 1000:.2f} ms")
+    print(f"first load:      {first * 1000:.2f} ms")
+    print(f"cached load:     {cached * 1000:.2f} ms")
+    pygame.quit()
+    return 0
+
+
+# run the build step only if this script is executed directly
+if __name__ == "__main__":
+    sys.exit(main())
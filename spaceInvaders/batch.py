@@ -0,0 +1,180 @@
+"""
+SPACE INVADERS BATCH RUNNER
+
+Plays many headless games, each with its own seed and input policy,
+spread over a pool of worker processes (one per CPU core by default).
+Every worker loads pygame and the images once and then plays game after
+game; the results (final score, frames survived, time) are collected
+into one CSV or JSON-lines file.
+
+Games do not share anything, so the throughput grows almost linearly
+with the number of cores.
+
+Steps:
+  1. Worker set-up: dummy video driver, pygame, assets (once per process)
+  2. play_game(): one game with one seed and policy until it ends
+  3. run_batch(): hand the games to a process pool, stream the results
+  4. Write the results file and print the throughput
+
+Usage:
+  python batch.py --games 1000 --policy random --policy fire --out results.csv
+"""
+
+import os        # import os to select the SDL video driver and count CPUs
+import sys       # import sys to exit with a status code
+import csv       # import csv to write results as a table
+import json      # import json to write results as JSON lines
+import time      # import time to measure each game and the whole batch
+import random    # import random for the input policy's random numbers
+import argparse  # import argparse to read options from the command line
+import multiprocessing  # import multiprocessing for the process pool
+
+
+# ---------- WORKER ----------
+# the assets loaded by this worker process (set by init_worker)
+worker_assets = None
+
+
+def init_worker():
+    """
+    Run once in every worker process: start pygame without a window
+    and load the images, so each game can start straight away.
+    """
+    global worker_assets
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    # keep SDL from catching SIGTERM, so the pool can still stop workers
+    os.environ["SDL_NO_SIGNAL_HANDLERS"] = "1"
+    import pygame
+    from answer import WIDTH, HEIGHT, Assets
+    pygame.init()
+    pygame.display.set_mode((WIDTH, HEIGHT))
+    worker_assets = Assets()
+
+
+def play_game(task):
+    """
+    Play one game until the player has no lives left or max_frames
+    frames have passed. task is (seed, policy name, max_frames).
+    Returns a dict with the results of the game.
+    """
+    from answer import Game
+    from headless import POLICIES
+
+    seed, policy_name, max_frames = task
+    policy = POLICIES[policy_name]
+    # the game and the policy each get their own seeded generator
+    game = Game(worker_assets, seed=seed)
+    rng = random.Random(f"policy:{seed}")
+
+    start = time.perf_counter()
+    frame = 0
+    while game.running and frame < max_frames:
+        keys, fire = policy(frame, game, rng)
+        for _ in range(int(fire)):
+            game.fire()
+        game.step(keys)
+        frame += 1
+    seconds = time.perf_counter() - start
+
+    return {
+        "seed": seed,
+        "policy": policy_name,
+        "score": game.score,
+        "frames": frame,
+        "finished": not game.running,
+        "seconds": seconds,
+        "pid": os.getpid(),
+    }
+
+
+# ---------- BATCH ----------
+def run_batch(games, policies, first_seed=0, max_frames=100000,
+              workers=None, out=None):
+    """
+    Play `games` games with seeds first_seed, first_seed + 1, ...
+    cycling through the policy names. Results are written to out
+    (".csv" or JSON lines) as they arrive. Returns a summary dict.
+    """
+    workers = workers or os.cpu_count() or 1
+    tasks = [(first_seed + i, policies[i % len(policies)], max_frames)
+             for i in range(games)]
+    # hand out tasks in small chunks: few enough messages between
+    # processes, but still even work for every worker
+    chunksize = max(1, games // (workers * 8))
+
+    writer = None
+    outfile = None
+    if out:
+        outfile = open(out, "w", newline="")
+        if out.endswith(".csv"):
+            writer = csv.DictWriter(outfile, fieldnames=["seed", "policy", "score", "frames",
+                                                         "finished", "seconds", "pid"])
+            writer.writeheader()
+
+    total_frames = 0
+    total_score = 0
+    start = time.perf_counter()
+    pool = multiprocessing.Pool(workers, initializer=init_worker)
+    try:
+        for result in pool.imap_unordered(play_game, tasks, chunksize):
+            total_frames += result["frames"]
+            total_score += result["score"]
+            if writer:
+                writer.writerow(result)
+            elif outfile:
+                outfile.write(json.dumps(result) + "\n")
+        # let the workers finish on their own
+        pool.close()
+    except BaseException:
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
+    elapsed = time.perf_counter() - start
+    if outfile:
+        outfile.close()
+
+    return {
+        "games": games,
+        "workers": workers,
+        "seconds": elapsed,
+        "games_per_second": games / elapsed if elapsed > 0 else 0.0,
+        "frames_per_second": total_frames / elapsed if elapsed > 0 else 0.0,
+        "mean_score": total_score / games if games else 0.0,
+        "mean_frames": total_frames / games if games else 0.0,
+    }
+
+
+# ---------- MAIN ----------
+def main(argv=None):
+    """
+    Read command line options, run the batch and print the throughput.
+    """
+    from headless import POLICIES
+
+    parser = argparse.ArgumentParser(description="Play many headless Space Invaders games.")
+    parser.add_argument("--games", type=int, default=100, help="number of games (default 100)")
+    parser.add_argument("--policy", action="append", choices=sorted(POLICIES),
+                        help="input policy; repeat to cycle through several (default random)")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first game")
+    parser.add_argument("--max-frames", type=int, default=100000,
+                        help="stop a game after this many frames")
+    parser.add_argument("--workers", type=int, help="worker processes (default: CPU count)")
+    parser.add_argument("--out", help="results file (.csv, otherwise JSON lines)")
+    args = parser.parse_args(argv)
+
+    summary = run_batch(args.games, args.policy or ["random"], args.seed,
+                        args.max_frames, args.workers, args.out)
+
+    print(f"games:        {summary['games']} on {summary['workers']} workers")
+    print(f"seconds:      {summary['seconds']:.2f}")
+    print(f"games/s:      {summary['games_per_second']:.1f}")
+    print(f"frames/s:     {summary['frames_per_second']:.0f}")
+    print(f"mean score:   {summary['mean_score']:.1f}")
+    print(f"mean frames:  {summary['mean_frames']:.0f}")
+    return 0
+
+
+# run main() only if this script is executed directly
+if __name__ == "__main__":
+    sys.exit(main())
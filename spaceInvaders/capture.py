@@ -0,0 +1,307 @@
+"""
+SPACE INVADERS FRAME CAPTURE
+
+Saving every frame with pygame.image.save() inside the game loop makes
+each frame wait for a PNG to be compressed and written. FrameCapture
+moves that work to a background thread:
+
+  - a ring of surfaces, created once with the same pixel format as the
+    screen, so grabbing a frame is a plain memory copy (a blit) and
+    nothing new is allocated per frame
+  - the game loop copies the frame into a free slot and goes on; the
+    writer thread saves filled slots in order and hands them back
+  - when the writer falls behind and every slot is full, the game loop
+    still never waits: depending on the policy the new frame is dropped
+    ("drop") or replaces the oldest frame still waiting ("overwrite")
+
+Output: a PNG sequence numbered without gaps (frame_000000.png,
+frame_000001.png, ... in the order written, whatever was dropped), or
+one raw file of all frames plus a JSON file with the size, pixel format
+and frame numbers (which show the dropped frames). ffmpeg can turn
+either into a video.
+
+Steps:
+  1. Pixel format of the raw frames
+  2. FrameCapture: the slot ring and its policies
+  3. The writer thread: PNG files or raw frames
+  4. Benchmark: saving in the loop vs capturing (run this file)
+"""
+
+import os         # import os for output paths
+import sys        # import sys to exit with a status code
+import json       # import json to describe the raw frames
+import time       # import time for the benchmark
+import threading  # import threading for the writer thread and its lock
+from collections import deque  # import deque for the queue of filled slots
+
+import pygame  # import pygame for surfaces and saving images
+
+
+# ---------- CONFIG ----------
+# what capture() does when every slot is full:
+#   "drop"      -- skip the new frame
+#   "overwrite" -- put the new frame in place of the oldest waiting one
+#   "wait"      -- wait for the writer (only for headless exports, where
+#                  keeping every frame matters more than the frame rate)
+POLICIES = ("drop", "overwrite", "wait")
+FORMATS = ("png", "raw")
+
+
+def pixel_format(surface):
+    """
+    Return the ffmpeg name of a surface's pixel layout, such as "bgra"
+    or "rgb24", read from its masks (byte 0 first in memory).
+    """
+    size = surface.get_bytesize()
+    letters = ["0"] * size
+    for letter, mask, shift in zip("rgba", surface.get_masks(), surface.get_shifts()):
+        if mask:
+            byte = shift // 8
+            # on big-endian machines the first byte holds the highest bits
+            if sys.byteorder == "big":
+                byte = size - 1 - byte
+            letters[byte] = letter
+    name = "".join(letters)
+    return name + "24" if size == 3 else name
+
+
+# ---------- CAPTURE ----------
+class FrameCapture:
+    """
+    FrameCapture copies frames into a ring of pre-made surfaces and a
+    background thread writes them to out_dir. Call capture(screen)
+    after drawing each frame and close() at the end.
+    """
+    def __init__(self, out_dir, screen, fmt="png", slots=8, policy="drop", fps=60):
+        if fmt not in FORMATS:
+            raise ValueError(f"unknown capture format {fmt!r}, use one of {FORMATS}")
+        if policy not in POLICIES:
+            raise ValueError(f"unknown capture policy {policy!r}, use one of {POLICIES}")
+        self.out_dir = out_dir
+        self.fmt = fmt
+        self.policy = policy
+        self.fps = fps
+        os.makedirs(out_dir, exist_ok=True)
+
+        # the ring: surfaces with the screen's size and pixel format, so
+        # copying the screen into one needs no conversion
+        self.slots = [pygame.Surface(screen.get_size(), 0, screen) for _ in range(slots)]
+        self.free = deque(range(slots))  # slots the game loop may fill
+        self.filled = deque()            # (slot, frame number) waiting to be written
+        self.lock = threading.Condition()
+        self.closing = False
+        self.error = None  # what stopped the writer thread, raised by capture() and close()
+
+        # counters
+        self.frames = 0       # calls to capture()
+        self.written = 0      # frames saved
+        self.dropped = 0      # new frames skipped ("drop")
+        self.overwritten = 0  # waiting frames replaced ("overwrite")
+        self.high_water = 0   # most frames waiting at once
+
+        # capture numbers of the frames written, in order; the PNG files
+        # are numbered by their place in this list, so there are no gaps
+        self.saved_frames = []
+        # raw output goes to one file; saved_frames becomes its index
+        self.raw_file = None
+        if fmt == "raw":
+            self.raw_file = open(os.path.join(out_dir, "frames.raw"), "wb")
+
+        self.thread = threading.Thread(target=self.writer, name="frame-writer", daemon=True)
+        self.thread.start()
+
+    def capture(self, screen):
+        """
+        Copy this frame into a free slot for the writer. Never waits
+        (except with the "wait" policy); returns False if the frame was
+        dropped. Raises the writer's error if saving a frame failed.
+        """
+        frame = self.frames
+        self.frames += 1
+        with self.lock:
+            if self.policy == "wait":
+                while not self.free and self.error is None:
+                    self.lock.wait()
+            if self.error is not None:
+                raise self.error
+            if self.free:
+                slot = self.free.popleft()
+            elif self.policy == "overwrite" and self.filled:
+                # take back the oldest frame that is still waiting
+                slot, _ = self.filled.popleft()
+                self.overwritten += 1
+            else:
+                self.dropped += 1
+                return False
+        # the slot belongs to the game loop now, so copy without the lock
+        self.slots[slot].blit(screen, (0, 0))
+        with self.lock:
+            self.filled.append((slot, frame))
+            self.high_water = max(self.high_water, len(self.filled))
+            self.lock.notify()
+        return True
+
+    # ---------- WRITER THREAD ----------
+    def writer(self):
+        """
+        Save filled slots in order until close() is called and the
+        queue is empty. If saving fails, keep the error and stop.
+        """
+        while True:
+            with self.lock:
+                while not self.filled and not self.closing:
+                    self.lock.wait()
+                if not self.filled:
+                    return
+                slot, frame = self.filled.popleft()
+            # only this thread touches the slot until it is freed again
+            try:
+                self.write(self.slots[slot], frame)
+            except Exception as e:
+                with self.lock:
+                    self.error = e
+                    # wake capture() if it waits for a free slot
+                    self.lock.notify_all()
+                return
+            with self.lock:
+                self.free.append(slot)
+                self.written += 1
+                # wake capture() if it waits for a free slot
+                self.lock.notify_all()
+
+    def write(self, surface, frame):
+        """
+        Write one frame as a PNG file or append it to the raw file.
+        """
+        if self.fmt == "png":
+            name = f"frame_{len(self.saved_frames):06d}.png"
+            pygame.image.save(surface, os.path.join(self.out_dir, name))
+            self.saved_frames.append(frame)
+            return
+        width, height = surface.get_size()
+        row = width * surface.get_bytesize()
+        pixels = surface.get_view("0")
+        if surface.get_pitch() == row:
+            self.raw_file.write(pixels)
+        else:
+            # rows have padding at the end: write the pixels of each row
+            data = memoryview(pixels.raw)
+            pitch = surface.get_pitch()
+            for y in range(height):
+                self.raw_file.write(data[y * pitch:y * pitch + row])
+        self.saved_frames.append(frame)
+
+    def close(self):
+        """
+        Let the writer finish the waiting frames, stop it, and write the
+        index of a raw capture. Returns stats(); raises the writer's
+        error if saving a frame failed.
+        """
+        with self.lock:
+            self.closing = True
+            self.lock.notify()
+        self.thread.join()
+        if self.raw_file:
+            self.raw_file.close()
+        if self.error is not None:
+            raise self.error
+        if self.raw_file:
+            surface = self.slots[0]
+            width, height = surface.get_size()
+            index = {
+                "width": width,
+                "height": height,
+                "pixel_format": pixel_format(surface),
+                "fps": self.fps,
+                "frames": self.saved_frames,
+            }
+            with open(os.path.join(self.out_dir, "frames.json"), "w") as f:
+                json.dump(index, f)
+        return self.stats()
+
+    def stats(self):
+        """
+        Return the capture counters as a dict.
+        """
+        return {
+            "frames": self.frames,
+            "written": self.written,
+            "dropped": self.dropped,
+            "overwritten": self.overwritten,
+            "high_water": self.high_water,
+            "slots": len(self.slots),
+        }
+
+    def video_hint(self):
+        """
+        Return an ffmpeg command that turns the capture into a video.
+        """
+        out = os.path.join(self.out_dir, "capture.mp4")
+        if self.fmt == "png":
+            frames = os.path.join(self.out_dir, "frame_%06d.png")
+            return f"ffmpeg -framerate {self.fps} -i {frames} -pix_fmt yuv420p {out}"
+        width, height = self.slots[0].get_size()
+        raw = os.path.join(self.out_dir, "frames.raw")
+        return (f"ffmpeg -f rawvideo -pix_fmt {pixel_format(self.slots[0])} "
+                f"-s {width}x{height} -framerate {self.fps} -i {raw} -pix_fmt yuv420p {out}")
+
+
+# ---------- BENCHMARK ----------
+def main(argv=None):
+    """
+    Run the game headless at 60 frames per second and compare the
+    frame time (without the wait for the next frame) of saving PNGs in
+    the loop with capturing them (PNG and raw) in the background.
+    """
+    import tempfile
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    from answer import WIDTH, HEIGHT, Assets, Game
+    from headless import make_keys
+
+    argv = sys.argv[1:] if argv is None else argv
+    frames = int(argv[0]) if argv else 180
+    pygame.init()
+    screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    assets = Assets()
+    font = pygame.font.SysFont(None, 32)
+    keys = make_keys()
+
+    def run(grab):
+        # p50 and p99 frame times in ms with grab(screen, frame) after each draw
+        game = Game(assets, seed=0)
+        clock = pygame.time.Clock()
+        times = []
+        for frame in range(frames):
+            start = time.perf_counter()
+            if frame % 5 == 0:
+                game.fire()
+            game.step(keys)
+            game.draw(screen, font)
+            grab(screen, frame)
+            times.append((time.perf_counter() - start) * 1000)
+            clock.tick(60)
+        times.sort()
+        return times[len(times) // 2], times[len(times) * 99 // 100]
+
+    print(f"{'':<20}{'p50 ms':>8}{'p99 ms':>8}  ({frames} frames at 60 fps)")
+    with tempfile.TemporaryDirectory() as out:
+        p50, p99 = run(lambda screen, frame: None)
+        print(f"{'no capture':<20}{p50:>8.2f}{p99:>8.2f}")
+        p50, p99 = run(lambda screen, frame: pygame.image.save(
+            screen, os.path.join(out, f"sync_{frame:06d}.png")))
+        print(f"{'image.save in loop':<20}{p50:>8.2f}{p99:>8.2f}")
+        for fmt in FORMATS:
+            for policy in ("drop", "overwrite"):
+                capture = FrameCapture(os.path.join(out, f"{fmt}-{policy}"), screen, fmt,
+                                       policy=policy)
+                p50, p99 = run(lambda screen, frame: capture.capture(screen))
+                stats = capture.close()
+                print(f"{fmt + ' ' + policy:<20}{p50:>8.2f}{p99:>8.2f}  written {stats['written']}, "
+                      f"dropped {stats['dropped']}, overwritten {stats['overwritten']}")
+    pygame.quit()
+    return 0
+
+
+# run the benchmark only if this script is executed directly
+if __name__ == "__main__":
+    sys.exit(main())
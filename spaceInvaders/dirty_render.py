@@ -0,0 +1,111 @@
+"""
+SPACE INVADERS DIRTY RECTANGLE RENDERER
+
+answer.py redraws the whole 800x600 screen and sends all of it to the
+display every frame, even when only a few small sprites moved.
+DirtyRenderer works like pygame's RenderUpdates group: it paints the
+background back only where sprites and the HUD were last frame, draws
+them again, and sends only those "dirty" rectangles to the display
+with pygame.display.update(rects).
+
+Steps:
+  1. Keep a background surface to clear with
+  2. Clear last frame's sprite and HUD rects
+  3. Draw sprites and HUD, remember their new rects
+  4. Update only the changed rects and count how much was redrawn
+"""
+
+import pygame  # import pygame for surfaces, rects and the display
+
+
+# ---------- DIRTY RENDERER ----------
+class DirtyRenderer:
+    """
+    DirtyRenderer draws a sprite Game but only pushes the changed
+    parts of the screen to the display.
+    """
+    def __init__(self, screen, assets):
+        self.screen = screen
+        # the background to clear with: the image, or plain black
+        if assets.background:
+            self.background = assets.background
+        else:
+            self.background = pygame.Surface(screen.get_size())
+            self.background.fill((0, 0, 0))
+        # sprite -> rect where it was drawn last frame
+        self.previous = {}
+        # rects of the HUD text drawn last frame
+        self.previous_hud = []
+        # the very first frame has to paint and push the whole screen
+        self.first = True
+
+        # counters for the redraw report
+        self.frames = 0
+        self.pixels = 0
+        self.screen_pixels = screen.get_width() * screen.get_height()
+
+    def draw(self, game, font, present=True):
+        """
+        Draw one frame of game and return the list of dirty rects.
+        With present=False nothing is sent to the display (headless).
+        """
+        screen = self.screen
+        background = self.background
+
+        if self.first:
+            # paint the whole background once
+            screen.blit(background, (0, 0))
+            dirty = [screen.get_rect()]
+            self.first = False
+        else:
+            dirty = []
+            # clear where sprites and the HUD were drawn last frame
+            for rect in self.previous.values():
+                screen.blit(background, rect, rect)
+            for rect in self.previous_hud:
+                screen.blit(background, rect, rect)
+
+        # draw all sprites and remember where they went
+        current = {}
+        for sprite in game.all_sprites:
+            current[sprite] = screen.blit(sprite.image, sprite.rect)
+        hud = game.draw_hud(screen, font)
+
+        # a sprite that moved dirties both its old and new place
+        previous = self.previous
+        for sprite, rect in current.items():
+            old = previous.pop(sprite, None)
+            if old is not None and old.colliderect(rect):
+                dirty.append(old.union(rect))
+            else:
+                dirty.append(rect)
+                if old is not None:
+                    dirty.append(old)
+        # sprites that are gone (killed) dirty the place they were
+        dirty.extend(previous.values())
+        # the HUD text may have changed size, so push old and new rects
+        dirty.extend(self.previous_hud)
+        dirty.extend(hud)
+
+        self.previous = current
+        self.previous_hud = hud
+
+        # send only the changed rects to the display
+        if present:
+            pygame.display.update(dirty)
+
+        # count the pixels pushed this frame (clipped to the screen)
+        bounds = screen.get_rect()
+        self.frames += 1
+        self.pixels += min(sum(r.clip(bounds).width * r.clip(bounds).height for r in dirty),
+                           self.screen_pixels)
+        return dirty
+
+    def average_fraction(self):
+        """
+        Average fraction of the screen sent to the display per frame
+        (1.0 would mean the whole screen every frame, like flip()).
+        """
+        if self.frames == 0:
+            return 0.0
+        return self.pixels / (self.frames * self.screen_pixels)
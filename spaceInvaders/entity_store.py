@@ -0,0 +1,360 @@
+"""
+SPACE INVADERS ENTITY STORE (NUMPY ARRAYS)
+
+Every Bullet and Alien in answer.py is its own Sprite object with its
+own update(), so moving 10 000 bullets means 10 000 Python calls.
+EntityStore keeps the x, y, speed_y and alive flag of all bullets (or
+all aliens) in NumPy arrays instead, so moving, removing off-screen
+entities and checking collisions are each one array operation.
+Sprites only come back as blits when the store is drawn.
+
+NumPy is optional: answer.py and the other modules work without it.
+
+Steps:
+  1. EntityStore: arrays for x, y, speed_y and alive
+  2. Spawning, moving and culling off-screen entities
+  3. AABB collisions against a rect and against another store
+  4. ArrayGame: the Game rules using two stores
+  5. Benchmark with tens of thousands of bullets (run this file)
+"""
+
+import os      # import os to select the SDL video driver for the benchmark
+import sys     # import sys to exit with a status code
+import time    # import time to measure the benchmark
+import random  # import random for random alien speeds and positions
+
+import pygame  # import pygame for rects, surfaces and drawing
+
+try:
+    import numpy as np  # import numpy for the arrays
+except ImportError:     # numpy is optional; EntityStore needs it
+    np = None
+
+from answer import WIDTH, HEIGHT, ALIEN_POINTS, Game
+
+
+# ---------- ENTITY STORE ----------
+class EntityStore:
+    """
+    EntityStore keeps many entities that share one image in arrays.
+    Entities stay in the order they were spawned, like sprites in a Group.
+    """
+    def __init__(self, image, cull, capacity=1024):
+        # the store cannot work without numpy
+        if np is None:
+            raise ImportError("EntityStore needs numpy (pip install numpy)")
+        # every entity is drawn with the same image and has its size
+        self.image = image
+        self.w, self.h = image.get_size()
+        # "top" removes entities above the screen (bullets),
+        # "bottom" removes entities below the screen (aliens)
+        self.cull = cull
+        # number of slots in use (alive or dead) at the start of the arrays
+        self.count = 0
+        # one array per field, all the same length (the capacity)
+        self.x = np.zeros(capacity, dtype=np.int32)
+        self.y = np.zeros(capacity, dtype=np.int32)
+        self.speed_y = np.zeros(capacity, dtype=np.int32)
+        self.alive = np.zeros(capacity, dtype=bool)
+
+    def __len__(self):
+        # number of living entities
+        return int(np.count_nonzero(self.alive[:self.count]))
+
+    def grow(self, extra=1):
+        """
+        Make room for at least extra more entities: first drop dead ones,
+        and only if the arrays are still more than half full (or extra
+        does not fit), double their size until it does.
+        """
+        self.compact()
+        if self.count * 2 > len(self.x) or self.count + extra > len(self.x):
+            size = len(self.x) * 2
+            while self.count + extra > size:
+                size *= 2
+            for name in ("x", "y", "speed_y", "alive"):
+                old = getattr(self, name)
+                new = np.zeros(size, dtype=old.dtype)
+                new[:self.count] = old[:self.count]
+                setattr(self, name, new)
+
+    def compact(self):
+        """
+        Move the living entities to the front of the arrays,
+        keeping their order.
+        """
+        keep = np.flatnonzero(self.alive[:self.count])
+        n = len(keep)
+        for array in (self.x, self.y, self.speed_y, self.alive):
+            array[:n] = array[keep]
+        self.alive[n:self.count] = False
+        self.count = n
+
+    def spawn(self, x, y, speed_y):
+        """
+        Add one entity with its top-left corner at (x, y).
+        """
+        if self.count == len(self.x):
+            self.grow()
+        i = self.count
+        self.x[i] = x
+        self.y[i] = y
+        self.speed_y[i] = speed_y
+        self.alive[i] = True
+        self.count += 1
+
+    def spawn_many(self, xs, ys, speeds):
+        """
+        Add a batch of entities at once; xs, ys and speeds are sequences
+        of the same length.
+        """
+        n = len(xs)
+        if self.count + n > len(self.x):
+            self.grow(n)
+        i = self.count
+        self.x[i:i + n] = xs
+        self.y[i:i + n] = ys
+        self.speed_y[i:i + n] = speeds
+        self.alive[i:i + n] = True
+        self.count += n
+
+    def update(self):
+        """
+        Move every entity by its speed and remove the ones that left
+        the screen, all in a few array operations.
+        """
+        n = self.count
+        y = self.y[:n]
+        # dead slots move too, which is harmless: they are never drawn or hit
+        y += self.speed_y[:n]
+        if self.cull == "top":
+            # like Bullet.update: remove when rect.bottom < 0
+            self.alive[:n] &= (y + self.h) >= 0
+        else:
+            # like Alien.update: remove when rect.top > HEIGHT
+            self.alive[:n] &= y <= HEIGHT
+        # drop dead slots once they make up most of the arrays
+        if n > 64 and len(self) * 4 < n:
+            self.compact()
+
+    def overlaps(self, rect):
+        """
+        Boolean array: which living entities overlap rect
+        (the same test as pygame's Rect.colliderect).
+        """
+        n = self.count
+        x = self.x[:n]
+        y = self.y[:n]
+        return (self.alive[:n]
+                & (x < rect.right) & (x + self.w > rect.left)
+                & (y < rect.bottom) & (y + self.h > rect.top))
+
+    def collide_rect(self, rect, kill=True):
+        """
+        Return how many living entities overlap rect, and
+        remove them when kill is True (like spritecollide).
+        """
+        hit = self.overlaps(rect)
+        if kill:
+            self.alive[:self.count] &= ~hit
+        return int(np.count_nonzero(hit))
+
+    def collide_store(self, other, chunk=256):
+        """
+        Like groupcollide(self, other, True, True): every entity of this
+        store that overlaps a living entity of other is removed together
+        with all the entities it overlaps. Each of other's entities counts
+        for the first (oldest) entity of this store it overlaps.
+        Returns the number of entities of this store that were hit.
+        """
+        mine = np.flatnonzero(self.alive[:self.count])
+        theirs = np.flatnonzero(other.alive[:other.count])
+        if len(mine) == 0 or len(theirs) == 0:
+            return 0
+
+        # corners of the other entities, as columns for broadcasting
+        ox0 = other.x[theirs]
+        oy0 = other.y[theirs]
+        ox1 = ox0 + other.w
+        oy1 = oy0 + other.h
+        # which of the other entities are still free to be hit
+        free = np.ones(len(theirs), dtype=bool)
+        hits = 0
+
+        # check a block of our entities against all of theirs at once
+        for start in range(0, len(mine), chunk):
+            idx = mine[start:start + chunk]
+            x0 = self.x[idx][:, None]
+            y0 = self.y[idx][:, None]
+            # matrix [our entity, their entity] of overlaps
+            touch = ((x0 < ox1) & (x0 + self.w > ox0)
+                     & (y0 < oy1) & (y0 + self.h > oy0) & free)
+            taken = touch.any(axis=0)
+            if not taken.any():
+                continue
+            # each taken entity belongs to the first row that touches it
+            owners = np.unique(touch[:, taken].argmax(axis=0))
+            hits += len(owners)
+            self.alive[idx[owners]] = False
+            free &= ~taken
+
+        other.alive[theirs[~free]] = False
+        return hits
+
+    def draw(self, screen):
+        """
+        Blit the image once for every living entity on the screen.
+        """
+        n = self.count
+        y = self.y[:n]
+        # skip entities that are alive but outside the screen
+        live = np.flatnonzero(self.alive[:n] & (y < HEIGHT) & (y + self.h > 0))
+        image = self.image
+        positions = zip(self.x[live].tolist(), self.y[live].tolist())
+        screen.blits([(image, pos) for pos in positions], doreturn=False)
+
+
+# ---------- ARRAY GAME ----------
+class ArrayGame(Game):
+    """
+    The same rules as Game, but bullets and aliens live in EntityStores
+    instead of sprite groups. The player stays a normal sprite.
+    """
+    def __init__(self, assets, seed=None, waves=None):
+        super().__init__(assets, seed=seed, waves=waves)
+        # replace the bullet and alien groups with array stores
+        self.bullets = EntityStore(assets.laser, cull="top")
+        self.aliens = EntityStore(assets.alien, cull="bottom")
+
+    def fire(self):
+        """
+        Shoot two bullets from the top of the player.
+        """
+        rect = self.player.rect
+        w, h = self.bullets.w, self.bullets.h
+        # same places as Bullet(centerx=..., bottom=rect.top) in answer.py
+        self.bullets.spawn(rect.centerx - w // 2, rect.top - h, -10)
+        self.bullets.spawn(rect.x - w // 2, rect.top - h, -10)
+
+    def add_aliens(self, batch):
+        """
+        Add a whole batch of (x, y, speed) to the alien store at once.
+        """
+        if len(batch) == 1:
+            self.aliens.spawn(*batch[0])
+        else:
+            xs, ys, speeds = zip(*batch)
+            self.aliens.spawn_many(xs, ys, speeds)
+
+    def update(self, keys):
+        """
+        Move the player, then all bullets and aliens with array operations.
+        """
+        self.player.update(keys)
+        self.bullets.update()
+        self.aliens.update()
+
+    def check_collisions(self):
+        """
+        Remove aliens hit by bullets, add score, and take lives on contact.
+        """
+        hits = self.aliens.collide_store(self.bullets)
+        self.score += hits * ALIEN_POINTS
+        if self.aliens.collide_rect(self.player.rect):
+            self.lives -= 1
+            if self.lives <= 0:
+                self.running = False
+
+    def draw(self, screen, font):
+        """
+        Draw the background, the stores, the player and the HUD text.
+        """
+        if self.assets.background:
+            screen.blit(self.assets.background, (0, 0))
+        else:
+            screen.fill((0, 0, 0))
+        self.bullets.draw(screen)
+        self.aliens.draw(screen)
+        screen.blit(self.player.image, self.player.rect)
+        self.draw_hud(screen, font)
+
+
+# ---------- BENCHMARK ----------
+def benchmark(bullets=50000, aliens=200, frames=60):
+    """
+    Time the simulation (update + collisions) and the drawing with many
+    bullets in flight, for sprite groups and for the array store.
+    Returns a dict of milliseconds per frame.
+    """
+    from answer import Assets, Bullet, Alien
+
+    screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    assets = Assets()
+    results = {}
+
+    for kind in ("sprites", "arrays"):
+        rng = random.Random(0)
+        random.seed(0)
+        # fill two screens' worth of height with bullets and add some aliens
+        if kind == "sprites":
+            bullet_group = pygame.sprite.Group(
+                Bullet(assets, rng.randint(0, WIDTH), rng.randint(0, 2 * HEIGHT))
+                for _ in range(bullets))
+            alien_group = pygame.sprite.Group(
+                Alien(assets, rng.randint(0, WIDTH), rng.randint(-60, HEIGHT))
+                for _ in range(aliens))
+        else:
+            bullet_store = EntityStore(assets.laser, cull="top")
+            alien_store = EntityStore(assets.alien, cull="bottom")
+            for _ in range(bullets):
+                bullet_store.spawn(rng.randint(0, WIDTH) - 8, rng.randint(0, 2 * HEIGHT) - 32, -10)
+            for _ in range(aliens):
+                alien_store.spawn(rng.randint(0, WIDTH), rng.randint(-60, HEIGHT), random.randint(2, 5))
+
+        # time the simulation (update + collisions) and drawing separately
+        sim = draw = 0.0
+        for _ in range(frames):
+            start = time.perf_counter()
+            if kind == "sprites":
+                bullet_group.update()
+                alien_group.update()
+                pygame.sprite.groupcollide(alien_group, bullet_group, True, True)
+            else:
+                bullet_store.update()
+                alien_store.update()
+                alien_store.collide_store(bullet_store)
+            middle = time.perf_counter()
+            screen.fill((0, 0, 0))
+            if kind == "sprites":
+                bullet_group.draw(screen)
+                alien_group.draw(screen)
+            else:
+                bullet_store.draw(screen)
+                alien_store.draw(screen)
+            sim += middle - start
+            draw += time.perf_counter() - middle
+        results[kind + "_sim_ms"] = sim * 1000 / frames
+        results[kind + "_draw_ms"] = draw * 1000 / frames
+
+    return results
+
+
+def main():
+    """
+    Run the benchmark and print milliseconds per frame.
+    The draw time is mostly blitting and is about the same for both.
+    """
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    pygame.init()
+    for bullets in (10000, 50000):
+        r = benchmark(bullets=bullets)
+        print(f"{bullets:>6} bullets: "
+              f"sprites sim {r['sprites_sim_ms']:6.2f} ms draw {r['sprites_draw_ms']:6.2f} ms | "
+              f"arrays sim {r['arrays_sim_ms']:6.2f} ms draw {r['arrays_draw_ms']:6.2f} ms")
+    pygame.quit()
+    return 0
+
+
+# run the benchmark only if this script is executed directly
+if __name__ == "__main__":
+    sys.exit(main())
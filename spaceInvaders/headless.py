@@ -0,0 +1,326 @@
+"""
+SPACE INVADERS HEADLESS RUNNER
+
+Runs the same Game rules as answer.py, but without a real window and
+without clock.tick(60), so the game logic is stepped as fast as the CPU
+allows. Useful for soak-testing on machines that have no display.
+
+Steps:
+  1. Switch SDL to the dummy video driver (no window)
+  2. Input policies: what the "player" presses each frame
+  3. run_headless(): step the game for a frame count or a time budget
+  4. Report frames per second
+
+Usage (from any folder):
+  python headless.py --frames 10000
+  python headless.py --seconds 5 --policy random --draw
+"""
+
+import os        # import os to select the SDL video driver
+import sys       # import sys to exit with a status code
+import time      # import time to measure how fast the loop runs
+import random    # import random for the random input policy
+import argparse  # import argparse to read options from the command line
+import functools # import functools to pass options to the Game class
+
+# use the dummy video driver BEFORE pygame creates any display,
+# so no real window is opened (keep a driver chosen by the user)
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import pygame  # import pygame after the driver has been chosen
+
+from answer import WIDTH, HEIGHT, Assets, Game
+from profiler import FrameProfiler, NullProfiler
+
+
+# ---------- INPUT POLICIES ----------
+def make_keys(left=False, right=False):
+    """
+    Build a fake key state that Player.update can read like
+    the result of pygame.key.get_pressed().
+    """
+    return {pygame.K_LEFT: left, pygame.K_RIGHT: right}
+
+
+def idle_policy(frame, game, rng):
+    """
+    Never move and never shoot.
+    """
+    return make_keys(), False
+
+
+def hold_fire_policy(frame, game, rng):
+    """
+    Stand still and shoot every 5 frames (like holding SPACE).
+    """
+    return make_keys(), frame % 5 == 0
+
+
+def random_policy(frame, game, rng):
+    """
+    Move left or right at random and shoot now and then.
+    """
+    # pick a direction: -1 left, 0 stay, 1 right
+    direction = rng.choice((-1, 0, 1))
+    # shoot on roughly one frame out of ten
+    fire = rng.random() < 0.1
+    return make_keys(left=direction < 0, right=direction > 0), fire
+
+
+# map policy names (used on the command line) to policy functions
+POLICIES = {
+    "idle": idle_policy,
+    "fire": hold_fire_policy,
+    "random": random_policy,
+}
+
+
+# ---------- HEADLESS LOOP ----------
+def run_headless(frames=None, seconds=None, policy=random_policy,
+                 seed=None, draw=False, make_game=Game, dirty=False,
+                 profiler=None, capture=None):
+    """
+    Step the game as fast as possible and return a dict of results.
+
+    frames  -- stop after this many frames (None = no frame limit)
+    seconds -- stop after this much wall time (None = no time limit)
+    policy  -- function (frame, game, rng) -> (keys, fire), where fire
+               is True / False or a number of SPACE presses
+    seed    -- seed for the random module so runs can be repeated
+    draw    -- also draw every frame to the (invisible) screen surface
+    make_game -- function (assets) -> new game, for example Game
+    dirty   -- draw with the dirty rectangle renderer (implies draw)
+    profiler -- a profiler.FrameProfiler to time each phase of each frame
+    capture -- (folder, "png" or "raw") to save every frame (implies draw)
+
+    When a game ends (no lives left) a new game starts, so long
+    soak runs keep going until the frame count or time budget is used.
+    """
+    # at least one limit is needed, otherwise the loop never ends
+    if frames is None and seconds is None:
+        raise ValueError("give a frame count, a time budget, or both")
+
+    # seed the random module used by the game (alien x and speed)
+    random.seed(seed)
+    # use a separate random generator for the input policy
+    rng = random.Random(seed)
+
+    # initialize pygame and create an invisible screen surface;
+    # convert_alpha() in load_image needs a display mode to be set
+    pygame.init()
+    screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    # load the images and (only if drawing) a font for the HUD
+    assets = Assets()
+    draw = draw or dirty or capture is not None
+    font = pygame.font.SysFont(None, 32) if draw else None
+    # the dirty renderer clears and redraws only what changed
+    renderer = None
+    if dirty:
+        from dirty_render import DirtyRenderer
+        renderer = DirtyRenderer(screen, assets)
+
+    # save the drawn frames from a background thread (capture.py)
+    capturer = None
+    if capture:
+        from capture import FrameCapture
+        # nothing runs in real time here, so wait for the writer
+        # instead of dropping frames
+        capturer = FrameCapture(capture[0], screen, capture[1], policy="wait")
+
+    # time the phases only when a profiler was given
+    if profiler is None:
+        profiler = NullProfiler()
+
+    # start the first game
+    game = make_game(assets)
+    # counters for the final report
+    frame = 0
+    games = 1
+    best_score = 0
+
+    # remember when the run started
+    start = time.perf_counter()
+    while True:
+        # stop when the frame limit is reached
+        if frames is not None and frame >= frames:
+            break
+        # stop when the time budget is used up
+        if seconds is not None and time.perf_counter() - start >= seconds:
+            break
+
+        profiler.start_frame()
+        # ask the policy what to press this frame
+        keys, fire = policy(frame, game, rng)
+        # shooting works like SPACE key presses in main();
+        # fire is True / False or the number of presses this frame
+        for _ in range(int(fire)):
+            game.fire()
+        profiler.mark("events")
+        # run the same spawn / update / collision rules as main()
+        game.spawn_aliens()
+        profiler.mark("spawn")
+        game.update(keys)
+        profiler.mark("update")
+        game.check_collisions()
+        profiler.mark("collisions")
+        # optionally draw, but never call display.flip()
+        if renderer:
+            renderer.draw(game, font, present=False)
+        elif draw:
+            game.draw(screen, font)
+        profiler.mark("draw")
+        if capturer:
+            capturer.capture(screen)
+            profiler.mark("capture")
+        profiler.end_frame()
+        frame += 1
+
+        # if the player ran out of lives, start a fresh game
+        if not game.running:
+            best_score = max(best_score, game.score)
+            game = make_game(assets)
+            games += 1
+            # the renderer still remembers the old game's sprites;
+            # they will simply be cleared on the next frame
+
+    # total wall time of the loop
+    elapsed = time.perf_counter() - start
+    # wait for the frames still being written (not part of the fps)
+    capture_stats = capturer.close() if capturer else None
+    # include the game that was still running at the end
+    best_score = max(best_score, game.score)
+    pygame.quit()
+
+    result = {
+        "frames": frame,
+        "seconds": elapsed,
+        "fps": frame / elapsed if elapsed > 0 else 0.0,
+        "games": games,
+        "best_score": best_score,
+    }
+    # share of the screen the dirty renderer redrew on average
+    if renderer:
+        result["redrawn"] = renderer.average_fraction()
+    if capture_stats:
+        result["capture"] = capture_stats
+    # games can add their own numbers (for example pool counters)
+    if hasattr(game, "report"):
+        result.update(game.report())
+    return result
+
+
+# ---------- OPTIONS ----------
+def add_game_options(parser):
+    """
+    Add the options that choose how the game runs and is drawn.
+    Shared by headless.py and replay.py.
+    """
+    parser.add_argument("--draw", action="store_true",
+                        help="also draw each frame to the invisible screen")
+    parser.add_argument("--broadphase", action="store_true",
+                        help="use the spatial hash for collisions")
+    parser.add_argument("--arrays", action="store_true",
+                        help="keep bullets and aliens in NumPy arrays")
+    parser.add_argument("--dirty", action="store_true",
+                        help="draw with dirty rectangles (implies --draw)")
+    parser.add_argument("--profile", metavar="PATH",
+                        help="time every phase and save the trace (.csv or .json)")
+    parser.add_argument("--pool", choices=("grow", "drop", "recycle"),
+                        help="reuse bullets and aliens from pools with this policy")
+    parser.add_argument("--pixel-perfect", action="store_true",
+                        help="count hits only where non-transparent pixels touch")
+    parser.add_argument("--waves", metavar="FILE",
+                        help="spawn the aliens from a wave file (see waves.py)")
+    parser.add_argument("--capture", metavar="DIR",
+                        help="save every frame to DIR from a background thread")
+    parser.add_argument("--capture-format", choices=("png", "raw"), default="png",
+                        help="PNG files or one raw video file (default png)")
+
+
+def game_factory(parser, args, **game_options):
+    """
+    Return a function (assets) -> game for the options in args.
+    game_options (for example seed) are passed on to the game class.
+    """
+    # the dirty renderer draws sprites, which the array store does not have
+    if args.dirty and args.arrays:
+        parser.error("--dirty needs sprites and cannot be used with --arrays")
+    if args.pixel_perfect and args.arrays:
+        parser.error("--pixel-perfect needs sprites and cannot be used with --arrays")
+
+    # a wave file is passed on to every kind of game
+    if args.waves:
+        game_options["waves"] = args.waves
+    if args.arrays:
+        from entity_store import ArrayGame
+        return functools.partial(ArrayGame, **game_options)
+    if args.pool:
+        from pools import PooledGame
+        return functools.partial(PooledGame, policy=args.pool, broadphase=args.broadphase,
+                                 pixel_perfect=args.pixel_perfect, **game_options)
+    return functools.partial(Game, broadphase=args.broadphase,
+                             pixel_perfect=args.pixel_perfect, **game_options)
+
+
+def capture_option(args):
+    """
+    Return the capture argument of run_headless() for the options in args.
+    """
+    return (args.capture, args.capture_format) if args.capture else None
+
+
+def print_report(result, profiler=None, profile_path=None):
+    """
+    Print the results of run_headless() and, if given, save the
+    profiler trace and print its per-phase percentiles.
+    """
+    print(f"frames:     {result['frames']}")
+    print(f"seconds:    {result['seconds']:.3f}")
+    print(f"fps:        {result['fps']:.1f}")
+    print(f"games:      {result['games']}")
+    print(f"best score: {result['best_score']}")
+    # print any extra numbers the game reported
+    for name, value in result.items():
+        if name not in ("frames", "seconds", "fps", "games", "best_score"):
+            print(f"{name}: {value}")
+    # save the trace and print the per-phase percentiles
+    if profiler:
+        profiler.dump(profile_path)
+        for phase, times in profiler.summary().items():
+            print(f"{phase:<11} p50 {times['p50_ms']:.4f} ms  "
+                  f"p95 {times['p95_ms']:.4f} ms  p99 {times['p99_ms']:.4f} ms")
+
+
+# ---------- MAIN ----------
+def main(argv=None):
+    """
+    Read command line options, run the headless loop and print a report.
+    """
+    parser = argparse.ArgumentParser(description="Run Space Invaders without a window.")
+    parser.add_argument("--frames", type=int, help="number of frames to simulate")
+    parser.add_argument("--seconds", type=float, help="time budget in seconds")
+    parser.add_argument("--policy", choices=sorted(POLICIES), default="random",
+                        help="input policy (default: random)")
+    parser.add_argument("--seed", type=int, help="random seed")
+    add_game_options(parser)
+    args = parser.parse_args(argv)
+
+    # default to a 10 000 frame run when no limit was given
+    if args.frames is None and args.seconds is None:
+        args.frames = 10000
+
+    # pick which kind of game to run
+    make_game = game_factory(parser, args)
+    profiler = FrameProfiler(window=100000) if args.profile else None
+
+    result = run_headless(frames=args.frames, seconds=args.seconds,
+                          policy=POLICIES[args.policy], seed=args.seed,
+                          draw=args.draw, make_game=make_game, dirty=args.dirty,
+                          profiler=profiler, capture=capture_option(args))
+    print_report(result, profiler, args.profile)
+    return 0
+
+
+# run main() only if this script is executed directly
+if __name__ == "__main__":
+    sys.exit(main())
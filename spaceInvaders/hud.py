@@ -0,0 +1,196 @@
+"""
+SPACE INVADERS HUD TEXT CACHE
+
+answer.py used to call font.render("Score: ...") and font.render("Lives: ...")
+every frame, although the numbers change only a few times per game.
+Rendering TrueType text is slow compared with blitting a ready surface.
+
+HudCache keeps rendered text and only makes new surfaces when the text
+changes. Numbers are built from a small "glyph atlas": the digits 0-9
+are rendered once into one surface, and a new score costs just a few
+small blits of those digits.
+
+Steps:
+  1. TextCache: remembers rendered surfaces for recent texts
+  2. DigitAtlas: the digits rendered once, cut into one subsurface each
+  3. Counter: "Label: 123" made from a label surface and digit blits
+  4. HudCache: one TextCache and the counters for a font
+  5. Benchmark against font.render every frame (run this file)
+"""
+
+import os    # import os to select the SDL video driver for the benchmark
+import sys   # import sys to exit with a status code
+import time  # import time to measure the benchmark
+import weakref  # import weakref so a cache goes away with its font
+
+import pygame  # import pygame for fonts and surfaces
+
+
+# ---------- TEXT CACHE ----------
+class TextCache:
+    """
+    TextCache renders a text once and hands out the same surface
+    again while it is one of the max_items most recently used texts.
+    """
+    def __init__(self, font, max_items=64):
+        self.font = font
+        self.max_items = max_items
+        # (text, color) -> surface, least recently used first
+        self.surfaces = {}
+
+    def render(self, text, color):
+        """
+        Return a surface for text in color, rendering it only if needed.
+        """
+        key = (text, color)
+        surface = self.surfaces.pop(key, None)
+        if surface is None:
+            surface = self.font.render(text, True, color)
+            # forget the least recently used text when the cache is full
+            if len(self.surfaces) >= self.max_items:
+                del self.surfaces[next(iter(self.surfaces))]
+        # (re)insert so the key becomes the most recently used
+        self.surfaces[key] = surface
+        return surface
+
+
+# ---------- DIGIT ATLAS ----------
+class DigitAtlas:
+    """
+    DigitAtlas renders "0123456789-" once and keeps one subsurface
+    (a view into the same pixels) for every character.
+    """
+    CHARS = "0123456789-"
+
+    def __init__(self, font, color):
+        # render all the characters next to each other in one surface
+        self.surface = font.render(self.CHARS, True, color)
+        height = self.surface.get_height()
+        self.glyphs = {}
+        # font.size() of the text before a character tells where it starts
+        for i, char in enumerate(self.CHARS):
+            left = font.size(self.CHARS[:i])[0]
+            right = font.size(self.CHARS[:i + 1])[0]
+            self.glyphs[char] = self.surface.subsurface((left, 0, right - left, height))
+
+
+# ---------- COUNTER ----------
+class Counter:
+    """
+    Counter draws "<label><number>" from a pre-rendered label and the
+    digit atlas, and rebuilds its surface only when the number changes.
+    """
+    def __init__(self, font, label, color, atlas):
+        self.label = font.render(label, True, color)
+        self.atlas = atlas
+        # the number shown and the surface built for it
+        self.value = None
+        self.surface = None
+
+    def render(self, value):
+        """
+        Return a surface showing the label followed by value.
+        """
+        if value != self.value:
+            glyphs = [self.atlas.glyphs[char] for char in str(value)]
+            label = self.label
+            width = label.get_width() + sum(g.get_width() for g in glyphs)
+            height = max(label.get_height(), self.atlas.surface.get_height())
+            # a transparent surface to copy the label and digits onto
+            surface = pygame.Surface((width, height), pygame.SRCALPHA)
+            surface.blit(label, (0, 0))
+            x = label.get_width()
+            for glyph in glyphs:
+                surface.blit(glyph, (x, 0))
+                x += glyph.get_width()
+            self.value = value
+            self.surface = surface
+        return self.surface
+
+
+# ---------- HUD CACHE ----------
+class HudCache:
+    """
+    HudCache holds everything cached for one font: plain texts
+    and one Counter per (label, color).
+    """
+    def __init__(self, font):
+        self.font = font
+        self.texts = TextCache(font)
+        # color -> DigitAtlas
+        self.atlases = {}
+        # (label, color) -> Counter
+        self.counters = {}
+
+    def text(self, text, color):
+        """
+        Return a surface for a plain text.
+        """
+        return self.texts.render(text, color)
+
+    def counter(self, label, value, color):
+        """
+        Return a surface for "<label><value>" (value must be an int).
+        """
+        counter = self.counters.get((label, color))
+        if counter is None:
+            atlas = self.atlases.get(color)
+            if atlas is None:
+                atlas = self.atlases[color] = DigitAtlas(self.font, color)
+            counter = self.counters[(label, color)] = Counter(self.font, label, color, atlas)
+        return counter.render(value)
+
+
+# font -> HudCache, so every game drawn with the same font shares a
+# cache; an entry is dropped when its font is no longer used anywhere
+caches = weakref.WeakKeyDictionary()
+
+
+def cache_for(font):
+    """
+    Return the HudCache for font, creating it the first time.
+    """
+    cache = caches.get(font)
+    if cache is None:
+        # the cache refers to the font weakly, or the font would keep
+        # its own entry alive
+        cache = caches[font] = HudCache(weakref.proxy(font))
+    return cache
+
+
+# ---------- BENCHMARK ----------
+def main(frames=10000):
+    """
+    Time drawing "Score" and "Lives" with font.render every frame
+    against the cache, with the score changing every 100 frames.
+    """
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    pygame.init()
+    screen = pygame.display.set_mode((800, 600))
+    font = pygame.font.SysFont(None, 32)
+    white = (255, 255, 255)
+
+    start = time.perf_counter()
+    for frame in range(frames):
+        score = frame // 100 * 10
+        screen.blit(font.render(f"Score: {score}", True, white), (10, 10))
+        screen.blit(font.render("Lives: 3", True, white), (680, 10))
+    plain = time.perf_counter() - start
+
+    cache = cache_for(font)
+    start = time.perf_counter()
+    for frame in range(frames):
+        score = frame // 100 * 10
+        screen.blit(cache.counter("Score: ", score, white), (10, 10))
+        screen.blit(cache.counter("Lives: ", 3, white), (680, 10))
+    cached = time.perf_counter() - start
+
+    print(f"font.render: {plain * 1e6 / frames:.1f} us/frame")
+    print(f"cached:      {cached * 1e6 / frames:.1f} us/frame")
+    pygame.quit()
+    return 0
+
+
+# run the benchmark only if this script is executed directly
+if __name__ == "__main__":
+    sys.exit(main())
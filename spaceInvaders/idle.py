@@ -0,0 +1,120 @@
+"""
+SPACE INVADERS IDLE-AWARE EVENT LOOP
+
+A loop that polls pygame.event.get() without sleeping keeps one CPU core
+at 100% even when nothing on the screen changes, like game_over_screen()
+waiting for a key. With many games running on the same machine (kiosks)
+that time is better left to the others.
+
+IdleLoop has two tools:
+  - wait_for_event(): sleep inside SDL until an event arrives (or a
+    timeout passes), for screens that do not change at all: game over,
+    pause, or a window that lost focus
+  - pace(): the end-of-frame clock.tick(), but at a lower frame rate
+    once nothing has moved for a while
+
+It also measures process CPU time against wall time, so it can report
+how much CPU the idle parts used and an estimate of what they saved
+compared with running at the active frame rate.
+
+Steps:
+  1. Blocking event waits with a timeout
+  2. Frame pacing: active frame rate, idle frame rate
+  3. CPU accounting and the report
+"""
+
+import time  # import time for wall time and process CPU time
+
+import pygame  # import pygame for events and the clock
+
+
+# ---------- IDLE LOOP ----------
+class IdleLoop:
+    """
+    IdleLoop decides how long the game may sleep between frames and
+    waits for events without spinning.
+
+    fps        -- frame rate while things move (0 = as fast as possible)
+    idle_fps   -- frame rate once nothing moved for idle_after frames
+    wait_timeout -- longest single sleep in wait_for_event(), in ms
+    """
+    def __init__(self, clock, fps=60, idle_fps=15, idle_after=30, wait_timeout=500):
+        self.clock = clock
+        self.fps = fps
+        self.idle_fps = idle_fps
+        self.idle_after = idle_after
+        self.wait_timeout = wait_timeout
+        # frames in a row in which nothing moved
+        self.still_frames = 0
+
+        # wall and CPU seconds, split by what the loop was doing
+        self.wall = {"active": 0.0, "idle": 0.0, "waiting": 0.0}
+        self.cpu = {"active": 0.0, "idle": 0.0, "waiting": 0.0}
+        self.frames = {"active": 0, "idle": 0}
+        self.waits = 0
+        self.mark = (time.perf_counter(), time.process_time())
+
+    def account(self, kind):
+        # add the time since the last mark to kind and start a new mark
+        wall, cpu = time.perf_counter(), time.process_time()
+        self.wall[kind] += wall - self.mark[0]
+        self.cpu[kind] += cpu - self.mark[1]
+        self.mark = (wall, cpu)
+
+    @property
+    def idle(self):
+        """
+        True once nothing has moved for idle_after frames.
+        """
+        return self.still_frames >= self.idle_after
+
+    # ---------- PACING ----------
+    def pace(self, moving):
+        """
+        End a frame: sleep until the next one is due. moving says whether
+        anything on the screen moved or changed this frame.
+        """
+        if moving:
+            self.still_frames = 0
+        else:
+            self.still_frames += 1
+        kind = "idle" if self.idle else "active"
+        self.clock.tick(self.idle_fps if kind == "idle" else self.fps)
+        self.frames[kind] += 1
+        self.account(kind)
+
+    # ---------- WAITING ----------
+    def wait_for_event(self, timeout=None):
+        """
+        Sleep until an event arrives and return it, or return None after
+        timeout milliseconds (default: wait_timeout). Nothing is drawn
+        while waiting, so use it only when the screen does not change.
+        """
+        # time spent before the wait belongs to the frame that led to it
+        self.account("active")
+        event = pygame.event.wait(self.wait_timeout if timeout is None else timeout)
+        self.waits += 1
+        self.account("waiting")
+        # the next frame starts fresh
+        self.still_frames = 0
+        return None if event.type == pygame.NOEVENT else event
+
+    # ---------- REPORT ----------
+    def stats(self):
+        """
+        Return wall / CPU seconds per state and the estimated CPU seconds
+        saved: the idle and waiting wall time at the CPU rate measured
+        while active, minus the CPU they really used.
+        """
+        active_rate = self.cpu["active"] / self.wall["active"] if self.wall["active"] else 1.0
+        quiet_wall = self.wall["idle"] + self.wall["waiting"]
+        quiet_cpu = self.cpu["idle"] + self.cpu["waiting"]
+        return {
+            "active_frames": self.frames["active"],
+            "idle_frames": self.frames["idle"],
+            "waits": self.waits,
+            "wall_s": dict(self.wall),
+            "cpu_s": dict(self.cpu),
+            "active_cpu_rate": active_rate,
+            "cpu_saved_s": max(0.0, quiet_wall * min(active_rate, 1.0) - quiet_cpu),
+        }
@@ -0,0 +1,303 @@
+"""
+SPACE INVADERS OBJECT POOLS
+
+Every SPACE press in answer.py creates two new Bullet objects and every
+spawn creates a new Alien; kill() then throws them away. Under rapid
+fire that means a steady stream of new objects for the garbage
+collector. A pool creates the sprites once and hands them out again:
+kill() puts a pooled sprite back into its pool instead of losing it.
+
+Steps:
+  1. PooledBullet / PooledAlien: sprites that can be reset and go
+     back to their pool when killed
+  2. SpritePool: pre-allocates sprites, hands them out, counts hits
+  3. PooledGame: the Game rules using pools for bullets and aliens
+  4. Benchmark: frame times and memory allocated (run this file)
+"""
+
+import array   # import array to store frame times without allocating
+import os      # import os to select the SDL video driver for the benchmark
+import sys     # import sys to exit with a status code
+import time    # import time to measure frame times
+import random  # import random for random alien speeds
+import tracemalloc  # import tracemalloc to measure allocations in the benchmark
+
+import pygame  # import pygame for sprites and groups
+
+from answer import WIDTH, HEIGHT, ALIEN_SPEED_MIN, ALIEN_SPEED_MAX, Bullet, Alien, Game
+
+
+# ---------- POOLED SPRITES ----------
+class PooledBullet(Bullet):
+    """
+    A Bullet that can be reused. It starts off-screen and is placed
+    by reset(); kill() returns it to the pool that owns it.
+    """
+    def __init__(self, assets, pool=None):
+        # set up the sprite without a position yet
+        pygame.sprite.Sprite.__init__(self)
+        self.image = assets.laser
+        self.rect = self.image.get_rect()
+        self.speed = -10
+        # the pool this bullet goes back to when it is killed
+        self.pool = pool
+
+    def reset(self, x, y):
+        """
+        Place the bullet like Bullet.__init__ does.
+        """
+        self.rect.centerx = x
+        self.rect.bottom = y
+        self.speed = -10
+
+    def kill(self):
+        # only sprites that were in use go back to the pool
+        in_use = self.alive()
+        super().kill()
+        if in_use and self.pool is not None:
+            self.pool.release(self)
+
+
+class PooledAlien(Alien):
+    """
+    An Alien that can be reused. Its random speed is chosen in reset(),
+    so creating spare aliens does not use up random numbers.
+    """
+    def __init__(self, assets, pool=None):
+        # set up the sprite without a position or speed yet
+        pygame.sprite.Sprite.__init__(self)
+        self.image = assets.alien
+        self.rect = self.image.get_rect()
+        self.speed_y = 0
+        # the pool this alien goes back to when it is killed
+        self.pool = pool
+
+    def reset(self, x, y, rng=random, speed_y=None):
+        """
+        Place the alien and pick its speed like Alien.__init__ does.
+        """
+        self.rect.x = x
+        self.rect.y = y
+        self.speed_y = rng.randint(ALIEN_SPEED_MIN, ALIEN_SPEED_MAX) if speed_y is None else speed_y
+
+    def kill(self):
+        # only sprites that were in use go back to the pool
+        in_use = self.alive()
+        super().kill()
+        if in_use and self.pool is not None:
+            self.pool.release(self)
+
+
+# ---------- SPRITE POOL ----------
+# what acquire() does when no free sprite is left:
+#   "grow"    -- create a new sprite (counted as a miss)
+#   "drop"    -- create nothing and return None (the shot / spawn is skipped)
+#   "recycle" -- take back the oldest sprite still in use
+POLICIES = ("grow", "drop", "recycle")
+
+
+class SpritePool:
+    """
+    SpritePool keeps spare sprites of one kind and hands them out.
+    Handed-out sprites are added to the given groups; when they are
+    killed they come back to the pool by themselves.
+    """
+    def __init__(self, sprite_class, assets, groups, capacity=64, policy="grow"):
+        # refuse policies we do not know
+        if policy not in POLICIES:
+            raise ValueError(f"unknown pool policy {policy!r}, use one of {POLICIES}")
+        # "recycle" takes back a sprite in use, so it needs at least one
+        if capacity < (1 if policy == "recycle" else 0):
+            raise ValueError(f"pool capacity {capacity} is too small for policy {policy!r}")
+        self.sprite_class = sprite_class
+        self.assets = assets
+        # groups every handed-out sprite joins (for example all_sprites, bullets)
+        self.groups = groups
+        self.capacity = capacity
+        self.policy = policy
+        # spare sprites, ready to use
+        self.free = [sprite_class(assets, self) for _ in range(capacity)]
+        # sprites in use, oldest first (dict keeps insertion order)
+        self.in_use = {}
+
+        # counters
+        self.requests = 0    # calls to acquire()
+        self.hits = 0        # requests served by a spare sprite
+        self.misses = 0      # requests that found no spare sprite
+        self.created = capacity  # sprites created in total
+        self.dropped = 0     # requests that got nothing ("drop" policy)
+        self.recycled = 0    # sprites taken back early ("recycle" policy)
+        self.high_water = 0  # most sprites in use at the same time
+
+    def acquire(self, x, y, *args):
+        """
+        Return a sprite placed at (x, y) and added to the groups,
+        or None if the pool is empty and the policy is "drop".
+        Extra args are passed on to the sprite's reset().
+        """
+        self.requests += 1
+        if self.free:
+            self.hits += 1
+        else:
+            self.misses += 1
+            if self.policy == "grow":
+                self.free.append(self.sprite_class(self.assets, self))
+                self.created += 1
+            elif self.policy == "drop":
+                self.dropped += 1
+                return None
+            else:
+                # killing the oldest sprite puts it back into self.free
+                oldest = next(iter(self.in_use))
+                oldest.kill()
+                self.recycled += 1
+
+        sprite = self.free.pop()
+        sprite.reset(x, y, *args)
+        sprite.add(*self.groups)
+        self.in_use[sprite] = None
+        self.high_water = max(self.high_water, len(self.in_use))
+        return sprite
+
+    def release(self, sprite):
+        """
+        Take a killed sprite back (called by the sprite's kill()).
+        """
+        del self.in_use[sprite]
+        self.free.append(sprite)
+
+    def stats(self):
+        """
+        Return the pool counters as a dict.
+        """
+        return {
+            "requests": self.requests,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / self.requests if self.requests else 1.0,
+            "created": self.created,
+            "dropped": self.dropped,
+            "recycled": self.recycled,
+            "in_use": len(self.in_use),
+            "high_water": self.high_water,
+        }
+
+
+# ---------- POOLED GAME ----------
+class PooledGame(Game):
+    """
+    The same rules as Game, but bullets and aliens come from pools.
+    """
+    def __init__(self, assets, bullet_capacity=128, alien_capacity=32,
+                 policy="grow", **options):
+        super().__init__(assets, **options)
+        # bullets join all_sprites and bullets, aliens all_sprites and aliens
+        self.bullet_pool = SpritePool(PooledBullet, assets,
+                                      (self.all_sprites, self.bullets),
+                                      bullet_capacity, policy)
+        self.alien_pool = SpritePool(PooledAlien, assets,
+                                     (self.all_sprites, self.aliens),
+                                     alien_capacity, policy)
+
+    def fire(self):
+        """
+        Shoot two bullets from the top of the player.
+        """
+        self.bullet_pool.acquire(self.player.rect.centerx, self.player.rect.top)
+        self.bullet_pool.acquire(self.player.rect.x, self.player.rect.top)
+
+    def add_aliens(self, batch):
+        """
+        Take an alien from the pool for every (x, y, speed) in batch.
+        """
+        for x, y, speed in batch:
+            self.alien_pool.acquire(x, y, self.rng, speed)
+
+    def report(self):
+        """
+        Pool counters, added to the results of headless.run_headless().
+        """
+        return {"bullet_pool": self.bullet_pool.stats(),
+                "alien_pool": self.alien_pool.stats()}
+
+
+# ---------- BENCHMARK ----------
+def run(game, keys, times):
+    """
+    Hold fire for one frame per slot of times and store every frame
+    time there (an array made beforehand, so storing allocates nothing).
+    """
+    for i in range(len(times)):
+        start = time.perf_counter()
+        game.fire()
+        game.step(keys)
+        times[i] = time.perf_counter() - start
+        # keep the game going even if the player loses all lives
+        game.running = True
+
+
+def benchmark(make_game, assets, frames=20000):
+    """
+    Hold fire for many frames and return the worst and p99 frame
+    times in milliseconds, then run the same frames again under
+    tracemalloc and return the peak memory allocated on top of the
+    start and the memory and blocks still held at the end.
+    """
+    keys = {pygame.K_LEFT: False, pygame.K_RIGHT: False}
+
+    random.seed(0)
+    times = array.array("d", bytes(8 * frames))
+    run(make_game(assets), keys, times)
+    times = sorted(times)
+
+    # tracing slows every allocation down, so it gets its own run
+    random.seed(0)
+    game = make_game(assets)
+    slots = array.array("d", bytes(8 * frames))
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    tracemalloc.reset_peak()
+    base = tracemalloc.get_traced_memory()[0]
+    run(game, keys, slots)
+    peak = tracemalloc.get_traced_memory()[1] - base
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    # the blocks still held at the end, from the lines that made them
+    growth = after.compare_to(before, "lineno")
+
+    return {
+        "p99_ms": times[int(len(times) * 0.99)] * 1000,
+        "max_ms": times[-1] * 1000,
+        "peak_kb": peak / 1024,
+        "kept_kb": sum(stat.size_diff for stat in growth) / 1024,
+        "kept_blocks": sum(stat.count_diff for stat in growth),
+    }
+
+
+def main():
+    """
+    Compare plain sprites with pooled sprites under rapid fire.
+    """
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    pygame.init()
+    pygame.display.set_mode((WIDTH, HEIGHT))
+    from answer import Assets
+    assets = Assets()
+
+    results = {}
+    for name, make_game in (("plain", Game), ("pooled", PooledGame)):
+        r = results[name] = benchmark(make_game, assets)
+        print(f"{name:>6}: p99 {r['p99_ms']:.3f} ms, worst {r['max_ms']:.3f} ms, "
+              f"peak {r['peak_kb']:.1f} KiB, kept {r['kept_kb']:.1f} KiB "
+              f"in {r['kept_blocks']} blocks")
+    plain, pooled = results["plain"], results["pooled"]
+    # frame times jitter by a few percent from run to run
+    if abs(plain["p99_ms"] - pooled["p99_ms"]) < 0.1 * plain["p99_ms"]:
+        print("the pool makes no measurable difference to p99 frame time")
+    pygame.quit()
+    return 0
+
+
+# run the benchmark only if this script is executed directly
+if __name__ == "__main__":
+    sys.exit(main())
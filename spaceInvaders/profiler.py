@@ -0,0 +1,184 @@
+"""
+SPACE INVADERS FRAME PROFILER
+
+Times each phase of a frame (events, spawning, updates, collisions,
+drawing, display flip) with time.perf_counter_ns(), so a slow frame can
+be blamed on the right part of the loop.
+
+  - rolling p50 / p95 / p99 for every phase over the last frames
+  - an optional overlay that draws those numbers on the screen
+  - a per-frame trace written to CSV or JSON when the game ends
+
+When profiling is off, the loop uses NullProfiler, whose methods do
+nothing, so the cost is a few empty method calls per frame.
+
+Steps:
+  1. NullProfiler: the do-nothing profiler
+  2. FrameProfiler: start_frame / mark(phase) / end_frame
+  3. Percentiles over a rolling window
+  4. Overlay drawing
+  5. Trace dump to CSV / JSON
+"""
+
+import csv   # import csv to write the trace as a table
+import json  # import json to write the trace as JSON
+from collections import deque     # import deque for the rolling windows
+from time import perf_counter_ns  # import perf_counter_ns for timing
+
+import pygame  # import pygame to draw the overlay
+
+
+# ---------- CONFIG ----------
+# phases of the main() loop, in the order they happen
+PHASES = ("events", "spawn", "update", "collisions", "draw", "overlay", "capture", "flip")
+
+
+# ---------- NULL PROFILER ----------
+class NullProfiler:
+    """
+    A profiler that does nothing; used when profiling is off.
+    """
+    enabled = False
+
+    def start_frame(self):
+        pass
+
+    def mark(self, phase):
+        pass
+
+    def end_frame(self):
+        pass
+
+
+# ---------- FRAME PROFILER ----------
+class FrameProfiler:
+    """
+    FrameProfiler measures how long each phase of every frame takes.
+    Call start_frame() at the top of the loop, mark(phase) right after
+    each phase, and end_frame() when the frame is done.
+    """
+    enabled = True
+
+    def __init__(self, window=600, trace=True):
+        # how many recent frames the percentiles are taken over
+        self.window = window
+        # phase -> the last `window` durations in nanoseconds
+        self.samples = {}
+        # one dict of phase -> nanoseconds per frame, if trace is True
+        self.trace = [] if trace else None
+        self.frames = 0
+        # timing of the frame in progress
+        self.current = {}
+        self.frame_start = 0
+        self.last = 0
+        # the overlay is re-rendered only every few frames
+        self.overlay = None
+        self.overlay_frame = -1
+
+    def start_frame(self):
+        """
+        Begin timing a new frame.
+        """
+        self.current = {}
+        self.frame_start = self.last = perf_counter_ns()
+
+    def mark(self, phase):
+        """
+        Record the time since the previous mark (or frame start) as phase.
+        """
+        now = perf_counter_ns()
+        self.current[phase] = self.current.get(phase, 0) + now - self.last
+        self.last = now
+
+    def end_frame(self):
+        """
+        Finish the frame: store its phase times and total time.
+        """
+        current = self.current
+        current["frame"] = perf_counter_ns() - self.frame_start
+        for phase, duration in current.items():
+            window = self.samples.get(phase)
+            if window is None:
+                window = self.samples[phase] = deque(maxlen=self.window)
+            window.append(duration)
+        if self.trace is not None:
+            self.trace.append(current)
+        self.frames += 1
+
+    # ---------- PERCENTILES ----------
+    def percentiles(self, phase, points=(50, 95, 99)):
+        """
+        Return the given percentiles of a phase in milliseconds,
+        over the rolling window.
+        """
+        values = sorted(self.samples.get(phase, ()))
+        if not values:
+            return tuple(0.0 for _ in points)
+        last = len(values) - 1
+        return tuple(values[min(last, last * p // 100)] / 1e6 for p in points)
+
+    def summary(self):
+        """
+        Return phase -> {"p50_ms", "p95_ms", "p99_ms"} for every phase seen.
+        """
+        result = {}
+        for phase in self.phase_names():
+            p50, p95, p99 = self.percentiles(phase)
+            result[phase] = {"p50_ms": p50, "p95_ms": p95, "p99_ms": p99}
+        return result
+
+    def phase_names(self):
+        """
+        Known phases first, in loop order, then any others, then "frame".
+        """
+        extra = [p for p in self.samples if p not in PHASES and p != "frame"]
+        names = [p for p in PHASES if p in self.samples] + extra
+        if "frame" in self.samples:
+            names.append("frame")
+        return names
+
+    # ---------- OVERLAY ----------
+    def draw_overlay(self, screen, font, every=30):
+        """
+        Draw a box with p50 / p95 / p99 per phase at the bottom-left of
+        the screen and return its rect. The text is rebuilt every
+        `every` frames, in between the same surface is blitted again.
+        """
+        if self.overlay is None or self.frames - self.overlay_frame >= every:
+            lines = [f"{'phase':<11}{'p50':>7}{'p95':>7}{'p99':>7} ms"]
+            for phase in self.phase_names():
+                p50, p95, p99 = self.percentiles(phase)
+                lines.append(f"{phase:<11}{p50:>7.2f}{p95:>7.2f}{p99:>7.2f}")
+            rendered = [font.render(line, True, (255, 255, 0)) for line in lines]
+            width = max(r.get_width() for r in rendered) + 8
+            height = sum(r.get_height() for r in rendered) + 8
+            # a dark, mostly opaque box behind the text
+            box = pygame.Surface((width, height), pygame.SRCALPHA)
+            box.fill((0, 0, 0, 200))
+            y = 4
+            for r in rendered:
+                box.blit(r, (4, y))
+                y += r.get_height()
+            self.overlay = box
+            self.overlay_frame = self.frames
+        return screen.blit(self.overlay, (0, screen.get_height() - self.overlay.get_height()))
+
+    # ---------- TRACE ----------
+    def dump(self, path):
+        """
+        Write the per-frame trace to path: CSV for ".csv", otherwise JSON.
+        Times are in nanoseconds.
+        """
+        if self.trace is None:
+            raise ValueError("this profiler was created with trace=False")
+        names = self.phase_names()
+        if path.endswith(".csv"):
+            with open(path, "w", newline="") as f:
+                writer = csv.writer(f)
+                writer.writerow(["frame"] + [f"{name}_ns" for name in names])
+                for i, frame in enumerate(self.trace):
+                    writer.writerow([i] + [frame.get(name, 0) for name in names])
+        else:
+            with open(path, "w") as f:
+                json.dump({"phases": names, "summary": self.summary(),
+                           "frames": self.trace}, f)
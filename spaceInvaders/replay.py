@@ -0,0 +1,239 @@
+"""
+SPACE INVADERS RECORD AND REPLAY
+
+Two runs of answer.py are never the same: aliens use random positions
+and speeds, and the keys come from a real person. To compare two
+versions of the renderer or the collision code we need the exact same
+game twice.
+
+Recording (python answer.py --record game.sirec) gives the game its own
+seeded random generator and writes, for every game tick, which arrow keys
+were held and how many times SPACE was pressed. Replaying
+(python replay.py game.sirec) runs the same seed and the same inputs
+through the headless loop as fast as possible, and checks that the
+final score matches the recording. The game options that change what
+happens (pixel-perfect hits, the wave file) are saved too and used
+again on replay; the wave file is copied into the recording.
+
+File format (all little-endian):
+  header   "SIRC", version (1 byte), seed (8 bytes)
+  options  length (4 bytes), then JSON: {"pixel_perfect": bool,
+           "waves": the parsed wave file or null} (since version 2)
+  frames   run-length pairs: (repeat count 1-255, input byte)
+           input byte: bit 0 = LEFT, bit 1 = RIGHT, bits 2-7 = SPACE presses
+  end      a pair with count 0, then frames (4 bytes) and score (4 bytes)
+
+Steps:
+  1. Packing one frame of input into a byte
+  2. Recorder: write the header, frames and trailer
+  3. read_recording(): read a file back
+  4. replay(): run it through headless.run_headless()
+"""
+
+import sys       # import sys to exit with a status code
+import json      # import json to save the game options
+import struct    # import struct to pack numbers into bytes
+import argparse  # import argparse to read options from the command line
+
+from answer import Game
+from headless import (make_keys, run_headless, add_game_options,
+                      game_factory, capture_option, print_report)
+from profiler import FrameProfiler
+
+
+# ---------- FORMAT ----------
+MAGIC = b"SIRC"
+VERSION = 2
+HEADER = struct.Struct("<4sBq")   # magic, version, seed
+OPTIONS = struct.Struct("<I")     # length of the options JSON
+# what a version 1 recording (no options) was played with
+DEFAULT_OPTIONS = {"pixel_perfect": False, "waves": None}
+TRAILER = struct.Struct("<II")    # frames, final score
+# at most 63 SPACE presses fit in the 6 bits of one input byte
+MAX_PRESSES = 63
+
+
+def pack_input(left, right, presses):
+    """
+    Pack one frame of input into a single byte. More than MAX_PRESSES
+    presses do not fit and raise ValueError.
+    """
+    if not 0 <= presses <= MAX_PRESSES:
+        raise ValueError(f"{presses} SPACE presses in one frame, at most {MAX_PRESSES} fit")
+    return bool(left) | bool(right) << 1 | presses << 2
+
+
+def unpack_input(byte):
+    """
+    Turn an input byte back into (left, right, presses).
+    """
+    return bool(byte & 1), bool(byte & 2), byte >> 2
+
+
+def game_options(pixel_perfect=False, waves=None):
+    """
+    The options a recording keeps: the ones that change the game.
+    waves is a wave file name; its contents are kept, so the recording
+    replays the same waves even if the file changes later.
+    """
+    if waves is not None:
+        with open(waves) as f:
+            waves = json.load(f)
+    return {"pixel_perfect": bool(pixel_perfect), "waves": waves}
+
+
+# ---------- RECORDER ----------
+class Recorder:
+    """
+    Recorder writes one input byte per frame, run-length encoded,
+    so long stretches of the same input take only two bytes. options
+    comes from game_options().
+    """
+    def __init__(self, path, seed, options=None):
+        options = json.dumps(options or DEFAULT_OPTIONS, separators=(",", ":")).encode("utf-8")
+        self.file = open(path, "wb")
+        self.file.write(HEADER.pack(MAGIC, VERSION, seed))
+        self.file.write(OPTIONS.pack(len(options)) + options)
+        self.frames = 0
+        # the input byte being repeated and how many times so far
+        self.byte = None
+        self.count = 0
+
+    def frame(self, left, right, presses):
+        """
+        Record the input of one frame.
+        """
+        byte = pack_input(left, right, presses)
+        if byte == self.byte and self.count < 255:
+            self.count += 1
+        else:
+            self.flush()
+            self.byte = byte
+            self.count = 1
+        self.frames += 1
+
+    def flush(self):
+        # write the pending run, if there is one
+        if self.count:
+            self.file.write(bytes((self.count, self.byte)))
+            self.count = 0
+
+    def close(self, score):
+        """
+        Write the last run, the end marker and the final score.
+        """
+        self.flush()
+        self.file.write(bytes((0, 0)))
+        self.file.write(TRAILER.pack(self.frames, score))
+        self.file.close()
+
+
+# ---------- READING ----------
+def read_recording(path):
+    """
+    Return (seed, input bytes (one per frame), final score, game
+    options) from a recording. Raises ValueError if the file is not a
+    recording or is cut short.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    if len(data) < HEADER.size:
+        raise ValueError(f"{path} is not a Space Invaders recording")
+    magic, version, seed = HEADER.unpack_from(data)
+    if magic != MAGIC or version not in (1, VERSION):
+        raise ValueError(f"{path} is not a version 1 or {VERSION} Space Invaders recording")
+
+    pos = HEADER.size
+    options = DEFAULT_OPTIONS
+    if version >= 2:
+        if pos + OPTIONS.size > len(data):
+            raise ValueError(f"{path} is truncated: the options are missing")
+        (length,) = OPTIONS.unpack_from(data, pos)
+        pos += OPTIONS.size
+        if pos + length > len(data):
+            raise ValueError(f"{path} is truncated: the options are cut short")
+        try:
+            saved = json.loads(data[pos:pos + length])
+        except ValueError:
+            raise ValueError(f"{path} is damaged: the options are not JSON") from None
+        options = {name: saved.get(name, default) for name, default in DEFAULT_OPTIONS.items()}
+        pos += length
+
+    inputs = bytearray()
+    while True:
+        if pos + 2 > len(data):
+            raise ValueError(f"{path} is truncated: no end marker after {len(inputs)} frames")
+        count, byte = data[pos], data[pos + 1]
+        pos += 2
+        if count == 0:
+            break
+        inputs.extend(bytes((byte,)) * count)
+    if pos + TRAILER.size > len(data):
+        raise ValueError(f"{path} is truncated: the trailer is missing")
+    frames, score = TRAILER.unpack_from(data, pos)
+    if frames != len(inputs):
+        raise ValueError(f"{path} is damaged: {len(inputs)} frames, trailer says {frames}")
+    return seed, bytes(inputs), score, options
+
+
+# ---------- REPLAY ----------
+def replay(path, make_game=None, draw=False, dirty=False, profiler=None, capture=None):
+    """
+    Replay a recording headless and unthrottled. make_game is called
+    as make_game(assets, seed=...) and defaults to answer.Game; the
+    recorded options are added when they are not the defaults
+    (pixel_perfect=True, waves=the parsed wave file).
+    Returns the run_headless() results plus the recorded score.
+    """
+    seed, inputs, score, options = read_recording(path)
+    # the game must use the recorded seed and options to see the same aliens
+    make_game = make_game or Game
+    extra = {name: value for name, value in options.items() if value != DEFAULT_OPTIONS[name]}
+
+    def policy(frame, game, rng):
+        # feed the recorded input of this frame
+        left, right, presses = unpack_input(inputs[frame])
+        return make_keys(left, right), presses
+
+    result = run_headless(frames=len(inputs), policy=policy, draw=draw,
+                          make_game=lambda assets: make_game(assets, seed=seed, **extra),
+                          dirty=dirty, profiler=profiler, capture=capture)
+    result["recorded_score"] = score
+    # a replay of a finished game ends with a restart, so check the
+    # best score; a game quit early is still running at the last frame
+    result["matches"] = result["best_score"] == score
+    return result
+
+
+# ---------- MAIN ----------
+def main(argv=None):
+    """
+    Replay a recording with the chosen game options and print a report.
+    """
+    parser = argparse.ArgumentParser(description="Replay a recorded Space Invaders game.")
+    parser.add_argument("recording", help="file written by answer.py --record")
+    add_game_options(parser)
+    args = parser.parse_args(argv)
+
+    # the recording says how the game was played; options that would
+    # change it are refused rather than giving a silent mismatch
+    options = read_recording(args.recording)[3]
+    if args.waves:
+        parser.error("the recording has its own waves; --waves cannot be used")
+    if args.pixel_perfect and not options["pixel_perfect"]:
+        parser.error("the game was recorded without --pixel-perfect")
+    if args.pool in ("drop", "recycle"):
+        parser.error(f"--pool {args.pool} can change the game; replay with --pool grow")
+    args.pixel_perfect = options["pixel_perfect"]
+    make_game = game_factory(parser, args)
+    profiler = FrameProfiler(window=100000) if args.profile else None
+    result = replay(args.recording, make_game, draw=args.draw,
+                    dirty=args.dirty, profiler=profiler, capture=capture_option(args))
+    print_report(result, profiler, args.profile)
+    # exit with an error if the replay did not reproduce the game
+    return 0 if result["matches"] else 1
+
+
+# run main() only if this script is executed directly
+if __name__ == "__main__":
+    sys.exit(main())
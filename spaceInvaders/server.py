@@ -0,0 +1,528 @@
+"""
+SPACE INVADERS SESSION SERVER
+
+Hosts many headless games ("sessions") in one asyncio process. Clients
+connect over TCP or a Unix socket, send their keys, and get the state
+of their game back after every tick.
+
+  - one shared scheduler task ticks every session at the tick rate, so
+    a thousand sessions still cost a single timer
+  - the state goes out as small binary deltas: sprites that appeared
+    (with their speed) and sprites that disappeared. Bullets and aliens
+    move in straight lines, so the client moves them itself and nothing
+    has to be sent while they fly. A full snapshot is sent when a game
+    starts or a slow client has to catch up, and a checking keyframe
+    every few seconds
+  - the scheduler measures how long each tick takes for all sessions,
+    so the report shows how many sessions fit on one core
+
+Messages (little-endian, each prefixed with a 4-byte length):
+  client -> server   b"I" + input byte (replay.pack_input: LEFT, RIGHT,
+                     SPACE presses since the last input); anything else
+                     closes the connection
+  server -> client   b"D" delta, b"S" snapshot (new ids), b"K" keyframe
+                     (full state with the current ids, for checking):
+                       tick u32, player x i16, score u32, lives u8,
+                       removed count u16, added count u16,
+                       removed ids (u16 each),
+                       added sprites (id u16, kind u8, x i16, y i16, speed i8)
+
+Steps:
+  1. Encoding and decoding the state messages
+  2. Session: one game and the ids of its sprites
+  3. GameServer: connections, the shared tick scheduler, metrics
+  4. Loopback client (for testing)
+  5. Benchmark: tick time for a growing number of sessions
+
+Usage:
+  python server.py serve --unix /tmp/invaders.sock
+  python server.py client --unix /tmp/invaders.sock --clients 50 --seconds 10
+  python server.py bench --sessions 1 16 64 256
+"""
+
+import os        # import os to select the SDL video driver
+import sys       # import sys to exit with a status code
+import struct    # import struct to pack messages into bytes
+import random    # import random for seeds and the client's inputs
+import asyncio   # import asyncio for sockets and the tick scheduler
+import argparse  # import argparse to read options from the command line
+import tempfile  # import tempfile for the benchmark's socket path
+
+# no window: use the dummy video driver before pygame starts
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import pygame  # import pygame for the game rules
+
+from answer import WIDTH, HEIGHT, Assets, Bullet, Game
+from headless import POLICIES, make_keys
+from profiler import FrameProfiler
+from replay import pack_input, unpack_input
+
+
+# ---------- MESSAGES ----------
+# u32: a snapshot of a crowded game can be larger than 64 KB
+LENGTH = struct.Struct("<I")
+HEADER = struct.Struct("<cIhIBHH")  # type, tick, player x, score, lives, removed, added
+REMOVED = struct.Struct("<H")
+ADDED = struct.Struct("<HBhhb")     # id, kind, x, y, speed
+INPUT = struct.Struct("<cB")        # b"I", input byte
+
+# kinds of sprites in the messages
+BULLET, ALIEN = 0, 1
+# a client whose unsent data grows past this is skipped until it catches up
+MAX_BUFFER = 256 * 1024
+# SPACE presses one session may queue for a tick; more are ignored
+MAX_PRESSES = 4
+
+
+def encode_state(kind, tick, game, removed, added):
+    """
+    Build one state message (with its length prefix). added is a list of
+    (id, sprite) pairs.
+    """
+    parts = [HEADER.pack(kind, tick, game.player.rect.x, game.score, max(game.lives, 0),
+                         len(removed), len(added))]
+    parts.extend(REMOVED.pack(i) for i in removed)
+    for i, sprite in added:
+        if isinstance(sprite, Bullet):
+            parts.append(ADDED.pack(i, BULLET, sprite.rect.x, sprite.rect.y, sprite.speed))
+        else:
+            parts.append(ADDED.pack(i, ALIEN, sprite.rect.x, sprite.rect.y, sprite.speed_y))
+    body = b"".join(parts)
+    return LENGTH.pack(len(body)) + body
+
+
+def decode_state(body):
+    """
+    Turn a state message (without its length prefix) into
+    (kind, tick, player x, score, lives, removed ids, added) where added
+    maps id -> (kind, x, y, speed).
+    """
+    kind, tick, player_x, score, lives, n_removed, n_added = HEADER.unpack_from(body)
+    pos = HEADER.size
+    removed = [REMOVED.unpack_from(body, pos + 2 * i)[0] for i in range(n_removed)]
+    pos += 2 * n_removed
+    added = {}
+    for _ in range(n_added):
+        i, sprite_kind, x, y, speed = ADDED.unpack_from(body, pos)
+        added[i] = (sprite_kind, x, y, speed)
+        pos += ADDED.size
+    return kind, tick, player_x, score, lives, removed, added
+
+
+# ---------- SESSION ----------
+class Session:
+    """
+    One client's game, its latest input and the ids its sprites have
+    in the messages.
+    """
+    def __init__(self, assets, writer, seed, make_game=Game):
+        self.assets = assets
+        self.writer = writer
+        self.seed = seed
+        self.make_game = make_game
+        self.game = make_game(assets, seed=seed)
+        # input: the keys held and SPACE presses since the last tick
+        self.keys = make_keys()
+        self.presses = 0
+        # sprite -> id, for the sprites the client knows about
+        self.ids = {}
+        self.next_id = 0
+        # the next message must be a full snapshot
+        self.needs_snapshot = True
+        self.games = 1
+        self.skipped = 0  # ticks not sent because the client was slow
+
+    def set_input(self, byte):
+        """
+        Take one input byte from the client.
+        """
+        left, right, presses = unpack_input(byte)
+        self.keys = make_keys(left, right)
+        self.presses = min(self.presses + presses, MAX_PRESSES)
+
+    def tick(self, tick):
+        """
+        Run one tick of the game and return the message for the client,
+        or None if nothing should be sent.
+        """
+        game = self.game
+        for _ in range(self.presses):
+            game.fire()
+        self.presses = 0
+        game.step(self.keys)
+        # a finished game starts again, like in headless.py
+        if not game.running:
+            self.game = self.make_game(self.assets, seed=self.seed + self.games)
+            self.games += 1
+            self.needs_snapshot = True
+
+        # a client that cannot keep up gets nothing until its buffer
+        # drains; then a snapshot brings it up to date
+        if self.writer.transport.get_write_buffer_size() > MAX_BUFFER:
+            self.needs_snapshot = True
+            self.skipped += 1
+            return None
+        if self.needs_snapshot:
+            self.needs_snapshot = False
+            return self.snapshot(tick, b"S")
+        return self.delta(tick)
+
+    def sprites(self):
+        # every sprite the client draws besides the player
+        player = self.game.player
+        return [sprite for sprite in self.game.all_sprites if sprite is not player]
+
+    def new_id(self):
+        # ids wrap around at 65536; sprites never live that long
+        i = self.next_id
+        self.next_id = (i + 1) & 0xFFFF
+        return i
+
+    def delta(self, tick):
+        """
+        Message with the sprites that appeared and disappeared this tick.
+        """
+        ids = self.ids
+        current = {}
+        added = []
+        for sprite in self.sprites():
+            i = ids.get(sprite)
+            if i is None:
+                i = self.new_id()
+                added.append((i, sprite))
+            current[sprite] = i
+        removed = [i for sprite, i in ids.items() if sprite not in current]
+        self.ids = current
+        return encode_state(b"D", tick, self.game, removed, added)
+
+    def snapshot(self, tick, kind):
+        """
+        Message with every sprite. b"S" gives them new ids, b"K" (a
+        keyframe, sent after a delta) uses the ids the client already has.
+        """
+        if kind == b"S":
+            self.ids = {sprite: self.new_id() for sprite in self.sprites()}
+        return encode_state(kind, tick, self.game, [], [(i, s) for s, i in self.ids.items()])
+
+
+# ---------- SERVER ----------
+class GameServer:
+    """
+    GameServer accepts clients, keeps one Session per connection and
+    ticks all of them from a single scheduler task.
+    """
+    def __init__(self, tick_rate=60, keyframe_every=600, make_game=Game, metrics_every=5.0):
+        self.tick_rate = tick_rate
+        self.dt = 1.0 / tick_rate
+        self.keyframe_every = keyframe_every
+        self.make_game = make_game
+        self.metrics_every = metrics_every
+        self.sessions = set()
+        self.next_seed = 0
+        self.tick = 0
+
+        # pygame and the images are shared by every session
+        pygame.init()
+        pygame.display.set_mode((WIDTH, HEIGHT))
+        self.assets = Assets()
+
+        # timing of every tick: "update" (all games) and "send" (all messages)
+        self.profiler = FrameProfiler(window=tick_rate * 10, trace=False)
+        self.late_ticks = 0   # ticks that started after their time
+        self.bytes_sent = 0
+        self.server = None
+
+    async def start(self, host=None, port=None, path=None):
+        """
+        Listen on a Unix socket (path) or TCP (host, port).
+        """
+        if path:
+            self.server = await asyncio.start_unix_server(self.handle, path, backlog=1024)
+        else:
+            self.server = await asyncio.start_server(self.handle, host, port, backlog=1024)
+        return self.server
+
+    async def handle(self, reader, writer):
+        """
+        Serve one client: create its session and read its inputs until
+        it disconnects.
+        """
+        session = Session(self.assets, writer, self.next_seed, self.make_game)
+        self.next_seed += 1000
+        self.sessions.add(session)
+        try:
+            while True:
+                (length,) = LENGTH.unpack(await reader.readexactly(LENGTH.size))
+                # the only message a client sends is an input; anything
+                # else is a broken or hostile client, which is dropped
+                if length != INPUT.size:
+                    break
+                body = await reader.readexactly(length)
+                if body[:1] != b"I":
+                    break
+                session.set_input(INPUT.unpack(body)[1])
+        except (asyncio.IncompleteReadError, OSError):
+            pass
+        finally:
+            self.sessions.discard(session)
+            writer.close()
+
+    async def run(self):
+        """
+        The shared scheduler: tick every session tick_rate times a second.
+        """
+        loop = asyncio.get_running_loop()
+        next_time = loop.time()
+        last_metrics = next_time
+        while True:
+            self.step()
+            next_time += self.dt
+            delay = next_time - loop.time()
+            if delay < 0:
+                self.late_ticks += 1
+                # far behind: start counting again from now instead of
+                # running many ticks back to back
+                if delay < -5 * self.dt:
+                    next_time = loop.time()
+                delay = 0
+            if self.metrics_every and loop.time() - last_metrics >= self.metrics_every:
+                last_metrics = loop.time()
+                print(self.metrics_line(), flush=True)
+            await asyncio.sleep(delay)
+
+    def step(self):
+        """
+        Run one tick of every session and send the messages.
+        """
+        profiler = self.profiler
+        profiler.start_frame()
+        self.tick += 1
+        keyframe = self.tick % self.keyframe_every == 0
+        outgoing = []
+        failed = []
+        for session in self.sessions:
+            try:
+                message = session.tick(self.tick)
+                if message is not None and keyframe:
+                    message += session.snapshot(self.tick, b"K")
+            except struct.error:
+                # a state the message format cannot hold ends this
+                # session only, not the scheduler
+                failed.append(session)
+                continue
+            if message is not None:
+                outgoing.append((session.writer, message))
+        for session in failed:
+            self.sessions.discard(session)
+            session.writer.close()
+        profiler.mark("update")
+        for writer, message in outgoing:
+            writer.write(message)
+            self.bytes_sent += len(message)
+        profiler.mark("send")
+        profiler.end_frame()
+
+    def metrics(self):
+        """
+        Return the current numbers: sessions, tick time percentiles, the
+        share of the tick budget used, and how many sessions would fit.
+        """
+        p50, p95, p99 = self.profiler.percentiles("frame")
+        budget_ms = self.dt * 1000
+        sessions = len(self.sessions)
+        return {
+            "sessions": sessions,
+            "tick_p50_ms": p50,
+            "tick_p99_ms": p99,
+            "budget_used": p99 / budget_ms,
+            # sessions per core if the p99 tick grew linearly with sessions
+            "sessions_per_core": int(sessions * budget_ms / p99) if p99 > 0 else None,
+            "late_ticks": self.late_ticks,
+            "bytes_sent": self.bytes_sent,
+            "skipped": sum(session.skipped for session in self.sessions),
+        }
+
+    def metrics_line(self):
+        m = self.metrics()
+        return (f"{m['sessions']:>5} sessions  tick p50 {m['tick_p50_ms']:.2f} ms  "
+                f"p99 {m['tick_p99_ms']:.2f} ms  ({m['budget_used']:.0%} of budget)  "
+                f"~{m['sessions_per_core']} sessions/core  late ticks {m['late_ticks']}")
+
+
+# ---------- LOOPBACK CLIENT ----------
+class Client:
+    """
+    A test client: keeps a copy of the game state from the messages,
+    moves the sprites itself, answers every tick with an input from a
+    headless.py policy, and checks its copy against the keyframes.
+    """
+    def __init__(self, policy="random", seed=0):
+        self.policy = POLICIES[policy]
+        self.rng = random.Random(seed)
+        self.sprites = {}  # id -> [kind, x, y, speed]
+        self.player_x = self.score = self.lives = 0
+        self.ticks = 0
+        self.bytes = 0
+        self.keyframes = 0
+        self.mismatches = 0
+
+    async def run(self, host=None, port=None, path=None, seconds=10.0):
+        """
+        Connect, play for the given time and disconnect.
+        """
+        if path:
+            reader, writer = await asyncio.open_unix_connection(path)
+        else:
+            reader, writer = await asyncio.open_connection(host, port)
+        loop = asyncio.get_running_loop()
+        end = loop.time() + seconds
+        try:
+            while loop.time() < end:
+                (length,) = LENGTH.unpack(await reader.readexactly(LENGTH.size))
+                body = await reader.readexactly(length)
+                self.bytes += LENGTH.size + length
+                if self.receive(body):
+                    keys, fire = self.policy(self.ticks, None, self.rng)
+                    byte = pack_input(keys[pygame.K_LEFT], keys[pygame.K_RIGHT], int(fire))
+                    writer.write(LENGTH.pack(INPUT.size) + INPUT.pack(b"I", byte))
+        except (asyncio.IncompleteReadError, OSError):
+            pass
+        finally:
+            writer.close()
+
+    def receive(self, body):
+        """
+        Apply one state message. Returns True if it was a new tick
+        (a delta or a snapshot) that should be answered with an input.
+        """
+        kind, tick, player_x, score, lives, removed, added = decode_state(body)
+        if kind == b"K":
+            # the keyframe repeats the state just sent as a delta
+            self.keyframes += 1
+            state = {i: list(sprite) for i, sprite in added.items()}
+            if state != self.sprites or (player_x, score, lives) != (
+                    self.player_x, self.score, self.lives):
+                self.mismatches += 1
+            return False
+        if kind == b"S":
+            self.sprites = {}
+        else:
+            # everything the client knows moved one tick
+            for sprite in self.sprites.values():
+                sprite[2] += sprite[3]
+            for i in removed:
+                self.sprites.pop(i, None)
+        for i, sprite in added.items():
+            self.sprites[i] = list(sprite)
+        self.player_x, self.score, self.lives = player_x, score, lives
+        self.ticks += 1
+        return True
+
+
+async def run_clients(count, seconds, policy="random", **address):
+    """
+    Run count loopback clients at once and return them.
+    """
+    clients = [Client(policy, seed=i) for i in range(count)]
+    await asyncio.gather(*(client.run(seconds=seconds, **address) for client in clients))
+    return clients
+
+
+# ---------- BENCHMARK ----------
+async def bench(session_counts, seconds, tick_rate):
+    """
+    For every session count, run that many loopback clients against a
+    fresh server and print the tick times.
+    """
+    print(f"{'sessions':>8}{'p50 ms':>9}{'p99 ms':>9}{'budget':>8}{'per core':>10}"
+          f"{'B/tick/session':>16}{'mismatches':>12}")
+    with tempfile.TemporaryDirectory() as folder:
+        for count in session_counts:
+            path = os.path.join(folder, f"bench-{count}.sock")
+            # a keyframe every second lets the clients check their copies
+            server = GameServer(tick_rate, keyframe_every=tick_rate, metrics_every=0)
+            await server.start(path=path)
+            scheduler = asyncio.create_task(server.run())
+            clients = asyncio.create_task(run_clients(count, seconds + 1, path=path))
+            # measure after a second of warm-up
+            await asyncio.sleep(1)
+            server.profiler = FrameProfiler(window=tick_rate * int(seconds + 1), trace=False)
+            ticks_before, bytes_before = server.tick, server.bytes_sent
+            await asyncio.sleep(seconds)
+            m = server.metrics()
+            ticks = max(server.tick - ticks_before, 1)
+            per_tick = (server.bytes_sent - bytes_before) / ticks / max(count, 1)
+            done = await clients
+            scheduler.cancel()
+            server.server.close()
+            await server.server.wait_closed()
+            mismatches = sum(client.mismatches for client in done)
+            print(f"{count:>8}{m['tick_p50_ms']:>9.2f}{m['tick_p99_ms']:>9.2f}"
+                  f"{m['budget_used']:>8.0%}{m['sessions_per_core'] or 0:>10}"
+                  f"{per_tick:>16.1f}{mismatches:>12}")
+
+
+# ---------- MAIN ----------
+def main(argv=None):
+    """
+    serve: run the server; client: run loopback clients; bench: measure.
+    """
+    parser = argparse.ArgumentParser(description="Host many headless Space Invaders games.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    def add_address(p):
+        # where the server listens / the clients connect
+        p.add_argument("--unix", metavar="PATH", help="Unix socket path")
+        p.add_argument("--host", default="127.0.0.1", help="TCP host (default 127.0.0.1)")
+        p.add_argument("--port", type=int, default=8765, help="TCP port (default 8765)")
+
+    serve = commands.add_parser("serve", help="run the server")
+    add_address(serve)
+    serve.add_argument("--tick-rate", type=int, default=60, help="ticks per second")
+    serve.add_argument("--metrics-every", type=float, default=5.0,
+                       help="seconds between metrics lines (0 = never)")
+
+    client = commands.add_parser("client", help="run loopback test clients")
+    add_address(client)
+    client.add_argument("--clients", type=int, default=1, help="number of clients")
+    client.add_argument("--seconds", type=float, default=10.0, help="how long to play")
+    client.add_argument("--policy", choices=sorted(POLICIES), default="random")
+
+    benchmark = commands.add_parser("bench", help="tick time for several session counts")
+    benchmark.add_argument("--sessions", type=int, nargs="+", default=[1, 16, 64, 256])
+    benchmark.add_argument("--seconds", type=float, default=3.0, help="measured time per count")
+    benchmark.add_argument("--tick-rate", type=int, default=60, help="ticks per second")
+
+    args = parser.parse_args(argv)
+    address = {"path": args.unix} if getattr(args, "unix", None) else \
+              {"host": getattr(args, "host", None), "port": getattr(args, "port", None)}
+
+    if args.command == "serve":
+        async def serve_forever():
+            server = GameServer(args.tick_rate, metrics_every=args.metrics_every)
+            await server.start(**address)
+            print(f"serving on {args.unix or f'{args.host}:{args.port}'}", flush=True)
+            await server.run()
+        try:
+            asyncio.run(serve_forever())
+        except KeyboardInterrupt:
+            pass
+        return 0
+
+    if args.command == "client":
+        clients = asyncio.run(run_clients(args.clients, args.seconds, args.policy, **address))
+        ticks = sum(c.ticks for c in clients)
+        received = sum(c.bytes for c in clients)
+        mismatches = sum(c.mismatches for c in clients)
+        print(f"{len(clients)} clients, {ticks} ticks, {received / max(ticks, 1):.1f} bytes/tick, "
+              f"{sum(c.keyframes for c in clients)} keyframes, {mismatches} mismatches")
+        return 1 if mismatches else 0
+
+    asyncio.run(bench(args.sessions, args.seconds, args.tick_rate))
+    return 0
+
+
+# run main() only if this script is executed directly
+if __name__ == "__main__":
+    sys.exit(main())
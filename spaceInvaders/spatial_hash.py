@@ -0,0 +1,302 @@
+"""
+SPACE INVADERS SPATIAL HASH (BROADPHASE COLLISIONS)
+
+pygame.sprite.groupcollide checks every alien against every bullet,
+so the cost grows like (number of bullets) x (number of aliens).
+A spatial hash splits the screen into square cells and remembers which
+sprites touch which cells. A sprite only needs to be checked against the
+sprites that share a cell with it.
+
+Steps:
+  1. SpatialHash: a dict from (column, row) cells to sets of sprites
+  2. SpatialGroup: a sprite Group that keeps its SpatialHash up to date
+  3. groupcollide / spritecollide with the same results as pygame's
+  4. Benchmark against pygame.sprite.groupcollide (run this file)
+"""
+
+import os      # import os to select the SDL video driver for the benchmark
+import sys     # import sys to exit with a status code
+import time    # import time to measure the benchmark
+import random  # import random to scatter sprites in the benchmark
+
+import pygame  # import pygame for sprites, groups and rects
+
+
+# ---------- CONFIG ----------
+# size of one grid cell in pixels; about the size of the largest sprite
+CELL_SIZE = 64
+
+
+# ---------- SPATIAL HASH ----------
+class SpatialHash:
+    """
+    SpatialHash maps grid cells to the sprites whose rect touches them.
+    """
+    def __init__(self, cell_size=CELL_SIZE):
+        # width and height of one square cell
+        self.cell_size = cell_size
+        # (column, row) -> set of sprites in that cell
+        self.cells = {}
+        # sprite -> (left col, top row, right col, bottom row) it was stored in
+        self.spans = {}
+        # sprite -> copy of its rect when it was last bucketed, so a sprite
+        # that did not move costs one rect comparison
+        self.rects = {}
+
+    def span(self, rect):
+        """
+        Return the range of cells covered by rect as (c0, r0, c1, r1).
+        """
+        size = self.cell_size
+        # rect.right and rect.bottom are one pixel past the rect, so
+        # subtract 1 to find the last cell the rect really covers
+        return (rect.left // size, rect.top // size,
+                (rect.right - 1) // size, (rect.bottom - 1) // size)
+
+    def insert(self, sprite):
+        """
+        Add a sprite to every cell its rect covers.
+        """
+        span = self.span(sprite.rect)
+        self.spans[sprite] = span
+        self.rects[sprite] = sprite.rect.copy()
+        c0, r0, c1, r1 = span
+        for col in range(c0, c1 + 1):
+            for row in range(r0, r1 + 1):
+                self.cells.setdefault((col, row), set()).add(sprite)
+
+    def remove(self, sprite):
+        """
+        Remove a sprite from all of its cells.
+        """
+        span = self.spans.pop(sprite, None)
+        # the sprite was not in the hash
+        if span is None:
+            return
+        del self.rects[sprite]
+        c0, r0, c1, r1 = span
+        for col in range(c0, c1 + 1):
+            for row in range(r0, r1 + 1):
+                cell = self.cells[(col, row)]
+                cell.discard(sprite)
+                # drop empty cells so the dict does not keep growing
+                if not cell:
+                    del self.cells[(col, row)]
+
+    def move(self, sprite):
+        """
+        Re-bucket a sprite after its rect moved. Nothing happens
+        unless the sprite crossed into a different set of cells.
+        """
+        rect = sprite.rect
+        if self.spans.get(sprite) != self.span(rect):
+            self.remove(sprite)
+            self.insert(sprite)
+        else:
+            self.rects[sprite] = rect.copy()
+
+    def moved(self):
+        """
+        Return the stored sprites whose rect changed since they were
+        last bucketed.
+        """
+        return [sprite for sprite, rect in self.rects.items() if sprite.rect != rect]
+
+    def query(self, rect):
+        """
+        Return the set of sprites that share at least one cell with rect.
+        These are only candidates: they still need a colliderect check.
+        """
+        c0, r0, c1, r1 = self.span(rect)
+        cells = self.cells
+        found = set()
+        for col in range(c0, c1 + 1):
+            for row in range(r0, r1 + 1):
+                cell = cells.get((col, row))
+                if cell:
+                    found |= cell
+        return found
+
+
+# ---------- SPATIAL GROUP ----------
+class SpatialGroup(pygame.sprite.Group):
+    """
+    A sprite Group that also stores its sprites in a SpatialHash.
+    Adding or killing a sprite updates the hash straight away; sprites
+    that moved are re-bucketed by refresh() before each collision check.
+    """
+    def __init__(self, *sprites, cell_size=CELL_SIZE):
+        # the hash must exist before Group.__init__ adds any sprites
+        self.grid = SpatialHash(cell_size)
+        # sprite -> number telling the order sprites were added in,
+        # so results come back in the same order as a normal Group
+        self.order = {}
+        self.counter = 0
+        super().__init__(*sprites)
+
+    def add_internal(self, sprite, layer=None):
+        # called by pygame whenever a sprite joins this group
+        super().add_internal(sprite, layer)
+        self.counter += 1
+        self.order[sprite] = self.counter
+        self.grid.insert(sprite)
+
+    def remove_internal(self, sprite):
+        # called by pygame whenever a sprite leaves (for example kill())
+        super().remove_internal(sprite)
+        self.order.pop(sprite, None)
+        self.grid.remove(sprite)
+
+    def refresh(self):
+        """
+        Bring the hash up to date: drop sprites that are no longer in the
+        group and re-bucket only the sprites whose rect changed.
+        """
+        grid = self.grid
+        if len(grid.rects) != len(self.spritedict):
+            for sprite in [s for s in grid.rects if s not in self.spritedict]:
+                grid.remove(sprite)
+        for sprite in grid.moved():
+            grid.move(sprite)
+
+    def candidates(self, rect):
+        """
+        Sprites near rect, in no particular order.
+        """
+        return self.grid.query(rect)
+
+    def hits(self, rect):
+        """
+        Sprites whose rect overlaps rect, in the order they were added
+        to the group. Only the real hits (usually none or one) are sorted.
+        """
+        collide = rect.colliderect
+        found = [other for other in self.grid.query(rect) if collide(other.rect)]
+        if len(found) > 1:
+            found.sort(key=self.order.__getitem__)
+        return found
+
+
+# ---------- COLLISIONS ----------
+def spritecollide(sprite, group, dokill):
+    """
+    Same as pygame.sprite.spritecollide, but only checks sprites
+    from nearby cells when group is a SpatialGroup.
+    """
+    # fall back to pygame for ordinary groups
+    if not isinstance(group, SpatialGroup):
+        return pygame.sprite.spritecollide(sprite, group, dokill)
+
+    # make sure sprites that moved this frame are in the right cells
+    group.refresh()
+    # keep only the nearby sprites whose rects really overlap
+    crashed = group.hits(sprite.rect)
+    # remove the hit sprites from all their groups if asked to
+    if dokill:
+        for other in crashed:
+            other.kill()
+    return crashed
+
+
+def groupcollide(groupa, groupb, dokilla, dokillb):
+    """
+    Same as pygame.sprite.groupcollide: returns a dict that maps each
+    sprite of groupa to the list of groupb sprites it hit. groupb should
+    be a SpatialGroup, otherwise pygame's version is used.
+    """
+    # fall back to pygame for ordinary groups
+    if not isinstance(groupb, SpatialGroup):
+        return pygame.sprite.groupcollide(groupa, groupb, dokilla, dokillb)
+
+    # re-bucket moved sprites once for the whole check
+    groupb.refresh()
+    crashed = {}
+    # go through groupa in order; a groupb sprite killed by an earlier
+    # groupa sprite cannot be hit again, exactly like in pygame
+    hits_near = groupb.hits
+    for sprite in groupa.sprites():
+        hits = hits_near(sprite.rect)
+        if not hits:
+            continue
+        if dokillb:
+            for other in hits:
+                other.kill()
+        crashed[sprite] = hits
+        if dokilla:
+            sprite.kill()
+    return crashed
+
+
+# ---------- BENCHMARK ----------
+def make_sprites(count, size, rng):
+    """
+    Return a list of count plain sprites of the given size at random
+    positions on an 800x600 screen.
+    """
+    sprites = []
+    for _ in range(count):
+        sprite = pygame.sprite.Sprite()
+        sprite.rect = pygame.Rect(rng.randint(0, 800 - size[0]),
+                                  rng.randint(0, 600 - size[1]), *size)
+        sprites.append(sprite)
+    return sprites
+
+
+def benchmark(total, repeat=3, seed=0):
+    """
+    Time pygame.sprite.groupcollide against the spatial hash version
+    with total sprites (half aliens, half bullets). Returns a dict.
+    """
+    # build the same aliens and bullets for both groups
+    rng = random.Random(seed)
+    aliens = pygame.sprite.Group(make_sprites(total // 2, (48, 48), rng))
+    bullets = make_sprites(total - total // 2, (16, 32), rng)
+    plain = pygame.sprite.Group(bullets)
+    hashed = SpatialGroup(bullets)
+
+    # dokill is False so every repeat sees the same sprites
+    def best_time(func, group):
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            hits = func(aliens, group, False, False)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best, hits
+
+    brute_time, brute_hits = best_time(pygame.sprite.groupcollide, plain)
+    hash_time, hash_hits = best_time(groupcollide, hashed)
+
+    return {
+        "entities": total,
+        "groupcollide_ms": brute_time * 1000,
+        "spatial_hash_ms": hash_time * 1000,
+        "speedup": brute_time / hash_time if hash_time > 0 else float("inf"),
+        "same_hits": brute_hits == hash_hits,
+    }
+
+
+def main():
+    """
+    Run the benchmark at 100, 1k and 10k entities and print a table.
+    """
+    # the benchmark does not need a window
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    pygame.init()
+
+    print(f"{'entities':>8} {'groupcollide':>14} {'spatial hash':>14} {'speedup':>8}  same hits")
+    ok = True
+    for total, repeat in ((100, 20), (1000, 5), (10000, 1)):
+        r = benchmark(total, repeat)
+        ok = ok and r["same_hits"]
+        print(f"{r['entities']:>8} {r['groupcollide_ms']:>11.2f} ms "
+              f"{r['spatial_hash_ms']:>11.2f} ms {r['speedup']:>7.1f}x  {r['same_hits']}")
+
+    pygame.quit()
+    # exit with an error if the hit sets ever differ
+    return 0 if ok else 1
+
+
+# run the benchmark only if this script is executed directly
+if __name__ == "__main__":
+    sys.exit(main())
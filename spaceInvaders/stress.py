@@ -0,0 +1,451 @@
+"""
+SPACE INVADERS STRESS BENCHMARKS
+
+Runs the game headless under heavy load and measures it, so changes to
+answer.py (or the other game classes) can be checked for slowdowns.
+
+Scenarios:
+  bullet_storm -- SPACE held down: several shots every frame
+  dense_wave   -- thousands of aliens on screen at once
+  mixed        -- the normal rules with random input (steady state)
+  startup      -- imports, window, images, font and the first frame
+
+Every scenario runs in its own Python process, so its peak memory and
+its start-up time are not mixed up with the other scenarios. Each one
+reports frames per second, frame time percentiles and peak RSS (the
+most memory the process used), and the results are saved as JSON.
+"compare" checks a new results file against a stored baseline and
+fails when a number got worse by more than a threshold.
+
+Steps:
+  1. Scenario set-up (one function per scenario)
+  2. The measured frame loop
+  3. Running every scenario in a fresh process
+  4. Comparing results with a baseline
+
+Usage:
+  python stress.py run --out baseline.json
+  python stress.py run --out new.json --baseline baseline.json
+  python stress.py compare baseline.json new.json --threshold 0.1
+"""
+
+import os          # import os to select the SDL video driver
+import sys         # import sys to find the Python interpreter and exit
+import json        # import json to save and load results
+import time        # import time to measure start-up
+import random      # import random for the input policy
+import argparse    # import argparse to read options from the command line
+import platform    # import platform to record the machine in the results
+import tempfile    # import tempfile to build the atlas from scratch once
+import subprocess  # import subprocess to run each scenario in a new process
+
+try:
+    # import resource to read peak memory (not available on Windows)
+    import resource
+except ImportError:
+    resource = None
+
+
+# ---------- CONFIG ----------
+SCENARIOS = ("bullet_storm", "dense_wave", "mixed", "startup")
+
+# metric -> +1 if higher is better, -1 if lower is better
+METRICS = {
+    "fps": +1,
+    "p99_ms": -1,
+    "peak_rss_mb": -1,
+    "startup_ms": -1,
+}
+
+
+def peak_rss_mb():
+    """
+    Return the peak resident memory of this process in megabytes,
+    or None where the resource module does not exist.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    if sys.platform == "darwin":
+        return peak / (1024 * 1024)
+    return peak / 1024
+
+
+# ---------- SCENARIOS ----------
+def bullet_storm(frame, game, rng):
+    """
+    Stand still and press SPACE four times every frame.
+    """
+    return {"left": False, "right": False}, 4
+
+
+def mixed(frame, game, rng):
+    """
+    Move at random and shoot now and then, like headless.random_policy.
+    """
+    direction = rng.choice((-1, 0, 1))
+    return {"left": direction < 0, "right": direction > 0}, rng.random() < 0.1
+
+
+def dense_wave(frame, game, rng, aliens=3000):
+    """
+    Keep about `aliens` aliens alive by spawning a batch every frame,
+    while sweeping left and right and shooting.
+    """
+    # an alien lives about 150-350 frames, so spawning this many per
+    # frame reaches the target during the warm-up and then holds it.
+    # They are added directly, like the ones Game.spawn_aliens makes, so
+    # the game's own spawn timer or wave schedule keeps its pace
+    from answer import WIDTH, SPAWN_Y, SPAWN_MARGIN, ALIEN_SPEED_MIN, ALIEN_SPEED_MAX
+    count = min(max(1, aliens // 150), aliens - len(game.aliens))
+    game.add_aliens([(game.rng.randint(SPAWN_MARGIN, WIDTH - SPAWN_MARGIN), SPAWN_Y,
+                      game.rng.randint(ALIEN_SPEED_MIN, ALIEN_SPEED_MAX))
+                     for _ in range(count)])
+    left = frame // 60 % 2 == 0
+    return {"left": left, "right": not left}, frame % 3 == 0
+
+
+POLICIES = {
+    "bullet_storm": bullet_storm,
+    "dense_wave": dense_wave,
+    "mixed": mixed,
+}
+
+
+# ---------- MEASURED LOOP ----------
+def run_frames(name, args):
+    """
+    Run one load scenario in this process and return its results.
+    """
+    import pygame
+    from answer import WIDTH, HEIGHT, Assets
+    from headless import make_keys, game_factory, add_game_options
+    from profiler import FrameProfiler
+
+    # rebuild the factory with the same game options as the parent
+    parser = argparse.ArgumentParser()
+    add_game_options(parser)
+    make_game = game_factory(parser, args, seed=args.seed)
+
+    pygame.init()
+    screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    assets = Assets()
+    draw = args.draw or args.dirty
+    font = pygame.font.SysFont(None, 32) if draw else None
+    renderer = None
+    if args.dirty:
+        from dirty_render import DirtyRenderer
+        renderer = DirtyRenderer(screen, assets)
+
+    game = make_game(assets)
+    # never run out of lives: the load must not stop half-way
+    game.lives = 10 ** 9
+    policy = POLICIES[name]
+    rng = random.Random(args.seed)
+    profiler = FrameProfiler(window=args.frames)
+    aliens_seen = bullets_seen = 0
+
+    for frame in range(args.warmup + args.frames):
+        # the warm-up frames fill the screen but are not measured
+        if frame == args.warmup:
+            profiler = FrameProfiler(window=args.frames)
+        profiler.start_frame()
+        pressed, fire = policy(frame, game, rng)
+        keys = make_keys(pressed["left"], pressed["right"])
+        for _ in range(int(fire)):
+            game.fire()
+        profiler.mark("events")
+        game.spawn_aliens()
+        profiler.mark("spawn")
+        game.update(keys)
+        profiler.mark("update")
+        game.check_collisions()
+        profiler.mark("collisions")
+        if renderer:
+            renderer.draw(game, font, present=False)
+        elif draw:
+            game.draw(screen, font)
+        profiler.mark("draw")
+        profiler.end_frame()
+        if frame >= args.warmup:
+            aliens_seen += len(game.aliens)
+            bullets_seen += len(game.bullets)
+
+    if args.profile:
+        profiler.dump(f"{name}-{args.profile}")
+    seconds = sum(profiler.samples["frame"]) / 1e9
+    p50, p95, p99 = profiler.percentiles("frame")
+    pygame.quit()
+    return {
+        "frames": args.frames,
+        "seconds": seconds,
+        "fps": args.frames / seconds if seconds > 0 else 0.0,
+        "p50_ms": p50,
+        "p95_ms": p95,
+        "p99_ms": p99,
+        "max_ms": max(profiler.samples["frame"]) / 1e6,
+        "mean_aliens": aliens_seen / args.frames,
+        "mean_bullets": bullets_seen / args.frames,
+        "phases_p99_ms": {phase: times["p99_ms"]
+                          for phase, times in profiler.summary().items()},
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def run_startup(args):
+    """
+    Time a cold start: importing pygame and the game, opening the
+    screen, loading the images (from a freshly built atlas and from the
+    cached one), the font and the first frame.
+    """
+    # this process has already imported pygame to read its options, so
+    # the imports are timed in another, brand new interpreter
+    code = ("import time; start = time.perf_counter(); import pygame, answer; "
+            "print((time.perf_counter() - start) * 1000)")
+    output = subprocess.run([sys.executable, "-c", code], check=True, stdout=subprocess.PIPE,
+                            text=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout
+    steps = {"import_ms": float(output.strip().splitlines()[-1])}
+
+    import pygame
+    import answer
+    import asset_cache
+    start = time.perf_counter()
+
+    def lap(step):
+        # record the time since the previous lap as this step
+        nonlocal start
+        now = time.perf_counter()
+        steps[step] = (now - start) * 1000
+        start = now
+
+    pygame.init()
+    screen = pygame.display.set_mode((answer.WIDTH, answer.HEIGHT))
+    lap("display_ms")
+
+    # build the atlas in an empty folder, as on the very first start;
+    # not part of startup_ms, since only the first start ever pays it
+    with tempfile.TemporaryDirectory() as cache_dir:
+        build_start = time.perf_counter()
+        asset_cache.load_atlas(answer.ASSET_DIR, answer.Assets.IMAGES, cache_dir)
+        atlas_build_ms = (time.perf_counter() - build_start) * 1000
+    start = time.perf_counter()
+
+    assets = answer.Assets()
+    assets.player  # loads the (cached) atlas
+    lap("assets_ms")
+
+    font = pygame.font.SysFont(None, 32)
+    lap("font_ms")
+
+    game = answer.Game(assets, seed=args.seed)
+    game.step({pygame.K_LEFT: False, pygame.K_RIGHT: False})
+    game.draw(screen, font)
+    pygame.display.flip()
+    lap("first_frame_ms")
+
+    pygame.quit()
+    result = {"startup_ms": sum(steps.values()), "atlas_build_ms": atlas_build_ms}
+    result.update(steps)
+    result["peak_rss_mb"] = peak_rss_mb()
+    return result
+
+
+def run_scenario(name, args):
+    """
+    Run one scenario in this process and return its results.
+    """
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    if name == "startup":
+        return run_startup(args)
+    return run_frames(name, args)
+
+
+# ---------- SUITE ----------
+def game_argv(args):
+    """
+    Turn the options of this run back into command line arguments,
+    to pass them on to the scenario processes.
+    """
+    argv = ["--frames", str(args.frames), "--warmup", str(args.warmup),
+            "--seed", str(args.seed)]
+    for flag in ("draw", "broadphase", "arrays", "dirty", "pixel_perfect"):
+        if getattr(args, flag):
+            argv.append("--" + flag.replace("_", "-"))
+    if args.pool:
+        argv += ["--pool", args.pool]
+    if args.profile:
+        argv += ["--profile", args.profile]
+    if args.waves:
+        argv += ["--waves", os.path.abspath(args.waves)]
+    return argv
+
+
+def run_suite(args):
+    """
+    Run every chosen scenario in a new Python process and return the
+    results: {"meta": {...}, "scenarios": {name: {...}}}.
+    """
+    import pygame
+    results = {}
+    for name in args.scenario or SCENARIOS:
+        print(f"running {name} ...", file=sys.stderr)
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "scenario", name] + game_argv(args),
+            check=True, stdout=subprocess.PIPE, text=True).stdout
+        # the result is the last line; pygame may print its greeting first
+        results[name] = json.loads(output.strip().splitlines()[-1])
+    options = {flag: getattr(args, flag) for flag in
+               ("frames", "warmup", "seed", "draw", "broadphase", "arrays", "dirty", "pool",
+                "pixel_perfect", "waves")}
+    return {
+        "meta": {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "pygame": pygame.version.ver,
+            "machine": platform.machine(),
+            "system": platform.system(),
+            "cpus": os.cpu_count(),
+            "options": options,
+        },
+        "scenarios": results,
+    }
+
+
+# ---------- COMPARE ----------
+def compare(baseline, current, threshold=0.10):
+    """
+    Compare two results dicts. Returns a list of rows
+    (scenario, metric, old, new, change, regressed); change is the
+    relative change, positive meaning worse.
+    """
+    rows = []
+    for name, new in current["scenarios"].items():
+        old = baseline["scenarios"].get(name)
+        if old is None:
+            continue
+        for metric, better in METRICS.items():
+            if old.get(metric) is None or new.get(metric) is None or not old[metric]:
+                continue
+            # > 0 when the number moved in the bad direction
+            change = (old[metric] - new[metric]) / old[metric] * better
+            rows.append((name, metric, old[metric], new[metric], change, change > threshold))
+    return rows
+
+
+def warn_if_different(baseline, current):
+    """
+    Warn when two results files were made with different game options
+    or on a different machine, since their numbers do not compare.
+    """
+    for key in ("options", "machine", "python", "pygame"):
+        old = baseline["meta"].get(key)
+        new = current["meta"].get(key)
+        if old != new:
+            print(f"warning: {key} differ: baseline {old}, current {new}", file=sys.stderr)
+
+
+def print_comparison(rows, threshold):
+    """
+    Print a table of compare() rows and return the number of regressions.
+    """
+    # "worse" is the relative change in the bad direction (negative = better)
+    print(f"{'scenario':<13}{'metric':<13}{'baseline':>11}{'current':>11}{'worse':>9}")
+    for name, metric, old, new, change, regressed in rows:
+        flag = "  REGRESSION" if regressed else ""
+        print(f"{name:<13}{metric:<13}{old:>11.2f}{new:>11.2f}{change:>+9.1%}{flag}")
+    regressions = sum(1 for row in rows if row[5])
+    print(f"{regressions} regression(s) over {threshold:.0%}")
+    return regressions
+
+
+def print_results(results):
+    """
+    Print the main numbers of every scenario.
+    """
+    for name, r in results["scenarios"].items():
+        rss = f"{r['peak_rss_mb']:.1f} MB" if r.get("peak_rss_mb") is not None else "n/a"
+        if "startup_ms" in r:
+            print(f"{name:<13} startup {r['startup_ms']:.1f} ms "
+                  f"(atlas build {r['atlas_build_ms']:.1f} ms), peak RSS {rss}")
+        else:
+            print(f"{name:<13} {r['fps']:>9.1f} fps  p99 {r['p99_ms']:.3f} ms  "
+                  f"peak RSS {rss}  ({r['mean_aliens']:.0f} aliens, "
+                  f"{r['mean_bullets']:.0f} bullets)")
+
+
+# ---------- MAIN ----------
+def main(argv=None):
+    """
+    run: run the scenarios and save the results; compare: check two results files.
+    """
+    from headless import add_game_options
+
+    parser = argparse.ArgumentParser(description="Stress benchmarks for Space Invaders.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    def add_run_options(p):
+        # options shared by "run" and the internal "scenario" command
+        p.add_argument("--frames", type=int, default=1000, help="measured frames per scenario")
+        p.add_argument("--warmup", type=int, default=300, help="unmeasured frames first")
+        p.add_argument("--seed", type=int, default=0, help="random seed")
+        add_game_options(p)
+
+    run = commands.add_parser("run", help="run the scenarios")
+    run.add_argument("--scenario", action="append", choices=SCENARIOS,
+                     help="scenario to run; repeat for several (default: all)")
+    run.add_argument("--out", default="stress.json", help="results file (default stress.json)")
+    run.add_argument("--baseline", help="compare with this results file afterwards")
+    run.add_argument("--threshold", type=float, default=0.10,
+                     help="allowed relative change before a regression (default 0.10)")
+    add_run_options(run)
+
+    cmp = commands.add_parser("compare", help="compare results with a baseline")
+    cmp.add_argument("baseline")
+    cmp.add_argument("current")
+    cmp.add_argument("--threshold", type=float, default=0.10,
+                     help="allowed relative change before a regression (default 0.10)")
+
+    # used by run_suite(): one scenario, result printed as JSON
+    one = commands.add_parser("scenario")
+    one.add_argument("name", choices=SCENARIOS)
+    add_run_options(one)
+
+    args = parser.parse_args(argv)
+
+    if args.command == "scenario":
+        print(json.dumps(run_scenario(args.name, args)))
+        return 0
+
+    if args.command == "compare":
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        with open(args.current) as f:
+            current = json.load(f)
+        warn_if_different(baseline, current)
+        regressions = print_comparison(compare(baseline, current, args.threshold),
+                                       args.threshold)
+        return 1 if regressions else 0
+
+    # check the game options before starting any process
+    from headless import game_factory
+    game_factory(parser, args)
+    results = run_suite(args)
+    with open(args.out, "w") as f:
+        json.dump(results, f, indent=2)
+    print_results(results)
+    print(f"results saved to {args.out}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        warn_if_different(baseline, results)
+        regressions = print_comparison(compare(baseline, results, args.threshold),
+                                       args.threshold)
+        return 1 if regressions else 0
+    return 0
+
+
+# run main() only if this script is executed directly
+if __name__ == "__main__":
+    sys.exit(main())
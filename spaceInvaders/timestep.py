@@ -0,0 +1,145 @@
+"""
+SPACE INVADERS FIXED TIMESTEP
+
+The game rules move sprites a fixed number of pixels per step and count
+steps between alien spawns, so the game only runs at the right speed
+when exactly 60 steps happen every second. With one step per drawn
+frame, a machine that cannot draw 60 frames per second slows the whole
+game down.
+
+FixedTimestep separates the two: real time is added to an accumulator,
+and the game takes one step ("tick") for every 1 / tick_rate seconds in
+it, however often frames are drawn. A slow frame is followed by several
+ticks to catch up; a fast frame may need none. Whatever is left in the
+accumulator tells how far we are between the last tick and the next
+one, and sprites are drawn that far between their old and new
+positions, so movement stays smooth when frames and ticks do not line
+up.
+
+Steps:
+  1. FixedTimestep: accumulate real time, hand out ticks
+  2. snapshot(): remember where the sprites were before a tick
+  3. interpolated(): draw the sprites between two ticks
+"""
+
+from contextlib import contextmanager  # import contextmanager to move rects back after drawing
+from time import perf_counter  # import perf_counter to measure real time
+
+
+# ---------- TIMESTEP ----------
+class FixedTimestep:
+    """
+    FixedTimestep tells the loop how many ticks to run each frame.
+    Call advance() once per frame, run that many ticks, then draw
+    with alpha (0.0 = at the last tick, almost 1.0 = at the next).
+    """
+    def __init__(self, tick_rate=60, max_ticks=5):
+        self.tick_rate = tick_rate
+        # seconds of real time per tick
+        self.dt = 1.0 / tick_rate
+        # most ticks run in one frame; after a very long stall (a window
+        # drag, a breakpoint) the rest is dropped instead of running
+        # hundreds of ticks in a row and falling further behind
+        self.max_ticks = max_ticks
+        # real time not yet turned into ticks
+        self.accumulator = 0.0
+        self.last = None
+
+        # counters
+        self.frames = 0         # calls to advance()
+        self.ticks = 0          # ticks handed out in total
+        self.catch_up = 0       # frames that ran more than one tick
+        self.dropped_ticks = 0  # ticks thrown away by max_ticks
+
+    def advance(self, now=None):
+        """
+        Add the time since the last call and return how many ticks to run.
+        The first call always returns 1, so the game starts straight away.
+        """
+        now = perf_counter() if now is None else now
+        self.frames += 1
+        if self.last is None:
+            self.last = now
+            self.ticks += 1
+            return 1
+        self.accumulator += now - self.last
+        self.last = now
+
+        ticks = int(self.accumulator / self.dt)
+        if ticks > self.max_ticks:
+            # forget the time we cannot catch up with
+            self.dropped_ticks += ticks - self.max_ticks
+            self.accumulator -= (ticks - self.max_ticks) * self.dt
+            ticks = self.max_ticks
+        self.accumulator -= ticks * self.dt
+        self.ticks += ticks
+        if ticks > 1:
+            self.catch_up += 1
+        return ticks
+
+    def skip_time(self, now=None):
+        """
+        Forget the time since the last frame, for example after a
+        pause, so the game does not try to catch up with it.
+        """
+        self.last = perf_counter() if now is None else now
+
+    @property
+    def alpha(self):
+        """
+        How far the current time is between the last tick and the next (0..1).
+        """
+        return min(self.accumulator / self.dt, 1.0)
+
+    def stats(self):
+        """
+        Return the counters as a dict.
+        """
+        return {
+            "tick_rate": self.tick_rate,
+            "frames": self.frames,
+            "ticks": self.ticks,
+            "ticks_per_frame": self.ticks / self.frames if self.frames else 0.0,
+            "catch_up_frames": self.catch_up,
+            "dropped_ticks": self.dropped_ticks,
+        }
+
+
+# ---------- INTERPOLATION ----------
+def snapshot(sprites):
+    """
+    Return sprite -> (x, y) of the top-left corner of every sprite.
+    Take it right before the last tick of a frame.
+    """
+    return {sprite: sprite.rect.topleft for sprite in sprites}
+
+
+@contextmanager
+def interpolated(sprites, previous, alpha):
+    """
+    Move every sprite's rect to alpha of the way from its position in
+    previous (a snapshot()) to where it is now, and put the rects back
+    afterwards. Sprites that did not exist at the snapshot stay where
+    they are. Anything that draws sprite.image at sprite.rect (Group.draw,
+    the dirty renderer) can be used inside the with block:
+
+        with interpolated(game.all_sprites, previous, timestep.alpha):
+            game.draw(screen, font)
+    """
+    moved = []
+    for sprite in sprites:
+        old = previous.get(sprite)
+        if old is None:
+            continue
+        rect = sprite.rect
+        x, y = rect.topleft
+        if (x, y) == old:
+            continue
+        moved.append((rect, x, y))
+        rect.topleft = (round(old[0] + (x - old[0]) * alpha),
+                        round(old[1] + (y - old[1]) * alpha))
+    try:
+        yield
+    finally:
+        for rect, x, y in moved:
+            rect.topleft = (x, y)
@@ -0,0 +1,388 @@
+"""
+SPACE INVADERS VECTORIZED ENVIRONMENT
+
+A Gym-style reset() / step(actions) interface for training agents. One
+VecSpaceInvaders object runs many games at once: the state of every
+game lives in NumPy arrays with one row per game, so one step() moves
+all players, bullets and aliens of all games with a handful of array
+operations. No pygame window is created.
+
+The numbers (speeds, sizes, lives, spawn interval) are read from the
+Player, Bullet, Alien and Game classes and the alien constants in
+answer.py, and each step
+follows the same order as one frame of main():
+fire -> spawn aliens -> move everything -> bullet/alien hits ->
+alien/player hits.
+
+Actions (one per game):
+  0 nothing  1 left  2 right  3 fire  4 left + fire  5 right + fire
+
+Observations: a float32 vector per game (player x, lives, and x, y,
+alive for every alien slot), or with pixels=True a small grayscale
+image per game drawn with NumPy.
+
+Steps:
+  1. Read the game rules from answer.py
+  2. VecSpaceInvaders: arrays for players, bullets and aliens
+  3. step(): fire, spawn, move, collide, score, lives, auto-reset
+  4. Observations: feature vectors or low-resolution pixels
+  5. Throughput benchmark (run this file)
+"""
+
+import sys     # import sys to exit with a status code
+import time    # import time to measure throughput
+import types   # import types to build a stand-in for Assets
+import random  # import random to give the sample Alien its own generator
+
+import numpy as np  # import numpy for all game state
+import pygame       # import pygame only to read sizes and speeds from the sprites
+
+from answer import (WIDTH, HEIGHT, SPAWN_Y, SPAWN_MARGIN, ALIEN_SPEED_MIN, ALIEN_SPEED_MAX,
+                    ALIEN_POINTS, Assets, Player, Bullet, Alien, Game)
+
+
+# ---------- RULES FROM answer.py ----------
+def read_rules():
+    """
+    Build one Player, Bullet, Alien and Game with blank images of the
+    real sizes (no window needed) and read their numbers.
+    """
+    # blank surfaces with the sizes the atlas uses for each image
+    fake_assets = types.SimpleNamespace(background=None, **{
+        name: pygame.Surface(size) for name, (filename, size) in Assets.IMAGES.items()})
+    player = Player(fake_assets)
+    bullet = Bullet(fake_assets, 0, 0)
+    # a private generator, so reading the rules does not use up
+    # numbers from the shared random module
+    alien = Alien(fake_assets, 0, 0, random.Random(0))
+    game = Game(fake_assets)
+    return types.SimpleNamespace(
+        player_w=player.rect.width, player_h=player.rect.height,
+        player_x=player.rect.x, player_y=player.rect.y, player_speed=player.speed,
+        bullet_w=bullet.rect.width, bullet_h=bullet.rect.height, bullet_speed=bullet.speed,
+        alien_w=alien.rect.width, alien_h=alien.rect.height,
+        # the constants Game.spawn_aliens and Game.check_collisions use
+        alien_speed_min=ALIEN_SPEED_MIN, alien_speed_max=ALIEN_SPEED_MAX,
+        spawn_x_min=SPAWN_MARGIN, spawn_x_max=WIDTH - SPAWN_MARGIN, spawn_y=SPAWN_Y,
+        spawn_interval=game.spawn_interval, lives=game.lives,
+        points=ALIEN_POINTS,
+    )
+
+
+RULES = read_rules()
+
+# actions: (move left, move right, fire)
+ACTIONS = np.array([
+    (0, 0, 0),  # 0 nothing
+    (1, 0, 0),  # 1 left
+    (0, 1, 0),  # 2 right
+    (0, 0, 1),  # 3 fire
+    (1, 0, 1),  # 4 left + fire
+    (0, 1, 1),  # 5 right + fire
+], dtype=bool)
+
+
+# coarse grid used to skip bullets that are nowhere near an alien:
+# cells of GRID_CELL pixels, shifted so positions just off the screen
+# still land inside the grid
+GRID_CELL = 64
+GRID_OFFSET = 2 * GRID_CELL
+GRID_ROWS = (HEIGHT + 2 * GRID_OFFSET) // GRID_CELL + 1
+GRID_COLS = (WIDTH + 2 * GRID_OFFSET) // GRID_CELL + 1
+
+
+def grid_row(y):
+    # grid row of pixel row y
+    return (y.astype(np.int32) + GRID_OFFSET) // GRID_CELL
+
+
+def grid_col(x):
+    # grid column of pixel column x
+    return (x.astype(np.int32) + GRID_OFFSET) // GRID_CELL
+
+
+# ---------- ENVIRONMENT ----------
+class VecSpaceInvaders:
+    """
+    num_envs Space Invaders games stepped together.
+
+    max_aliens / max_bullets are the slots per game; a bullet or alien
+    that does not fit is not created (max_bullets=128 is enough for
+    firing on every frame). Games that end are reset automatically and
+    their final score is reported in info["final_score"].
+    """
+    def __init__(self, num_envs, seed=None, pixels=False, pixel_scale=8,
+                 max_aliens=16, max_bullets=128, max_frames=None):
+        self.num_envs = num_envs
+        self.pixels = pixels
+        self.pixel_scale = pixel_scale
+        self.max_aliens = max_aliens
+        self.max_bullets = max_bullets
+        # end a game after this many frames even if lives are left
+        self.max_frames = max_frames
+        self.rng = np.random.default_rng(seed)
+
+        n = num_envs
+        # players: x position (y never changes), lives, score, frames;
+        # positions fit in 16 bits, which halves the memory to move
+        self.player_x = np.zeros(n, dtype=np.int16)
+        self.lives = np.zeros(n, dtype=np.int32)
+        self.score = np.zeros(n, dtype=np.int32)
+        self.frames = np.zeros(n, dtype=np.int32)
+        self.spawn_timer = np.zeros(n, dtype=np.int32)
+        # aliens: one row per game, one column per slot
+        self.alien_x = np.zeros((n, max_aliens), dtype=np.int16)
+        self.alien_y = np.zeros((n, max_aliens), dtype=np.int16)
+        self.alien_speed = np.zeros((n, max_aliens), dtype=np.int16)
+        self.alien_alive = np.zeros((n, max_aliens), dtype=bool)
+        # when each alien was spawned; older aliens win ties for a
+        # bullet, like the Group order used by groupcollide
+        self.alien_born = np.zeros((n, max_aliens), dtype=np.int64)
+        self.spawn_count = 0
+        # bullets: one row per game, one column per slot
+        self.bullet_x = np.zeros((n, max_bullets), dtype=np.int16)
+        self.bullet_y = np.zeros((n, max_bullets), dtype=np.int16)
+        self.bullet_alive = np.zeros((n, max_bullets), dtype=bool)
+
+        # coordinates of the centre of every pixel-observation cell
+        if pixels:
+            self.cell_y = np.arange(HEIGHT // pixel_scale) * pixel_scale + pixel_scale // 2
+            self.cell_x = np.arange(WIDTH // pixel_scale) * pixel_scale + pixel_scale // 2
+
+    # ---------- RESET ----------
+    def reset(self):
+        """
+        Start a new game in every slot and return the observations.
+        """
+        self.reset_envs(np.ones(self.num_envs, dtype=bool))
+        return self.observe()
+
+    def reset_envs(self, mask):
+        """
+        Start new games where mask is True.
+        """
+        self.player_x[mask] = RULES.player_x
+        self.lives[mask] = RULES.lives
+        self.score[mask] = 0
+        self.frames[mask] = 0
+        self.spawn_timer[mask] = 0
+        self.alien_alive[mask] = False
+        self.bullet_alive[mask] = False
+
+    # ---------- STEP ----------
+    def step(self, actions):
+        """
+        Advance every game by one frame.
+        actions: array of num_envs action numbers (see ACTIONS).
+        Returns (observations, rewards, dones, info).
+        """
+        left, right, fire = ACTIONS[np.asarray(actions)].T
+        score_before = self.score.copy()
+
+        # ----- fire (a SPACE press happens before the update) -----
+        if fire.any():
+            top = RULES.player_y - RULES.bullet_h
+            half = RULES.bullet_w // 2
+            # Game.fire: one bullet centred on the player, one on its left edge
+            self.add_bullets(fire, self.player_x + RULES.player_w // 2 - half, top)
+            self.add_bullets(fire, self.player_x - half, top)
+
+        # ----- spawn aliens -----
+        self.spawn_timer += 1
+        spawn = self.spawn_timer >= RULES.spawn_interval
+        if spawn.any():
+            self.spawn_timer[spawn] = 0
+            self.add_aliens(spawn)
+
+        # ----- update (Player.update, Bullet.update, Alien.update) -----
+        x = self.player_x
+        x -= left * RULES.player_speed
+        x += right * RULES.player_speed
+        np.clip(x, 0, WIDTH - RULES.player_w, out=x)
+
+        self.bullet_y += RULES.bullet_speed
+        self.bullet_alive &= self.bullet_y + RULES.bullet_h >= 0
+        self.alien_y += self.alien_speed
+        self.alien_alive &= self.alien_y <= HEIGHT
+
+        # ----- bullets vs aliens -----
+        self.collide_bullets()
+
+        # ----- aliens vs player -----
+        px = self.player_x[:, None]
+        touching = (self.alien_alive
+                    & (self.alien_x < px + RULES.player_w) & (self.alien_x + RULES.alien_w > px)
+                    & (self.alien_y < RULES.player_y + RULES.player_h)
+                    & (self.alien_y + RULES.alien_h > RULES.player_y))
+        self.alien_alive &= ~touching
+        self.lives -= touching.any(axis=1)
+
+        # ----- finish the frame -----
+        self.frames += 1
+        rewards = (self.score - score_before).astype(np.float32)
+        dones = self.lives <= 0
+        if self.max_frames is not None:
+            dones |= self.frames >= self.max_frames
+        info = {"score": self.score.copy(), "frames": self.frames.copy()}
+        if dones.any():
+            info["final_score"] = np.where(dones, self.score, -1)
+            self.reset_envs(dones)
+        return self.observe(), rewards, dones, info
+
+    def add_bullets(self, mask, x, y):
+        """
+        Put one new bullet at (x[i], y) in the first free slot of every
+        game i where mask is True (skipped if the game has no free slot).
+        """
+        free = ~self.bullet_alive
+        slot = free.argmax(axis=1)
+        ok = mask & free[np.arange(self.num_envs), slot]
+        rows = np.flatnonzero(ok)
+        cols = slot[rows]
+        self.bullet_x[rows, cols] = x[rows]
+        self.bullet_y[rows, cols] = y
+        self.bullet_alive[rows, cols] = True
+
+    def add_aliens(self, mask):
+        """
+        Spawn one alien above the screen in every game where mask is True.
+        """
+        free = ~self.alien_alive
+        slot = free.argmax(axis=1)
+        ok = mask & free[np.arange(self.num_envs), slot]
+        rows = np.flatnonzero(ok)
+        cols = slot[rows]
+        count = len(rows)
+        self.alien_x[rows, cols] = self.rng.integers(RULES.spawn_x_min, RULES.spawn_x_max + 1, count)
+        self.alien_y[rows, cols] = RULES.spawn_y
+        self.alien_speed[rows, cols] = self.rng.integers(RULES.alien_speed_min,
+                                                         RULES.alien_speed_max + 1, count)
+        self.alien_alive[rows, cols] = True
+        self.alien_born[rows, cols] = self.spawn_count + np.arange(count)
+        self.spawn_count += count
+
+    def collide_bullets(self):
+        """
+        Same result as groupcollide(aliens, bullets, True, True) in every
+        game: each overlapping bullet belongs to the oldest alien it
+        touches, an alien that owns a bullet dies and scores, and every
+        overlapping bullet dies.
+        """
+        # list every living bullet as (game, slot)
+        game, slot = np.nonzero(self.bullet_alive)
+        if len(game) == 0:
+            return
+        bx = self.bullet_x[game, slot]
+        by = self.bullet_y[game, slot]
+        alive = self.alien_alive
+
+        # cheap first pass with a coarse grid per game: mark the cells the
+        # living aliens touch, and keep only bullets that touch a marked
+        # cell (sprites are smaller than a cell, so checking the cells of
+        # the four corners covers the whole rect)
+        grid = np.zeros((self.num_envs, GRID_ROWS, GRID_COLS), dtype=bool)
+        ag, aslot = np.nonzero(alive)
+        ax0, ay0 = self.alien_x[ag, aslot], self.alien_y[ag, aslot]
+        for x in (ax0, ax0 + (RULES.alien_w - 1)):
+            for y in (ay0, ay0 + (RULES.alien_h - 1)):
+                grid[ag, grid_row(y), grid_col(x)] = True
+        near = np.zeros(len(game), dtype=bool)
+        for x in (bx, bx + (RULES.bullet_w - 1)):
+            for y in (by, by + (RULES.bullet_h - 1)):
+                near |= grid[game, grid_row(y), grid_col(x)]
+        game, slot = game[near], slot[near]
+        if len(game) == 0:
+            return
+        bx = bx[near][:, None]
+        by = by[near][:, None]
+
+        # overlap[bullet, alien slot of the bullet's game]
+        ax = self.alien_x[game]
+        ay = self.alien_y[game]
+        overlap = (alive[game]
+                   & (ax < bx + RULES.bullet_w) & (ax + RULES.alien_w > bx)
+                   & (ay < by + RULES.bullet_h) & (ay + RULES.alien_h > by))
+        hit = overlap.any(axis=1)
+        if not hit.any():
+            return
+        game, slot, overlap = game[hit], slot[hit], overlap[hit]
+        # for every hitting bullet, the oldest alien that overlaps it
+        born = np.where(overlap, self.alien_born[game], np.iinfo(np.int64).max)
+        owner = born.argmin(axis=1)
+
+        owned = np.zeros_like(alive)
+        owned[game, owner] = True
+        self.bullet_alive[game, slot] = False
+        self.alien_alive &= ~owned
+        self.score += owned.sum(axis=1, dtype=np.int32) * RULES.points
+
+    # ---------- OBSERVATIONS ----------
+    def observe(self):
+        """
+        Return the observations of all games.
+        """
+        if self.pixels:
+            return self.render_pixels()
+        alive = self.alien_alive
+        return np.concatenate([
+            (self.player_x / WIDTH)[:, None],
+            (self.lives / RULES.lives)[:, None],
+            np.where(alive, self.alien_x / WIDTH, 0.0),
+            np.where(alive, self.alien_y / HEIGHT, 0.0),
+            alive,
+        ], axis=1).astype(np.float32)
+
+    def render_pixels(self):
+        """
+        Draw every game into a (HEIGHT / scale, WIDTH / scale) uint8 image:
+        aliens 170, bullets 85, player 255, background 0. A cell is
+        lit when its centre is inside a sprite's rect.
+        """
+        cy, cx = self.cell_y, self.cell_x
+        image = np.zeros((self.num_envs, len(cy), len(cx)), dtype=np.uint8)
+
+        def paint(x, y, w, h, alive, value):
+            # rows[game, sprite, cell row] and cols[game, sprite, cell col]
+            rows = (alive[:, :, None] & (y[:, :, None] <= cy) & (cy < y[:, :, None] + h))
+            cols = (x[:, :, None] <= cx) & (cx < x[:, :, None] + w)
+            # a cell is covered if any sprite covers both its row and column
+            covered = np.matmul(rows.transpose(0, 2, 1).astype(np.float32),
+                                cols.astype(np.float32)) > 0
+            np.maximum(image, covered * np.uint8(value), out=image)
+
+        paint(self.bullet_x, self.bullet_y, RULES.bullet_w, RULES.bullet_h, self.bullet_alive, 85)
+        paint(self.alien_x, self.alien_y, RULES.alien_w, RULES.alien_h, self.alien_alive, 170)
+        player_y = np.full((self.num_envs, 1), RULES.player_y)
+        paint(self.player_x[:, None], player_y, RULES.player_w, RULES.player_h,
+              np.ones((self.num_envs, 1), dtype=bool), 255)
+        return image
+
+
+# ---------- BENCHMARK ----------
+def benchmark(num_envs, steps=200, pixels=False):
+    """
+    Step num_envs games with random actions and return env-steps per second.
+    """
+    env = VecSpaceInvaders(num_envs, seed=0, pixels=pixels)
+    env.reset()
+    rng = np.random.default_rng(1)
+    actions = rng.integers(0, len(ACTIONS), (steps, num_envs))
+    start = time.perf_counter()
+    for i in range(steps):
+        env.step(actions[i])
+    return num_envs * steps / (time.perf_counter() - start)
+
+
+def main():
+    """
+    Print env-steps per second for a few batch sizes.
+    """
+    for num_envs in (256, 1024, 4096):
+        print(f"{num_envs:>5} envs: {benchmark(num_envs):>10,.0f} steps/s (features)")
+    print(f"{1024:>5} envs: {benchmark(1024, 50, pixels=True):>10,.0f} steps/s (pixels)")
+    return 0
+
+
+# run the benchmark only if this script is executed directly
+if __name__ == "__main__":
+    sys.exit(main())
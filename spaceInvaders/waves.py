@@ -0,0 +1,268 @@
+"""
+SPACE INVADERS WAVE SCHEDULER
+
+Game.spawn_aliens() counts frames and spawns one alien at a random
+place every 40 frames, with the random numbers drawn inside the game
+loop. A wave scheduler lets a level be described in a data file
+instead: which formations come when, how many aliens, how fast.
+
+The file is compiled once, when the game starts, into a timeline: a
+list of the ticks on which something spawns (sorted), and for each of
+those ticks the batch of aliens to create (x, y and speed of each).
+Random positions and speeds are rolled while compiling. During the game
+the scheduler only compares the current tick with the next timeline
+entry, so a tick costs the same however long or complicated the level
+is, plus the aliens it actually spawns.
+
+Wave file (JSON):
+  {
+    "loop": true,            -- start again after the last wave
+    "length": 1200,          -- ticks per loop (default: last spawn + 1)
+    "waves": [
+      {"at": 0,              -- first tick of the wave
+       "formation": "line",  -- random | line | column | v | grid
+       "count": 5,           -- aliens (rows x cols for "grid")
+       "x": 400,             -- centre of the formation (default: middle)
+       "spacing": 64,        -- pixels between aliens
+       "speed": [2, 4],      -- pixels per tick, or [min, max] at random
+                                (whole pixels, at least 1: 2.6 moves 3 per tick)
+       "every": 0,           -- ticks between aliens (0 = all at once)
+       "repeat": 1,          -- how many times the wave comes
+       "period": 0}          -- ticks between repeats
+    ]
+  }
+
+Steps:
+  1. Formations: where each alien of a wave starts
+  2. compile_waves(): wave list -> sorted timeline of spawn batches
+  3. WaveScheduler: hands out the batch of each tick
+  4. load_waves(): read a wave file
+  5. Timeline summary (run this file)
+"""
+
+import sys     # import sys to exit with a status code
+import json    # import json to read wave files
+import random  # import random to roll positions and speeds when compiling
+from numbers import Real  # import Real to accept any number as a speed
+
+from answer import WIDTH, SPAWN_Y, SPAWN_MARGIN
+
+
+# ---------- CONFIG ----------
+# the alien image is 48 pixels wide; formations are kept on screen
+ALIEN_WIDTH = 48
+# default wave values
+DEFAULTS = {
+    "formation": "random",
+    "count": 1,
+    "rows": 1,
+    "cols": 1,
+    "spacing": 64,
+    "speed": [2, 5],
+    "every": 0,
+    "repeat": 1,
+    "period": 0,
+}
+
+
+# ---------- FORMATIONS ----------
+def centred(count, spacing):
+    # offsets of count aliens spacing apart, centred on 0
+    return [(i - (count - 1) / 2) * spacing for i in range(count)]
+
+
+def formation_offsets(wave, rng):
+    """
+    Return the (x, y) start of every alien of a wave, in spawn order.
+    """
+    kind = wave["formation"]
+    count = wave["count"]
+    spacing = wave["spacing"]
+    x = wave.get("x", WIDTH // 2)
+    if kind == "random":
+        # anywhere across the screen, like Game.spawn_aliens
+        return [(rng.randint(SPAWN_MARGIN, WIDTH - SPAWN_MARGIN), SPAWN_Y) for _ in range(count)]
+    if kind == "line":
+        # side by side, all at the same height
+        return [(x + dx, SPAWN_Y) for dx in centred(count, spacing)]
+    if kind == "column":
+        # one above the other
+        return [(x, SPAWN_Y - i * spacing) for i in range(count)]
+    if kind == "v":
+        # a V pointing down: the middle alien leads, the sides trail
+        return [(x + dx, SPAWN_Y - abs(dx)) for dx in centred(count, spacing)]
+    if kind == "grid":
+        # rows x cols, front row first
+        return [(x + dx, SPAWN_Y - row * spacing)
+                for row in range(wave["rows"])
+                for dx in centred(wave["cols"], spacing)]
+    raise ValueError(f"unknown formation {kind!r}")
+
+
+def roll_speed(speed, rng):
+    # a fixed speed, or a random one from [min, max]; sprites move by
+    # whole pixels, so both are rounded
+    if isinstance(speed, Real):
+        return round(speed)
+    low, high = speed
+    if isinstance(low, int) and isinstance(high, int):
+        return rng.randint(low, high)
+    return round(rng.uniform(low, high))
+
+
+def check_speed(speed):
+    # True if roll_speed() can use speed: a number or [min, max] that
+    # moves the aliens at least one pixel per tick (an alien that stands
+    # still never leaves the screen)
+    def number(value):
+        return isinstance(value, Real) and not isinstance(value, bool)
+    if number(speed):
+        return round(speed) >= 1
+    return (isinstance(speed, (list, tuple)) and len(speed) == 2
+            and all(number(s) for s in speed) and 1 <= speed[0] <= speed[1])
+
+
+def check_wave(number, wave):
+    # raise ValueError, naming the wave, for a value compile_waves() cannot use
+    def whole(field, least):
+        if field not in wave:
+            raise ValueError(f"wave {number}: {field} is missing")
+        value = wave[field]
+        if not isinstance(value, int) or isinstance(value, bool) or value < least:
+            raise ValueError(f"wave {number}: {field} must be a whole number >= {least}, "
+                             f"not {value!r}")
+
+    for field in ("at", "every", "repeat", "period"):
+        whole(field, 0)
+    for field in ("count", "rows", "cols"):
+        whole(field, 1)
+    for field in ("spacing", "x"):
+        value = wave.get(field, 0)
+        if not isinstance(value, Real) or isinstance(value, bool) or value < 0:
+            raise ValueError(f"wave {number}: {field} must be a number >= 0, not {value!r}")
+    if not check_speed(wave["speed"]):
+        raise ValueError(f"wave {number}: speed must be a number or [min, max] of at "
+                         f"least 1 pixel per tick, not {wave['speed']!r}")
+
+
+# ---------- TIMELINE ----------
+class Timeline:
+    """
+    A compiled level: ticks is the sorted list of ticks on which aliens
+    spawn, batches[i] is the tuple of (x, y, speed) spawning on ticks[i].
+    """
+    def __init__(self, ticks, batches, length, loop):
+        self.ticks = ticks
+        self.batches = batches
+        self.length = length
+        self.loop = loop
+
+    def __len__(self):
+        # total number of aliens in one pass of the level
+        return sum(len(batch) for batch in self.batches)
+
+
+def compile_waves(data, rng=random):
+    """
+    Turn wave definitions (the parsed wave file) into a Timeline.
+    Random positions and speeds are drawn from rng now, not during play.
+    """
+    events = {}
+    for number, definition in enumerate(data["waves"]):
+        unknown = set(definition) - set(DEFAULTS) - {"at", "x"}
+        if unknown:
+            raise ValueError(f"wave {number}: unknown field(s) {sorted(unknown)}")
+        wave = dict(DEFAULTS, **definition)
+        check_wave(number, wave)
+        if wave["formation"] == "grid":
+            wave["count"] = wave["rows"] * wave["cols"]
+        for repeat in range(wave["repeat"]):
+            start = wave["at"] + repeat * wave["period"]
+            for i, (x, y) in enumerate(formation_offsets(wave, rng)):
+                # keep the whole alien on the screen
+                x = min(max(int(x), 0), WIDTH - ALIEN_WIDTH)
+                tick = start + i * wave["every"]
+                events.setdefault(tick, []).append((x, int(y), roll_speed(wave["speed"], rng)))
+
+    ticks = sorted(events)
+    batches = [tuple(events[tick]) for tick in ticks]
+    length = data.get("length", ticks[-1] + 1 if ticks else 1)
+    if not isinstance(length, int) or isinstance(length, bool) or length < 1:
+        raise ValueError(f"length must be a whole number >= 1, not {length!r}")
+    if ticks and ticks[-1] >= length:
+        raise ValueError(f"length {length} is shorter than the last spawn at tick {ticks[-1]}")
+    return Timeline(ticks, batches, length, data.get("loop", False))
+
+
+# ---------- SCHEDULER ----------
+class WaveScheduler:
+    """
+    WaveScheduler walks along a Timeline one tick at a time.
+    """
+    def __init__(self, timeline):
+        self.timeline = timeline
+        # tick within the current pass of the level
+        self.tick = 0
+        # position of the next batch in the timeline
+        self.index = 0
+        # passes of the level finished so far
+        self.loops = 0
+
+    def advance(self):
+        """
+        Move on one tick and return the batch of (x, y, speed) that
+        spawns on it (an empty tuple if nothing does).
+        """
+        timeline = self.timeline
+        batch = ()
+        # only the next entry can be due: the ticks are sorted and unique
+        if self.index < len(timeline.ticks) and timeline.ticks[self.index] == self.tick:
+            batch = timeline.batches[self.index]
+            self.index += 1
+        self.tick += 1
+        # start the level again after its last tick
+        if timeline.loop and self.tick >= timeline.length:
+            self.tick = 0
+            self.index = 0
+            self.loops += 1
+        return batch
+
+    @property
+    def finished(self):
+        """
+        True when a level that does not loop has nothing left to spawn.
+        """
+        return not self.timeline.loop and self.index >= len(self.timeline.ticks)
+
+
+# ---------- LOADING ----------
+def load_waves(path, rng=random):
+    """
+    Read a wave file and compile it into a Timeline.
+    """
+    with open(path) as f:
+        data = json.load(f)
+    return compile_waves(data, rng)
+
+
+# ---------- MAIN ----------
+def main(argv=None):
+    """
+    Compile a wave file and print its timeline.
+    """
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv:
+        print("usage: python waves.py WAVES.json")
+        return 2
+    timeline = load_waves(argv[0], random.Random(0))
+    print(f"{len(timeline)} aliens in {len(timeline.ticks)} batches over "
+          f"{timeline.length} ticks{' (looping)' if timeline.loop else ''}")
+    for tick, batch in zip(timeline.ticks, timeline.batches):
+        print(f"tick {tick:>6}: {len(batch)} alien(s) at x "
+              + ", ".join(str(x) for x, y, speed in batch))
+    return 0
+
+
+# run main() only if this script is executed directly
+if __name__ == "__main__":
+    sys.exit(main())